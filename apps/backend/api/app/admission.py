@@ -0,0 +1,201 @@
+"""
+Admission control: sheds requests to expensive endpoints before they reach DynamoDB.
+
+Three limits, each configured per "METHOD /path" (path segments may be `{param}`):
+- ADMISSION_CLIENT_RATE_LIMITS: a token bucket per client and route
+  ("rate:burst", requests per second), so one caller can't hog a route
+- ADMISSION_ROUTE_RATE_LIMITS: a token bucket per route shared by all clients,
+  which caps the table work a route can cause
+- ADMISSION_CONCURRENCY_LIMITS: requests of a route in flight at once, for
+  scan-backed endpoints whose cost is in how long each one runs
+
+Requests over a rate limit get 429 and those over a concurrency cap 503, both
+immediately and with Retry-After; nothing is queued, so page detail reads keep
+their latency while an expensive route is being hammered. Limits apply per
+process (each uvicorn worker or Lambda instance has its own buckets).
+
+Clients are told apart by their address, or the first X-Forwarded-For entry
+when ADMISSION_TRUST_FORWARDED_FOR is set (behind a load balancer). A request
+only uses up tokens when it is admitted. Paths are matched without the ASGI
+root_path, such as an API Gateway stage prefix that Mangum passes on.
+"""
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+from app.config import get_settings
+from app.metrics import ADMISSION_REJECTIONS
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst"""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait(self) -> float:
+        """Seconds until a token is available (0 if one is now), without taking it"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def take(self) -> float:
+        """Take a token; returns 0 if one was available, else seconds until one will be"""
+        wait = self.wait()
+        if not wait:
+            self.tokens -= 1
+        return wait
+
+
+class _Rule:
+    __slots__ = ("name", "method", "pattern", "client_limit", "route_bucket", "max_concurrency", "clients", "in_flight")
+
+    def __init__(self, name: str, method: str, pattern: Pattern):
+        self.name = name
+        self.method = method
+        self.pattern = pattern
+        self.client_limit: Optional[Tuple[float, float]] = None
+        self.route_bucket: Optional[TokenBucket] = None
+        self.max_concurrency: Optional[int] = None
+        self.clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.in_flight = 0
+
+
+def parse_limits(spec: str) -> Dict[str, str]:
+    """"GET /a=1:2,POST /b=3" -> {"GET /a": "1:2", "POST /b": "3"}"""
+    limits = {}
+    for entry in spec.split(","):
+        if entry.strip():
+            route, _, value = entry.rpartition("=")
+            limits[" ".join(route.split())] = value.strip()
+    return limits
+
+
+def _rate(value: str) -> Tuple[float, float]:
+    rate, _, burst = value.partition(":")
+    return float(rate), float(burst or rate)
+
+
+def _pattern(path: str) -> Pattern:
+    return re.compile("^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(path.rstrip("/"))) + "/?$")
+
+
+def build_rules(client_limits: str, route_limits: str, concurrency_limits: str) -> List[_Rule]:
+    rules: Dict[str, _Rule] = {}
+
+    def rule(name: str) -> _Rule:
+        if name not in rules:
+            method, _, path = name.partition(" ")
+            rules[name] = _Rule(name, method.upper(), _pattern(path))
+        return rules[name]
+
+    for name, value in parse_limits(client_limits).items():
+        rule(name).client_limit = _rate(value)
+    for name, value in parse_limits(route_limits).items():
+        rule(name).route_bucket = TokenBucket(*_rate(value))
+    for name, value in parse_limits(concurrency_limits).items():
+        rule(name).max_concurrency = int(value)
+    return list(rules.values())
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission rules before routing"""
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.enabled = settings.admission_enabled
+        self.trust_forwarded_for = settings.admission_trust_forwarded_for
+        self.max_clients = settings.admission_max_clients
+        self.rules = build_rules(
+            settings.admission_client_rate_limits,
+            settings.admission_route_rate_limits,
+            settings.admission_concurrency_limits
+        )
+
+    def _match(self, method: str, path: str) -> Optional[_Rule]:
+        for rule in self.rules:
+            if rule.method == method and rule.pattern.match(path):
+                return rule
+        return None
+
+    def _match_scope(self, scope) -> Optional[_Rule]:
+        """The rule for a request, trying its path with the root_path (e.g. a stage prefix) stripped too"""
+        path = scope["path"]
+        rule = self._match(scope["method"], path)
+        root_path = scope.get("root_path", "").rstrip("/")
+        if rule is None and root_path and path.startswith(root_path + "/"):
+            rule = self._match(scope["method"], path[len(root_path):])
+        return rule
+
+    def _client(self, scope) -> str:
+        if self.trust_forwarded_for:
+            for name, value in scope.get("headers") or ():
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _client_bucket(self, rule: _Rule, client: str) -> TokenBucket:
+        bucket = rule.clients.get(client)
+        if bucket is None:
+            bucket = rule.clients[client] = TokenBucket(*rule.client_limit)
+            # Forget the least recently seen clients (a fresh bucket starts full anyway)
+            while len(rule.clients) > self.max_clients:
+                rule.clients.popitem(last=False)
+        else:
+            rule.clients.move_to_end(client)
+        return bucket
+
+    async def _reject(self, send, rule: _Rule, status: int, reason: str, retry_after: float, detail: str) -> None:
+        ADMISSION_REJECTIONS.labels(route=rule.name, reason=reason).inc()
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+        rule = self._match_scope(scope)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        # Runs on the event loop, so the counters and buckets need no lock
+        if rule.max_concurrency is not None and rule.in_flight >= rule.max_concurrency:
+            return await self._reject(send, rule, 503, "concurrency", 1, "Too many concurrent requests; retry shortly")
+        # Both buckets are checked before either is drawn from, so a rejection costs no tokens
+        client_bucket = self._client_bucket(rule, self._client(scope)) if rule.client_limit is not None else None
+        if client_bucket is not None:
+            wait = client_bucket.wait()
+            if wait:
+                return await self._reject(send, rule, 429, "client_rate", wait, "Rate limit exceeded")
+        if rule.route_bucket is not None:
+            wait = rule.route_bucket.wait()
+            if wait:
+                return await self._reject(send, rule, 429, "route_rate", wait, "Rate limit exceeded")
+        for bucket in (client_bucket, rule.route_bucket):
+            if bucket is not None:
+                bucket.take()
+
+        rule.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rule.in_flight -= 1
@@ -1,10 +1,11 @@
-import requests
 from typing import Dict, Optional
-from jose import jwt, JWTError
-from jose.backends import RSAKey
 from fastapi import HTTPException, status
 from functools import lru_cache
+import logging
 import time
+from app.metrics import record_cache
+
+logger = logging.getLogger(__name__)
 
 class CognitoVerifier:
     """Handles JWT token verification with AWS Cognito"""
@@ -23,7 +24,10 @@ class CognitoVerifier:
         current_time = time.time()
         
         if self._jwks_cache and (current_time - self._cache_time) < self._cache_duration:
+            record_cache("jwks", hit=True)
             return self._jwks_cache
+        record_cache("jwks", hit=False)
+        import requests  # only needed once per JWKS cache window
         
         try:
             response = requests.get(self.jwks_url, timeout=10)
@@ -61,9 +65,11 @@ class CognitoVerifier:
         Returns:
             Decoded token payload
         """
+        # Imported on first use: anonymous requests never load python-jose or its crypto backend
+        from jose import jwt, JWTError
+
         try:
-            print("Verifying token:", token)
-            print("Expected token use:", token_use)
+            logger.debug("Verifying %s token", token_use)
 
             # Get token header without verification
             unverified_header = jwt.get_unverified_header(token)
@@ -108,9 +114,8 @@ class CognitoVerifier:
             return payload
             
         except JWTError as e:
-            print("JWTError:", e)
+            logger.info("Token rejected: %s", e)
             if("expired" in str(e).lower()):
-                print("""Token expired error detected""")
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Expired token"
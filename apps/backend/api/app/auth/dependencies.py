@@ -1,11 +1,13 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict
+from typing import Dict, Optional
 from functools import lru_cache
 from app.config import get_settings
 from app.auth.cognito import CognitoVerifier
 
 security = HTTPBearer()
+# For routes that serve more to signed-in callers but also answer anonymous ones
+optional_security = HTTPBearer(auto_error=False)
 
 @lru_cache()
 def get_cognito_verifier() -> CognitoVerifier:
@@ -29,6 +31,18 @@ async def verify_access_token(
     token = credentials.credentials
     return verifier.verify_token(token, token_use="access")
 
+async def verify_optional_access_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    verifier: CognitoVerifier = Depends(get_cognito_verifier)
+) -> Optional[Dict]:
+    """
+    Like verify_access_token, but None when the request has no bearer token
+    (an invalid token is still rejected)
+    """
+    if credentials is None:
+        return None
+    return verifier.verify_token(credentials.credentials, token_use="access")
+
 async def verify_id_token(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     verifier: CognitoVerifier = Depends(get_cognito_verifier)
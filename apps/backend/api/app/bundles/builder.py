@@ -0,0 +1,357 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from app.config import get_settings
+from app.database.s3 import get_s3_client
+
+PAGES_FILE = "pages.json"
+SEARCH_INDEX_FILE = "search_index.json"
+LAYER_DIR = "layers/"
+MANIFEST_FILE = "manifest.json"
+PATCH_FORMAT = 1
+
+# Fixed zip entry timestamp so identical content always produces identical archives
+_ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+def canonical_json(doc: Any) -> bytes:
+    """Serialize JSON deterministically so equal documents hash equally"""
+    return json.dumps(doc, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _page_key(page: dict) -> str:
+    return f"{page['id']}#{page['title']}"
+
+
+def _feature_key(feature: dict) -> str:
+    global_id = (feature.get("properties") or {}).get("GlobalID")
+    return global_id or sha256(canonical_json(feature))
+
+
+def _keyed_spec(name: str) -> Optional[Tuple[Optional[str], Callable[[dict], str]]]:
+    """(list attribute, key function) for files that get record-level deltas, else None"""
+    if name == PAGES_FILE:
+        return None, _page_key
+    if name.startswith(LAYER_DIR):
+        return "features", _feature_key
+    return None
+
+
+def _records(name: str, doc: Any) -> List[dict]:
+    list_attr, _ = _keyed_spec(name)
+    return doc if list_attr is None else doc.get(list_attr, [])
+
+
+def _with_records(name: str, doc: Any, records: List[dict]) -> Any:
+    list_attr, key = _keyed_spec(name)
+    records = sorted(records, key=key)
+    if list_attr is None:
+        return records
+    return {**doc, list_attr: records}
+
+
+def collect_contents(
+    pages: List[dict],
+    gis_data_dir: Optional[str],
+    search_index_path: Optional[str]
+) -> Dict[str, Any]:
+    """Gather the parsed documents that make up a bundle"""
+    docs: Dict[str, Any] = {PAGES_FILE: _with_records(PAGES_FILE, None, pages)}
+
+    if gis_data_dir and os.path.isdir(gis_data_dir):
+        for file_name in sorted(os.listdir(gis_data_dir)):
+            if not file_name.endswith(".json"):
+                continue
+            name = f"{LAYER_DIR}{file_name}"
+            with open(os.path.join(gis_data_dir, file_name)) as f:
+                layer = json.load(f)
+            docs[name] = _with_records(name, layer, layer.get("features", []))
+
+    if search_index_path and os.path.isfile(search_index_path):
+        with open(search_index_path) as f:
+            docs[SEARCH_INDEX_FILE] = json.load(f)
+
+    return docs
+
+
+def content_hash(files: Dict[str, bytes]) -> str:
+    """Hash of the bundle content (file names and file digests), independent of packaging"""
+    lines = "".join(f"{name}\t{sha256(data)}\n" for name, data in sorted(files.items()))
+    return sha256(lines.encode("utf-8"))
+
+
+def build_archive(version: int, files: Dict[str, bytes]) -> Tuple[bytes, dict]:
+    """Pack serialized files into a compressed zip with a content-hash manifest"""
+    manifest = {
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(),
+        "content_hash": content_hash(files),
+        "files": {
+            name: {"sha256": sha256(data), "size": len(data)}
+            for name, data in sorted(files.items())
+        },
+    }
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in [(MANIFEST_FILE, canonical_json(manifest)), *sorted(files.items())]:
+            info = zipfile.ZipInfo(name, date_time=_ZIP_DATE)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data, compresslevel=9)
+    return buffer.getvalue(), manifest
+
+
+def read_archive(archive: bytes) -> Dict[str, Any]:
+    """Return the parsed documents stored in a bundle archive"""
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        return {
+            name: json.loads(zf.read(name))
+            for name in zf.namelist()
+            if name != MANIFEST_FILE
+        }
+
+
+def diff_docs(old_docs: Dict[str, Any], new_docs: Dict[str, Any]) -> Dict[str, dict]:
+    """
+    Per-file delta between two bundles. Keyed files (pages, GIS layers) get
+    record-level upserts/deletes; everything else is replaced whole.
+    """
+    changes: Dict[str, dict] = {}
+
+    for name in sorted(old_docs.keys() - new_docs.keys()):
+        changes[name] = {"op": "delete"}
+
+    for name, new_doc in sorted(new_docs.items()):
+        old_doc = old_docs.get(name)
+        if old_doc is not None and canonical_json(old_doc) == canonical_json(new_doc):
+            continue
+
+        spec = _keyed_spec(name)
+        if old_doc is None or spec is None:
+            changes[name] = {"op": "put", "content": new_doc}
+            continue
+
+        list_attr, key = spec
+        old_records = {key(r): canonical_json(r) for r in _records(name, old_doc)}
+        new_records = {key(r): r for r in _records(name, new_doc)}
+        change = {
+            "op": "patch",
+            "upserts": [
+                record for k, record in new_records.items()
+                if old_records.get(k) != canonical_json(record)
+            ],
+            "deletes": sorted(old_records.keys() - new_records.keys()),
+        }
+        if list_attr is not None:
+            change["fields"] = {k: v for k, v in new_doc.items() if k != list_attr}
+        changes[name] = change
+
+    return changes
+
+
+def apply_patch(old_docs: Dict[str, Any], changes: Dict[str, dict]) -> Dict[str, Any]:
+    """Apply a delta produced by diff_docs (the mobile app implements the same steps)"""
+    docs = dict(old_docs)
+    for name, change in changes.items():
+        if change["op"] == "delete":
+            docs.pop(name, None)
+        elif change["op"] == "put":
+            docs[name] = change["content"]
+        else:
+            list_attr, key = _keyed_spec(name)
+            records = {key(r): r for r in _records(name, docs[name])}
+            for k in change["deletes"]:
+                records.pop(k, None)
+            for record in change["upserts"]:
+                records[key(record)] = record
+            base = change.get("fields", {}) if list_attr is not None else None
+            docs[name] = _with_records(name, base, list(records.values()))
+    return docs
+
+
+def build_patch(from_version: int, to_version: int, old_docs: Dict[str, Any], new_docs: Dict[str, Any]) -> bytes:
+    """Build a gzipped JSON patch and check that it reproduces the new bundle exactly"""
+    changes = diff_docs(old_docs, new_docs)
+    patched = apply_patch(old_docs, changes)
+    expected = {name: canonical_json(doc) for name, doc in new_docs.items()}
+    if content_hash({name: canonical_json(doc) for name, doc in patched.items()}) != content_hash(expected):
+        raise ValueError(f"Patch {from_version}->{to_version} does not reproduce bundle {to_version}")
+
+    patch = {
+        "format": PATCH_FORMAT,
+        "from": from_version,
+        "to": to_version,
+        "content_hash": content_hash(expected),
+        "files": changes,
+    }
+    return gzip.compress(canonical_json(patch), compresslevel=9, mtime=0)
+
+
+class BundleStore:
+    """Bundle archives, patches and the version index in S3"""
+
+    def __init__(self, s3, bucket: str, prefix: str = "bundles"):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/")
+
+    def bundle_key(self, version: int) -> str:
+        return f"{self.prefix}/v{version}/bundle.zip"
+
+    def manifest_key(self, version: int) -> str:
+        return f"{self.prefix}/v{version}/manifest.json"
+
+    def patch_key(self, from_version: int, to_version: int) -> str:
+        return f"{self.prefix}/patches/{from_version}-{to_version}.json.gz"
+
+    @property
+    def index_key(self) -> str:
+        return f"{self.prefix}/index.json"
+
+    def get(self, key: str) -> bytes:
+        return self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def put(self, key: str, body: bytes, content_type: str) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+
+    def delete(self, key: str) -> None:
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str, expires_in: int) -> str:
+        return self.s3.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in
+        )
+
+    def load_index(self) -> dict:
+        try:
+            return json.loads(self.get(self.index_key))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return {"latest": None, "versions": [], "patches": []}
+            raise
+
+    def save_index(self, index: dict) -> None:
+        self.put(self.index_key, canonical_json(index), "application/json")
+
+
+def _prune(store: BundleStore, index: dict, keep: int) -> None:
+    """Drop versions (and patches starting from them) beyond the retention window"""
+    if len(index["versions"]) <= keep:
+        return
+    dropped = index["versions"][:-keep]
+    index["versions"] = index["versions"][-keep:]
+    oldest = index["versions"][0]["version"]
+    for entry in dropped:
+        store.delete(entry["key"])
+        store.delete(store.manifest_key(entry["version"]))
+    for patch in [p for p in index["patches"] if p["from"] < oldest]:
+        store.delete(patch["key"])
+    index["patches"] = [p for p in index["patches"] if p["from"] >= oldest]
+
+
+def publish_bundle(pages: List[dict], store: BundleStore) -> dict:
+    """
+    Build a bundle from the current content. A new version (plus a patch from
+    the previous one) is only written when the content hash changed.
+    """
+    settings = get_settings()
+    docs = collect_contents(pages, settings.gis_data_dir, settings.search_index_path)
+    files = {name: canonical_json(doc) for name, doc in docs.items()}
+    new_hash = content_hash(files)
+
+    index = store.load_index()
+    previous = index["versions"][-1] if index["versions"] else None
+    if previous and previous["content_hash"] == new_hash:
+        return {"created": False, "version": previous}
+
+    version = previous["version"] + 1 if previous else 1
+    archive, manifest = build_archive(version, files)
+    entry = {
+        "version": version,
+        "key": store.bundle_key(version),
+        "size": len(archive),
+        "sha256": sha256(archive),
+        "content_hash": new_hash,
+        "created_at": manifest["created_at"],
+    }
+    store.put(entry["key"], archive, "application/zip")
+    store.put(store.manifest_key(version), canonical_json(manifest), "application/json")
+
+    if previous:
+        old_docs = read_archive(store.get(previous["key"]))
+        patch = build_patch(previous["version"], version, old_docs, docs)
+        # A patch bigger than the full bundle is never worth downloading
+        if len(patch) < len(archive):
+            patch_key = store.patch_key(previous["version"], version)
+            store.put(patch_key, patch, "application/gzip")
+            index["patches"].append({
+                "from": previous["version"],
+                "to": version,
+                "key": patch_key,
+                "size": len(patch),
+                "sha256": sha256(patch),
+            })
+
+    index["versions"].append(entry)
+    index["latest"] = version
+    _prune(store, index, settings.bundle_keep_versions)
+    store.save_index(index)
+    return {"created": True, "version": entry}
+
+
+def plan_update(index: dict, from_version: Optional[int]) -> dict:
+    """
+    Cheapest way (in bytes) to bring a client from from_version to the latest
+    bundle: a chain of patches or the full latest archive.
+    """
+    latest = index.get("latest")
+    if latest is None:
+        return {"latest": None, "strategy": "none", "steps": [], "size": 0}
+    if from_version == latest:
+        return {"latest": latest, "strategy": "none", "steps": [], "size": 0}
+
+    full = next(v for v in index["versions"] if v["version"] == latest)
+    full_step = {"from": from_version, "to": latest, "key": full["key"], "size": full["size"], "sha256": full["sha256"]}
+
+    # Patches only move forward, so relaxing them in version order gives shortest paths
+    best: Dict[int, Tuple[int, List[dict]]] = {}
+    if from_version is not None:
+        best[from_version] = (0, [])
+        for patch in sorted(index["patches"], key=lambda p: (p["from"], p["to"])):
+            if patch["from"] not in best:
+                continue
+            cost = best[patch["from"]][0] + patch["size"]
+            if patch["to"] not in best or cost < best[patch["to"]][0]:
+                best[patch["to"]] = (cost, best[patch["from"]][1] + [patch])
+
+    if latest in best and best[latest][0] < full["size"]:
+        cost, steps = best[latest]
+        return {"latest": latest, "strategy": "patches", "steps": steps, "size": cost}
+    return {"latest": latest, "strategy": "full", "steps": [full_step], "size": full["size"]}
+
+
+def get_bundle_store() -> BundleStore:
+    """Bundle store in the configured S3 bucket"""
+    settings = get_settings()
+    return BundleStore(get_s3_client(), settings.s3_bucket_name, settings.bundle_prefix)
+
+
+if __name__ == "__main__":
+    from app.database.dynamodb import get_dynamodb_table
+    from app.database.repository import PageRepository
+
+    repo = PageRepository(get_dynamodb_table("AppPages"))
+    result = publish_bundle(repo.get_all_published_pages(), get_bundle_store())
+    print(json.dumps(result, indent=2))
@@ -4,21 +4,116 @@ from typing import Optional
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
+    # Logging
+    log_level: str = "INFO"
+    log_format: str = "json"  # json or text
+    log_sample_rates: str = ""  # e.g. "app.database=0.1" keeps 10% of DEBUG/INFO records
+    log_queue_size: int = 10000
+
+    # Prometheus scrapes of /metrics must send "Authorization: Bearer <metrics_token>";
+    # unset, the endpoint is off (404)
+    metrics_token: Optional[str] = None
+
     # Cognito settings
     aws_region: str
     cognito_user_pool_id: str
     cognito_app_client_id: str
     cognito_domain: str
     algorithm: str = "RS256"
+    cognito_jwks_url: Optional[str] = None  # Override for a local JWKS (benchmarks)
     
     # DynamoDB settings
     dynamodb_table_name: str
     dynamodb_endpoint_url: Optional[str] = None  # For local DynamoDB
     
     s3_bucket_name: str
+    s3_endpoint_url: Optional[str] = None  # For local S3
+
+    # Directory holding the county GeoJSON layers (used to locate pages by gisId); the default
+    # is the mobile app's copy relative to apps/backend/api, the image ships them in geojson/
+    gis_data_dir: Optional[str] = "../../mobile/lib/geojson"
+
+    # Offline data bundles (stored in the S3 bucket under bundle_prefix)
+    search_index_path: Optional[str] = None
+    bundle_prefix: str = "bundles"
+    bundle_keep_versions: int = 20
+    bundle_url_expiry_seconds: int = 3600
+
+    # Table export (parallel scan)
+    export_total_segments: int = 8
+    export_max_workers: int = 4
+
+    # Concurrent gisID-index queries per bulk existence lookup
+    gis_lookup_max_workers: int = 16
+
+    # Page bodies larger than this are stored gzipped in the S3 bucket (see app/database/content.py)
+    page_content_inline_max_bytes: int = 4096
+    page_content_prefix: str = "page-content"
+    page_content_cache_size: int = 256  # fetched bodies kept in memory per process
+    page_content_fetch_max_workers: int = 16  # concurrent S3 fetches when a read returns many bodies
+
+    # Analytics sketches (AnalyticsSketches table): buffered in memory, merged in the background
+    sketch_flush_interval_seconds: float = 10.0
+    sketch_flush_max_pending: int = 5000
+    sketch_hour_retention_days: int = 90  # hourly sketches expire via TTL; daily ones are kept
+    hll_precision: int = 12  # 4096 registers, ~1.6% standard error
+    trending_capacity: int = 200  # Space-Saving counters per trending window
+
+    # Write sharding of hot Analytics counters (see app/database/sharding.py)
+    analytics_write_shards: int = 8
+    analytics_hot_events: str = ""  # comma-separated events that are always sharded, e.g. "App Open"
+    analytics_hot_key_threshold: float = 50.0  # writes/s per process that mark an event hot; 0 disables
+    analytics_hot_key_hold_seconds: float = 300.0
+
+    # Analytics compaction (app.jobs.compact_analytics): minute rows older than this fold
+    # into AnalyticsHourly, hourly rows into AnalyticsDaily; folded rows expire via TTL
+    analytics_minute_retention_days: int = 7
+    analytics_hour_retention_days: int = 180
+    analytics_compacted_ttl_days: int = 7
+
+    # Published-page snapshot for anonymous reads (see app/database/snapshot.py)
+    snapshot_enabled: bool = False
+    snapshot_path: str = "/tmp/published-pages.snapshot"
+    snapshot_refresh_seconds: float = 300.0
+    snapshot_check_interval_seconds: float = 1.0  # how often a worker looks for a newer file
+
+    # Exact tag search: the PageTags index table (see app/database/schema.py); while it is
+    # unset, writes keep no index and tag searches scan AppPages
+    page_tags_table: Optional[str] = None
+
+    # Facet counts: the PageFacets table (see app/database/schema.py); while it is unset, writes
+    # count nothing and /pages/facets answers 503 unless the published snapshot can count
+    page_facets_table: Optional[str] = None
+    facets_cache_seconds: float = 30.0  # counts are cached per process for this long
+
+    # Scheduled publishing: the PublishSchedule table (see app/database/schema.py); while it
+    # is unset, the schedule endpoints answer 503 and app.jobs.scheduled_publish does nothing
+    publish_schedule_table: Optional[str] = None
+    scheduled_publish_batch_size: int = 500  # due entries applied per round
+
+    # Incremental sync feed: needs the sync-index GSI on AppPages and a PageTombstones table
+    # (see app/database/schema.py); while no tombstones table is set, deletes write no
+    # tombstone and GET /pages/changes answers 503
+    sync_tombstones_table: Optional[str] = None
+    sync_tombstone_ttl_days: int = 30  # how long deleted pages stay on the feed (DynamoDB TTL)
+
+    # Admission control (see app/admission.py): "METHOD /path=rate:burst" token buckets
+    # per client and per route, and "METHOD /path=N" in-flight caps; limits are per process
+    admission_enabled: bool = True
+    admission_client_rate_limits: str = (
+        "POST /api/v1/analytics/log=20:50,GET /api/v1/pages/search=5:20,GET /api/v1/pages/count=1:5"
+    )
+    admission_route_rate_limits: str = (
+        "POST /api/v1/analytics/log=500:1000,GET /api/v1/pages/search=50:100,GET /api/v1/pages/count=2:5"
+    )
+    admission_concurrency_limits: str = "GET /api/v1/pages/search=8,GET /api/v1/pages/count=2"
+    admission_max_clients: int = 10000  # client buckets kept per rule (least recently seen dropped)
+    admission_trust_forwarded_for: bool = False  # key clients by X-Forwarded-For (behind a load balancer)
     
     @property
     def jwks_url(self) -> str:
+        if self.cognito_jwks_url:
+            return self.cognito_jwks_url
         return (
             f"https://cognito-idp.{self.aws_region}.amazonaws.com/"
             f"{self.cognito_user_pool_id}/.well-known/jwks.json"
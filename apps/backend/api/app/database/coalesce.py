@@ -0,0 +1,60 @@
+"""
+Single-flight request coalescing: concurrent identical reads share one backend call.
+
+The first caller for a key (the leader) runs the call; callers that arrive while it
+is in flight wait for it and receive the same result (or exception). Nothing is
+cached once the call returns, so results are never staler than a direct read.
+Shared results are the same objects for every caller and must be treated as read-only.
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable
+from app.metrics import SINGLEFLIGHT_CALLS
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key (thread-safe)"""
+
+    def __init__(self, group: str):
+        self.group = group
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.labels(group=self.group, result="shared").inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        SINGLEFLIGHT_CALLS.labels(group=self.group, result="leader").inc()
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+published_pages_flight = SingleFlight("published_pages")
+search_pages_flight = SingleFlight("search_pages")
+gis_id_flight = SingleFlight("gis_id")
@@ -0,0 +1,107 @@
+"""
+Offloaded page bodies.
+
+pageContent larger than PAGE_CONTENT_INLINE_MAX_BYTES is stored gzipped in the S3
+bucket under PAGE_CONTENT_PREFIX, and the page item keeps a pointer instead:
+`contentRef` (object key), `contentSize` (uncompressed bytes) and `contentExcerpt`
+(the beginning of the text, so searches still match it). Keys are content
+addressed within a page (id and a hash of the title, since pages are keyed by both),
+so an object belongs to exactly one page, never changes once written, and fetched
+bodies can be cached in memory without invalidation.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.database.s3 import get_s3_client
+from app.metrics import record_cache
+
+CONTENT_FIELDS = ("contentRef", "contentSize", "contentExcerpt")
+CONTENT_EXCERPT_CHARS = 1000
+
+
+class PageContentStore:
+    """Moves large page bodies to S3 and back"""
+
+    def __init__(self, s3, bucket: str, prefix: str, inline_max_bytes: int, cache_size: int = 256):
+        self.s3 = s3
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.inline_max_bytes = inline_max_bytes
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def store(self, page_id: Any, title: str, content: Optional[str]) -> Dict[str, Any]:
+        """
+        Attributes to save on the page for this body: pageContent itself when it is
+        small, otherwise a pointer to the uploaded object
+        """
+        raw = (content or "").encode("utf-8")
+        if len(raw) <= self.inline_max_bytes:
+            return {"pageContent": content}
+
+        title_hash = hashlib.sha256(title.encode("utf-8")).hexdigest()[:16]
+        key = f"{self.prefix}/{page_id}/{title_hash}/{hashlib.sha256(raw).hexdigest()}.txt.gz"
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=gzip.compress(raw),
+            ContentType="text/plain; charset=utf-8",
+            ContentEncoding="gzip",
+        )
+        self._remember(key, content)
+        return {
+            "contentRef": key,
+            "contentSize": len(raw),
+            "contentExcerpt": content[:CONTENT_EXCERPT_CHARS],
+        }
+
+    def fetch(self, key: str) -> str:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                record_cache("page_content", hit=True)
+                return self._cache[key]
+        record_cache("page_content", hit=False)
+        body = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        content = gzip.decompress(body).decode("utf-8")
+        self._remember(key, content)
+        return content
+
+    def delete(self, key: str) -> None:
+        self.s3.delete_object(Bucket=self.bucket, Key=key)
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def hydrate(self, page: Optional[dict]) -> Optional[dict]:
+        """Put an offloaded body back into pageContent and drop the pointer attributes"""
+        if not page or "contentRef" not in page:
+            return page
+        key = page["contentRef"]
+        page = {k: v for k, v in page.items() if k not in CONTENT_FIELDS}
+        page["pageContent"] = self.fetch(key)
+        return page
+
+    def _remember(self, key: str, content: str) -> None:
+        with self._lock:
+            self._cache[key] = content
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+@lru_cache()
+def get_page_content_store() -> PageContentStore:
+    """Process-wide content store (shares its cache across requests)"""
+    settings = get_settings()
+    return PageContentStore(
+        get_s3_client(),
+        settings.s3_bucket_name,
+        settings.page_content_prefix,
+        settings.page_content_inline_max_bytes,
+        settings.page_content_cache_size
+    )
@@ -1,6 +1,77 @@
 import boto3
+import logging
+import time
 from functools import lru_cache
+from typing import Optional
+from botocore.exceptions import ClientError
 from app.config import get_settings
+from app.metrics import DYNAMODB_ERRORS, record_dynamodb_call
+
+logger = logging.getLogger(__name__)
+
+
+def _instrumented(table_name: str, operation: str, method):
+    """Wrap a boto3 call so it records latency, consumed capacity and errors under table_name"""
+    def call(**kwargs):
+        kwargs.setdefault("ReturnConsumedCapacity", "INDEXES")
+        start = time.perf_counter()
+        try:
+            response = method(**kwargs)
+        except ClientError as e:
+            record_dynamodb_call(table_name, operation, time.perf_counter() - start)
+            DYNAMODB_ERRORS.labels(
+                table=table_name, operation=operation, code=e.response["Error"]["Code"]
+            ).inc()
+            raise
+        record_dynamodb_call(table_name, operation, time.perf_counter() - start, response)
+        return response
+    return call
+
+
+class InstrumentedTable:
+    """
+    Wraps a boto3 Table so every data call records latency, consumed capacity
+    (ReturnConsumedCapacity=INDEXES) and scanned-vs-returned counts, including the
+    batch and transaction calls made through table.meta.client.
+    Anything else (batch_writer, table_name, ...) is passed through.
+    """
+    INSTRUMENTED_OPERATIONS = ("get_item", "put_item", "update_item", "delete_item", "query", "scan")
+
+    def __init__(self, table):
+        self._table = table
+        self.meta = _InstrumentedMeta(table.meta, table.table_name)
+
+    def __getattr__(self, name):
+        attr = getattr(self._table, name)
+        if name not in self.INSTRUMENTED_OPERATIONS:
+            return attr
+        return _instrumented(self._table.table_name, name, attr)
+
+
+class _InstrumentedMeta:
+    """A table's meta whose client records the multi-item calls made through it"""
+
+    def __init__(self, meta, table_name: str):
+        self._meta = meta
+        self.client = _InstrumentedClient(meta.client, table_name)
+
+    def __getattr__(self, name):
+        return getattr(self._meta, name)
+
+
+class _InstrumentedClient:
+    """Low-level client; calls are recorded under the table they were made through"""
+    INSTRUMENTED_OPERATIONS = ("batch_get_item", "batch_write_item", "transact_get_items", "transact_write_items")
+
+    def __init__(self, client, table_name: str):
+        self._client = client
+        self._table_name = table_name
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self.INSTRUMENTED_OPERATIONS:
+            return attr
+        return _instrumented(self._table_name, name, attr)
 
 @lru_cache()
 def get_dynamodb_resource():
@@ -28,5 +99,9 @@ def get_dynamodb_table(table_name: str):
     elif table_name == "Analytics":
         table_name = "Analytics"
     table = dynamodb.Table(table_name)
-    print(f"Connected to table: {table.table_name}")
-    return table
\ No newline at end of file
+    logger.info("Connected to table %s", table.table_name)
+    return InstrumentedTable(table)
+
+def get_optional_table(table_name: Optional[str]):
+    """Table of an optional feature, or None while its name isn't configured"""
+    return get_dynamodb_table(table_name) if table_name else None
\ No newline at end of file
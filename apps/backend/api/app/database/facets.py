@@ -0,0 +1,124 @@
+"""
+Precomputed facet counts: how many pages there are per city, type and tag.
+
+The PageFacets table holds one item per scope ("all" pages and "published" ones),
+with one numeric attribute per facet value, named "<facet>:<value>" (for example
+"city:Lewes" or "tag:ski"). Page writes pass the page before and after the change
+to FacetStore.apply, which turns them into +1/-1 deltas and applies them with a
+single ADD update per scope, so /pages/facets is one GetItem instead of a scan.
+Reads are cached in memory for FACETS_CACHE_SECONDS.
+
+A count only drifts if a page write succeeds and its facet update fails (logged);
+app.jobs.rebuild_facets recounts everything from AppPages.
+"""
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from app.config import get_settings
+from app.database.dynamodb import get_dynamodb_table
+from app.database.scan import with_backoff
+from app.metrics import record_cache
+from app.utils.tags import normalize_tags
+
+FACETS = ("city", "type", "tag")
+SCOPES = ("all", "published")
+# Page attributes the counts are derived from
+FACET_SOURCE_FIELDS = ["city", "type", "tags", "published"]
+
+
+def facet_counts(page: Optional[dict]) -> Counter:
+    """(scope, "<facet>:<value>") -> 1 for each facet value a page contributes"""
+    counts: Counter = Counter()
+    if not page:
+        return counts
+    names = [f"{facet}:{page[facet]}" for facet in ("city", "type") if page.get(facet)]
+    names += [f"tag:{tag}" for tag in normalize_tags(page.get("tags"))]
+    scopes = SCOPES if page.get("published") else SCOPES[:1]
+    for scope in scopes:
+        counts.update((scope, name) for name in names)
+    return counts
+
+
+def _group(item: dict) -> Dict[str, Dict[str, int]]:
+    """Nested counts from a PageFacets item, largest first, zeros dropped"""
+    facets: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+    for name, count in item.items():
+        facet, _, value = name.partition(":")
+        if facet in facets and value and int(count) > 0:
+            facets[facet][value] = int(count)
+    return {
+        facet: dict(sorted(values.items(), key=lambda entry: (-entry[1], entry[0])))
+        for facet, values in facets.items()
+    }
+
+
+class FacetStore:
+    """Keeps the PageFacets items in step with page writes and serves them"""
+
+    def __init__(self, table, cache_seconds: float = 30.0):
+        self.table = table
+        self.cache_seconds = cache_seconds
+        self._cache: Dict[str, Tuple[float, Dict[str, Dict[str, int]]]] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]) -> None:
+        """Apply (old page, new page) changes; None stands for a page that doesn't exist"""
+        delta: Counter = Counter()
+        for old, new in changes:
+            delta.update(facet_counts(new))
+            delta.subtract(facet_counts(old))
+        for scope in SCOPES:
+            counts = {name: n for (s, name), n in delta.items() if s == scope and n}
+            if not counts:
+                continue
+            names = {f"#f{i}": name for i, name in enumerate(counts)}
+            values = {f":f{i}": n for i, n in enumerate(counts.values())}
+            with_backoff(
+                self.table.update_item,
+                Key={"scope": scope},
+                UpdateExpression="ADD " + ", ".join(f"#f{i} :f{i}" for i in range(len(counts))),
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+        with self._lock:
+            self._cache.clear()
+
+    def get(self, published: bool = False) -> Dict[str, Dict[str, int]]:
+        """{"city": {...}, "type": {...}, "tag": {...}} for all pages or published ones"""
+        scope = SCOPES[1] if published else SCOPES[0]
+        cached = self._cache.get(scope)
+        if cached and cached[0] > time.monotonic():
+            record_cache("page_facets", True)
+            return cached[1]
+        record_cache("page_facets", False)
+        item = self.table.get_item(Key={"scope": scope}).get("Item", {})
+        item.pop("scope", None)
+        facets = _group(item)
+        with self._lock:
+            self._cache[scope] = (time.monotonic() + self.cache_seconds, facets)
+        return facets
+
+    def replace(self, pages: Iterable[dict]) -> Dict[str, int]:
+        """Overwrite both scopes with counts recomputed from pages; returns the values per scope"""
+        totals: Counter = Counter()
+        for page in pages:
+            totals.update(facet_counts(page))
+        summary = {}
+        for scope in SCOPES:
+            item = {name: n for (s, name), n in totals.items() if s == scope}
+            summary[scope] = len(item)
+            with_backoff(self.table.put_item, Item={"scope": scope, **item})
+        with self._lock:
+            self._cache.clear()
+        return summary
+
+
+@lru_cache()
+def get_facet_store() -> Optional[FacetStore]:
+    """Process-wide facet store, so the read cache is shared by requests; None unless PAGE_FACETS_TABLE is set"""
+    settings = get_settings()
+    if not settings.page_facets_table:
+        return None
+    return FacetStore(get_dynamodb_table(settings.page_facets_table), settings.facets_cache_seconds)
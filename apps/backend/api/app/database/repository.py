@@ -1,12 +1,61 @@
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Iterator, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from itertools import islice
+import base64
+import logging
+import random
+import time
 import uuid
 from fastapi import FastAPI, HTTPException, status
-import boto3
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key, Attr
 from app.config import get_settings
+from app.database.coalesce import gis_id_flight, published_pages_flight, search_pages_flight
+from app.database.content import CONTENT_FIELDS, get_page_content_store
+from app.database.facets import FACET_SOURCE_FIELDS
+from app.database.s3 import get_s3_client
+from app.metrics import record_cache
+from app.database.sharding import WriteSharding, logical_event
+from app.database.scan import parallel_scan, projection_kwargs, with_backoff
+from app.sketches.hyperloglog import HyperLogLog
+from app.sketches.space_saving import SpaceSaving
+from app.sketches.store import DAY, GRANULARITY_SECONDS, HOUR, SketchBuffer, sketch_key, window_start
+from app.utils import geohash
+from app.utils.tags import join_tags, normalize_tags
+from app.utils.gis import get_feature_location
+
+# GSI used for proximity lookups: partition on a coarse geohash prefix,
+# sort on the full-precision geohash so finer cells become begins_with ranges
+GEOHASH_INDEX = "geohash-index"
+GEOHASH_PREFIX_LENGTH = 3
+GEOHASH_PRECISION = 9
+# Attributes derived by _location_fields
+LOCATION_FIELDS = ("lat", "lon", "geohash", "geohashPrefix")
+
+# Attributes returned by bulk gisId lookups unless the full page is requested
+GIS_SUMMARY_FIELDS = ["id", "title", "gisId", "type", "city", "published", "lat", "lon"]
+# Attributes read by list, search and nearby views: everything but the page body
+PAGE_LIST_FIELDS = [
+    "id", "title", "city", "type", "tags", "image", "gisId", "lat", "lon",
+    "geohash", "updated_at", "published", "published_at"
+]
+
+# GSI used for the incremental sync feed: every page that has been published lives in one
+# partition, sorted by "<updated_at>#<id>#<title>" so the cursor is unique even on timestamp ties.
+# Drafts get no syncBucket, so they stay off the (sparse) index until their first publish.
+SYNC_INDEX = "sync-index"
+SYNC_BUCKET = "pages"
+
+# PublishSchedule keeps every pending change in one partition, sorted by
+# "<publish_at>#<id>#<title>", so due entries are a single range query
+SCHEDULE_BUCKET = "publish"
+# TransactWriteItems accepts at most 100 actions, BatchGetItem 100 keys
+MAX_TRANSACTION_ITEMS = 100
+MAX_BATCH_GET_KEYS = 100
+
+logger = logging.getLogger(__name__)
 
 
 class Repository:
@@ -32,14 +81,75 @@ class Repository:
         elif isinstance(obj, float):
             return Decimal(str(obj))
         return obj
+
+    def _iter_scan(self, scan_kwargs: Dict[str, Any], limit: int, page_size: int = 100) -> Iterator[dict]:
+        """
+        Yield converted items as each scan page comes back from DynamoDB, following
+        LastEvaluatedKey until limit items have been produced or the table ends
+        """
+        kwargs = {**scan_kwargs, "Limit": min(page_size, limit)}
+        remaining = limit
+        try:
+            while remaining > 0:
+                response = with_backoff(self.table.scan, **kwargs)
+                for item in response.get("Items", [])[:remaining]:
+                    yield self._convert_decimals(item)
+                    remaining -= 1
+                if "LastEvaluatedKey" not in response:
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error scanning table: {str(e)}"
+            )
+
+    def export_items(
+        self,
+        total_segments: int = 4,
+        max_workers: int = 4,
+        fields: Optional[List[str]] = None
+    ) -> Iterator[dict]:
+        """Yield every item in the table using a parallel segmented scan"""
+        for item in parallel_scan(self.table, total_segments, max_workers, projection_kwargs(fields)):
+            yield self._convert_decimals(item)
     
 class PageRepository(Repository):
     """Repository for DynamoDB CRUD operations"""
     
-    def __init__(self, table):
+    def __init__(self, table, tombstones=None, schedule=None, snapshot=None, tag_index=None, facets=None):
         self.table = table
+        self.facets = facets
+        self.tombstones = tombstones
+        self.schedule = schedule
+        self.snapshot = snapshot
+        self.tag_index = tag_index
         self.settings = get_settings()
-        self.s3 = boto3.client("s3", region_name=self.settings.aws_region)
+        self.s3 = get_s3_client()
+        self.content = get_page_content_store()
+
+    def export_items(
+        self,
+        total_segments: int = 4,
+        max_workers: int = 4,
+        fields: Optional[List[str]] = None,
+        hydrate: bool = True
+    ) -> Iterator[dict]:
+        """
+        Yield every page using a parallel segmented scan. With hydrate, offloaded bodies are
+        fetched back into pageContent so the export is a self-contained backup; without it,
+        pages keep their contentRef pointers into the S3 bucket.
+        """
+        if not hydrate:
+            yield from super().export_items(total_segments, max_workers, fields)
+            return
+        items = parallel_scan(self.table, total_segments, max_workers, self._read_projection(fields))
+        while True:
+            # A scan page's worth at a time, so bodies are fetched concurrently but memory stays bounded
+            chunk = [self._convert_decimals(item) for item in islice(items, 100)]
+            if not chunk:
+                break
+            yield from self._hydrate_all(chunk)
     
     def create_page(self, page_data: dict) -> dict:
         """Create a new page for a user"""
@@ -48,42 +158,149 @@ class PageRepository(Repository):
         
         page = {
             "id": page_id,
-            **self._convert_floats(page_data)
+            **self._convert_floats(page_data),
+            **self._convert_floats(self._location_fields(page_data))
         }
+        page.update(self._sync_fields(page["id"], page["title"], timestamp))
+        if "tags" in page:
+            page["tags"] = join_tags(page["tags"])
+        content = page.pop("pageContent", None)
+        page.update(self.content.store(page["id"], page["title"], content))
         
         try:
             self.table.put_item(
                 Item=page,
                 ConditionExpression="attribute_not_exists(id)"
             )
-            return self._convert_decimals(page)
+            self._page_written(None, page)
+            return self._with_content(self._convert_decimals(page), content)
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                # The existing page has the same key, so it may use the same object: keep it
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
                     detail="Item already exists"
                 )
+            if "contentRef" in page:
+                self.content.delete(page["contentRef"])
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error creating page: {str(e)}"
             )
     
-    def get_page(self, page_id: str, title: str, authorized: Optional[Dict] = None) -> Optional[dict]:
-        """Get a single page by ID"""
+    @staticmethod
+    def _sync_key(page_id: Any, title: str, timestamp: str) -> str:
+        return f"{timestamp}#{page_id}#{title}"
+
+    @staticmethod
+    def _sync_fields(page_id: Any, title: str, timestamp: str, published: bool = False) -> dict:
+        """
+        Attributes that move a page to the given change time on the sync feed. Only
+        publishing adds syncBucket, which puts the page on sync-index for good.
+        """
+        fields = {
+            "updated_at": timestamp,
+            "syncKey": PageRepository._sync_key(page_id, title, timestamp),
+        }
+        if published:
+            fields["syncBucket"] = SYNC_BUCKET
+        return fields
+
+    @staticmethod
+    def _was_published(page: dict) -> bool:
+        """Whether clients may have seen the page: every publish sets published_at"""
+        return bool(page.get("published") or page.get("published_at"))
+
+    @staticmethod
+    def _location_fields(data: dict) -> dict:
+        """Derive lat/lon/geohash attributes from explicit coordinates or the linked GIS feature"""
+        lat, lon = data.get("lat"), data.get("lon")
+        if lat is None or lon is None:
+            location = get_feature_location(data.get("gisId"))
+            if not location:
+                return {}
+            lat, lon = location
+
+        point_hash = geohash.encode(lat, lon, GEOHASH_PRECISION)
+        return {
+            "lat": lat,
+            "lon": lon,
+            "geohash": point_hash,
+            "geohashPrefix": point_hash[:GEOHASH_PREFIX_LENGTH],
+        }
+
+    @staticmethod
+    def _with_content(page: Optional[dict], content: Optional[str]) -> Optional[dict]:
+        """Page as returned to clients: the body in pageContent, no offload pointer"""
+        if page is None:
+            return None
+        page = {k: v for k, v in page.items() if k not in CONTENT_FIELDS}
+        page["pageContent"] = content
+        return page
+
+    def _published_snapshot(self):
+        """Snapshot for anonymous reads of published pages, if snapshot mode is on and one is built"""
+        if self.snapshot is None:
+            return None
+        current = self.snapshot.current()
+        record_cache("published_snapshot", hit=current is not None)
+        return current
+
+    def _pages_changed(self) -> None:
+        if self.snapshot is not None:
+            self.snapshot.invalidate()
+
+    @staticmethod
+    def _read_projection(
+        fields: Optional[Sequence[str]],
+        default: Optional[List[str]] = None,
+        required: Sequence[str] = ()
+    ) -> Dict[str, Any]:
+        """
+        ProjectionExpression arguments for a read: the requested fields plus the
+        attributes the repository itself needs, or default when no fields are given
+        """
+        if not fields:
+            return projection_kwargs(default)
+        names = list(dict.fromkeys([*fields, *required]))
+        if "pageContent" in names:
+            names.append("contentRef")
+        return projection_kwargs(names)
+
+    def _hydrate_all(self, pages: List[dict]) -> List[dict]:
+        """Fetch offloaded bodies for many pages concurrently"""
+        if not any("contentRef" in page for page in pages):
+            return pages
+        workers = max(1, min(self.settings.page_content_fetch_max_workers, len(pages)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.content.hydrate, pages))
+
+    def get_page(
+        self,
+        page_id: str,
+        title: str,
+        authorized: Optional[Dict] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[dict]:
+        """Get a single page by ID (only the given attributes when fields is set)"""
+        snapshot = None if authorized else self._published_snapshot()
+        if snapshot is not None:
+            return snapshot.get(int(page_id), title, fields)
         try:
-            print(f"Fetching page with ID: {page_id} and Title: {title}")
+            logger.debug("Fetching page id=%s title=%s", page_id, title)
             response = self.table.get_item(
                 Key={
                     'id': int(page_id),  # Required partition key
                     'title': title  # Required sort key 
                 },
+                **self._read_projection(fields, required=["published"])
             )
-            print(response)
+            logger.debug("get_item response: %s", response)
             page = response.get("Item")
             if page and not page.get("published", False):
                 if not authorized:
                     return None
-            return self._convert_decimals(page) if page else None
+            return self.content.hydrate(self._convert_decimals(page)) if page else None
         except ClientError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -101,13 +318,21 @@ class PageRepository(Repository):
                 detail=f"Error counting pages: {str(e)}"
             )
 
-    def get_page_by_gis_id(self, gis_id: str) -> Optional[dict]:
+    def get_page_by_gis_id(self, gis_id: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
         """Return the first page matching this gisId using the GSI, or None."""
+        query_kwargs = self._read_projection(fields)
+        return gis_id_flight.do(
+            (self.table.table_name, gis_id, tuple(fields or ())),
+            lambda: self.content.hydrate(self._get_page_by_gis_id(gis_id, query_kwargs))
+        )
+
+    def _get_page_by_gis_id(self, gis_id: str, query_kwargs: Optional[Dict[str, Any]] = None) -> Optional[dict]:
         try:
             resp = self.table.query(
                 IndexName="gisID-index",
                 KeyConditionExpression=Key("gisId").eq(gis_id),
                 Limit=1,
+                **(query_kwargs or {})
             )
             items = resp.get("Items", [])
             if not items:
@@ -120,17 +345,41 @@ class PageRepository(Repository):
                 detail=f"Error checking gisId: {str(e)}"
             )
 
+    def get_pages_by_gis_ids(
+        self,
+        gis_ids: List[str],
+        full: bool = False,
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Optional[dict]]:
+        """
+        Look up many gisIds at once with a bounded concurrent fan-out of gisID-index
+        queries. Returns {gisId: page or None} in request order; pages only carry
+        GIS_SUMMARY_FIELDS unless full is set, or the given fields.
+        """
+        unique_ids = list(dict.fromkeys(gis_ids))
+        if full and not fields:
+            lookup = self.get_page_by_gis_id
+        else:
+            query_kwargs = self._read_projection(fields, GIS_SUMMARY_FIELDS)
+            lookup = lambda gis_id: self.content.hydrate(self._get_page_by_gis_id(gis_id, query_kwargs))
+
+        workers = max(1, min(get_settings().gis_lookup_max_workers, len(unique_ids)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(lookup, unique_ids))
+        return dict(zip(unique_ids, pages))
+
     def list_pages(
         self, 
         limit: int = 50,
+        fields: Optional[Sequence[str]] = None
     ) -> Dict[str, Any]:
         try:
             # This scans the entire table until the 1MB limit is hit
-            response = self.table.scan(Limit=limit)
-            print(response)
+            response = self.table.scan(Limit=limit, **self._read_projection(fields, PAGE_LIST_FIELDS))
+            logger.debug("scan response: %s", response)
             # The response will contain all pages found within the scan limit (max 1MB of data)
             return {
-                "pages": self._convert_decimals(response.get("Items", [])),
+                "pages": self._hydrate_all(self._convert_decimals(response.get("Items", []))),
                 "count": response.get("Count", 0),
                 # LastEvaluatedKey might still exist if the 1MB limit was hit
                 "last_evaluated_key": response.get("LastEvaluatedKey") 
@@ -144,18 +393,28 @@ class PageRepository(Repository):
     def list_published_pages(
         self, 
         limit: int = 50,
+        fields: Optional[Sequence[str]] = None
     ) -> Dict[str, Any]:
+        """Concurrent identical calls share one scan"""
+        snapshot = self._published_snapshot()
+        if snapshot is not None:
+            return snapshot.list_pages(limit, fields or PAGE_LIST_FIELDS)
+        return published_pages_flight.do(
+            (self.table.table_name, limit, tuple(fields or ())), lambda: self._list_published_pages(limit, fields)
+        )
+
+    def _list_published_pages(self, limit: int, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
         try:
             # This scans the entire table until the 1MB limit is hit
             response = self.table.scan(
                 Limit=limit,
-                FilterExpression="published = :published",
-                ExpressionAttributeValues={":published": True}
+                FilterExpression=Attr("published").eq(True),
+                **self._read_projection(fields, PAGE_LIST_FIELDS)
             )
-            print(response)
+            logger.debug("scan response: %s", response)
             # The response will contain all pages found within the scan limit (max 1MB of data)
             return {
-                "pages": self._convert_decimals(response.get("Items", [])),
+                "pages": self._hydrate_all(self._convert_decimals(response.get("Items", []))),
                 "count": response.get("Count", 0),
                 # LastEvaluatedKey might still exist if the 1MB limit was hit
                 "last_evaluated_key": response.get("LastEvaluatedKey") 
@@ -166,6 +425,33 @@ class PageRepository(Repository):
                 detail=f"Error listing pages: {str(e)}"
             )
     
+    def get_all_published_pages(self, keep_excerpts: bool = False) -> List[dict]:
+        """
+        Return every published page, following scan pagination to the end of the table.
+        keep_excerpts leaves contentExcerpt on pages whose body was offloaded (for the snapshot's search).
+        """
+        scan_kwargs = {"FilterExpression": Attr("published").eq(True)}
+        pages = []
+        try:
+            while True:
+                response = self.table.scan(**scan_kwargs)
+                pages.extend(response.get("Items", []))
+                if "LastEvaluatedKey" not in response:
+                    break
+                scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error listing pages: {str(e)}"
+            )
+        pages = self._convert_decimals(pages)
+        hydrated = self._hydrate_all(pages)
+        if keep_excerpts:
+            for page, full in zip(pages, hydrated):
+                if "contentExcerpt" in page:
+                    full["contentExcerpt"] = page["contentExcerpt"]
+        return hydrated
+
     def update_page(
         self, 
         page_id: str, 
@@ -179,6 +465,37 @@ class PageRepository(Repository):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No valid fields to update"
             )
+
+        # Keep the geohash in sync when the page's location or linked feature changes
+        if ("lat" in updates) != ("lon" in updates):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="lat and lon must be updated together"
+            )
+        remove_attrs = []
+        if {"lat", "lon", "gisId"} & updates.keys():
+            location = self._location_fields(updates)
+            updates.update(location)
+            # A new gisId with no known feature: the old coordinates belonged to the old one
+            if not location:
+                remove_attrs.extend(LOCATION_FIELDS)
+
+        if "tags" in updates:
+            updates["tags"] = join_tags(updates["tags"])
+
+        now = datetime.utcnow().isoformat()
+        publishing = updates.get("published") is True
+        if publishing:
+            updates.setdefault("published_at", now)
+
+        # A new body is stored inline or offloaded on its own; drop whichever form it replaces
+        has_content = "pageContent" in updates
+        content = None
+        if has_content:
+            content = updates.pop("pageContent")
+            stored = self.content.store(page_id, title, content)
+            updates.update(stored)
+            remove_attrs.extend(["pageContent"] if "contentRef" in stored else CONTENT_FIELDS)
         
         # Build update expression
         update_expr_parts = []
@@ -192,12 +509,18 @@ class PageRepository(Repository):
             expr_attr_names[placeholder_name] = key
             expr_attr_values[placeholder_value] = self._convert_floats(value)
         
-        # Always update the updated_at timestamp
-        update_expr_parts.append("#updated_at = :updated_at")
-        expr_attr_names["#updated_at"] = "updated_at"
-        expr_attr_values[":updated_at"] = datetime.utcnow().isoformat()
+        # Always update the updated_at timestamp (and the page's position on the sync feed)
+        sync_fields = self._sync_fields(page_id, title, now, published=publishing)
+        for key, value in sync_fields.items():
+            update_expr_parts.append(f"#{key} = :{key}")
+            expr_attr_names[f"#{key}"] = key
+            expr_attr_values[f":{key}"] = value
         
         update_expression = "SET " + ", ".join(update_expr_parts)
+        if remove_attrs:
+            for idx, key in enumerate(remove_attrs):
+                expr_attr_names[f"#rm{idx}"] = key
+            update_expression += " REMOVE " + ", ".join(f"#rm{idx}" for idx in range(len(remove_attrs)))
         
         try:
             response = self.table.update_item(
@@ -209,11 +532,14 @@ class PageRepository(Repository):
                 ExpressionAttributeNames=expr_attr_names,
                 ExpressionAttributeValues=expr_attr_values,
                 ConditionExpression="attribute_exists(id)",
-                ReturnValues="ALL_NEW"
+                # The old image tells what the update replaced; the new one follows from it
+                ReturnValues="ALL_OLD"
             )
-            return self._convert_decimals(response.get("Attributes"))
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                # No page references the object that was just uploaded
+                if updates.get("contentRef"):
+                    self.content.delete(updates["contentRef"])
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Item not found or access denied"
@@ -222,29 +548,120 @@ class PageRepository(Repository):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error updating page: {str(e)}"
             )
+
+        old = response.get("Attributes", {})
+        new = {k: v for k, v in old.items() if k not in remove_attrs}
+        new.update(self._convert_floats(updates), **sync_fields)
+        # Content-addressed keys: an unchanged body keeps its object
+        if old.get("contentRef") and old["contentRef"] != new.get("contentRef"):
+            self._release_content(old["id"], old["contentRef"])
+        self._page_written(old, new)
+        page = self._convert_decimals(new)
+        return self._with_content(page, content) if has_content else self.content.hydrate(page)
+
+    def _page_written(self, old: Optional[dict], new: Optional[dict]) -> None:
+        """Bring data derived from pages (tag index, facet counts, snapshot) up to date after a write"""
+        page = new or old
+        self._index_tags(page["id"], page["title"], (old or {}).get("tags"), (new or {}).get("tags"))
+        self._count_facets([(old, new)])
+        self._pages_changed()
+
+    def _count_facets(self, changes: List[Tuple[Optional[dict], Optional[dict]]]) -> None:
+        if self.facets is None:
+            return
+        try:
+            self.facets.apply(changes)
+        except ClientError as e:
+            # The page write already succeeded; app.jobs.rebuild_facets recounts
+            logger.error("Could not update facet counts: %s", e)
+
+    def _facet_sources(self, keys: List[Tuple[int, str]]) -> List[dict]:
+        """The attributes facet counts depend on, for pages about to change in bulk"""
+        if self.facets is None:
+            return []
+        return self._batch_get_pages(
+            [{"id": page_id, "title": title} for page_id, title in keys],
+            projection_kwargs(["id", "title", *FACET_SOURCE_FIELDS])
+        )
+
+    def get_facets(self, published: bool = False) -> Dict[str, Dict[str, int]]:
+        """Page counts per city, type and tag, from the published snapshot or the PageFacets item"""
+        snapshot = self._published_snapshot() if published else None
+        if snapshot is not None:
+            return snapshot.facets()
+        if self.facets is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Facet counts are not available"
+            )
+        try:
+            return self.facets.get(published)
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error reading facet counts: {str(e)}"
+            )
+
+    @staticmethod
+    def _page_key(page_id: Any, title: str) -> str:
+        return f"{page_id}#{title}"
+
+    def _index_tags(self, page_id: Any, title: str, old_tags: Optional[str], new_tags: Optional[str]) -> None:
+        """Keep the PageTags adjacency items (tag -> page) in step with a page's tags"""
+        if self.tag_index is None:
+            return
+        old, new = set(normalize_tags(old_tags)), set(normalize_tags(new_tags))
+        if old == new:
+            return
+        page_key = self._page_key(page_id, title)
+        try:
+            with self.tag_index.batch_writer() as batch:
+                for tag in new - old:
+                    batch.put_item(Item={"tag": tag, "pageKey": page_key, "id": int(page_id), "title": title})
+                for tag in old - new:
+                    batch.delete_item(Key={"tag": tag, "pageKey": page_key})
+        except ClientError as e:
+            # The page write already succeeded; app.jobs.rebuild_page_tags repairs the index
+            logger.error("Could not update tag index for page %s: %s", page_key, e)
     
     def publish_page(self, page_id: str, title: str) -> Optional[dict]:
         """Publish an page (user must own the page)"""
+        now = datetime.utcnow().isoformat()
         try:
             response = self.table.update_item(
                 Key={
                     'id': int(page_id),  # Required partition key
                     'title': title  # Required sort key 
                 },
-                UpdateExpression="SET #published = :true, #published_at = :now, #updated_at = :now",
+                UpdateExpression=(
+                    "SET #published = :true, #published_at = :now, #updated_at = :now, "
+                    "#syncBucket = :syncBucket, #syncKey = :syncKey"
+                ),
                 ExpressionAttributeNames={
                     "#published": "published",
                     "#published_at": "published_at",
-                    "#updated_at": "updated_at"
+                    "#updated_at": "updated_at",
+                    "#syncBucket": "syncBucket",
+                    "#syncKey": "syncKey"
                 },
                 ExpressionAttributeValues={
                     ":true": True,
-                    ":now": datetime.utcnow().isoformat()
+                    ":now": now,
+                    ":syncBucket": SYNC_BUCKET,
+                    ":syncKey": self._sync_key(page_id, title, now)
                 },
                 ConditionExpression="attribute_exists(id)",
-                ReturnValues="ALL_NEW"
+                ReturnValues="ALL_OLD"
             )
-            return self._convert_decimals(response.get("Attributes"))
+            old = response.get("Attributes", {})
+            new = {
+                **old,
+                "published": True,
+                "published_at": now,
+                **self._sync_fields(page_id, title, now, published=True),
+            }
+            self._page_written(old, new)
+            return self.content.hydrate(self._convert_decimals(new))
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
                 raise HTTPException(
@@ -256,29 +673,436 @@ class PageRepository(Repository):
                 detail=f"Error publishing page: {str(e)}"
             )
 
-    def delete_page(self, page_id: str, title: str) -> bool:
-        """Delete an page (user must own the page)"""
-        print("Deleting page from repo:", page_id, title)
+    def delete_page(self, page_id: str, title: str, max_attempts: int = 5) -> bool:
+        """
+        Delete an page (user must own the page). A page that was ever published gets a
+        tombstone on the sync feed in the same transaction, so clients always learn of it.
+        """
+        logger.info("Deleting page id=%s title=%s", page_id, title)
+        key = {"id": int(page_id), "title": title}
+        for attempt in range(max_attempts):
+            try:
+                old = self.table.get_item(Key=key, ConsistentRead=True).get("Item")
+                if old is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Item not found or access denied"
+                    )
+                if self._transact_delete(key, old):
+                    break
+            except ClientError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error deleting page: {str(e)}"
+                )
+            # The page changed since it was read: read it again
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Page changed concurrently; try again"
+            )
+
+        self._page_written(old, None)
+        if old.get("contentRef"):
+            self._release_content(old["id"], old["contentRef"])
+        return True
+
+    def _release_content(self, page_id: Any, content_ref: str) -> None:
+        """
+        Delete a body object a page no longer uses. Keys written before they included the
+        title can be shared by pages with the same id, so those are kept while one refers to them.
+        """
         try:
-            self.table.delete_item(
-                Key={
-                    'id': int(page_id),  # Required partition key
-                    'title': title  # Required sort key 
-                },
-                ConditionExpression="attribute_exists(id)"
+            response = self.table.query(
+                KeyConditionExpression=Key("id").eq(int(page_id)),
+                FilterExpression=Attr("contentRef").eq(content_ref),
+                ProjectionExpression="id"
             )
+        except ClientError as e:
+            # The page write already succeeded; an orphaned object only costs storage
+            logger.error("Could not check references to %s: %s", content_ref, e)
+            return
+        if not response.get("Items"):
+            self.content.delete(content_ref)
+
+    def _transact_delete(self, key: dict, old: dict) -> bool:
+        """
+        Delete the page and write its tombstone in one transaction; False (nothing
+        written) when the page no longer matches old
+        """
+        # Only the version that was read may be deleted, so old is exactly what was removed
+        if "updated_at" in old:
+            condition = {
+                "ConditionExpression": "attribute_exists(id) AND updated_at = :updated_at",
+                "ExpressionAttributeValues": {":updated_at": old["updated_at"]},
+            }
+        else:
+            condition = {"ConditionExpression": "attribute_exists(id) AND attribute_not_exists(updated_at)"}
+        actions = [{"Delete": {"TableName": self.table.table_name, "Key": key, **condition}}]
+        if self.tombstones is not None and self._was_published(old):
+            actions.append({"Put": {"TableName": self.tombstones.table_name, "Item": self._tombstone(key["id"], key["title"])}})
+        try:
+            # The resource's client, so keys and values are plain Python types
+            with_backoff(self.table.meta.client.transact_write_items, TransactItems=actions)
             return True
         except ClientError as e:
-            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            return False
+
+    def set_published_many(
+        self,
+        keys: List[Tuple[int, str]],
+        published: bool = True,
+        published_at: Optional[str] = None,
+        max_attempts: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Publish or unpublish many pages with TransactWriteItems, 100 pages per
+        transaction, so each chunk becomes visible at once. All pages share one
+        change time on the sync feed. Keys that no longer exist are skipped and
+        returned under "missing".
+        """
+        keys = list(dict.fromkeys((int(page_id), title) for page_id, title in keys))
+        now = datetime.utcnow().isoformat()
+        published_at = (published_at or now) if published else None
+        updated, missing = 0, []
+        for start in range(0, len(keys), MAX_TRANSACTION_ITEMS):
+            chunk = keys[start:start + MAX_TRANSACTION_ITEMS]
+            conflicts = 0
+            while chunk:
+                before = self._facet_sources(chunk)
+                reasons = self._transact_publish(chunk, published, published_at, now)
+                if reasons is None:
+                    updated += len(chunk)
+                    self._count_facets([(old, {**old, "published": published}) for old in before])
+                    break
+                # Drop pages that were deleted and retry the rest right away
+                gone = [key for key, reason in zip(chunk, reasons) if reason == "ConditionalCheckFailed"]
+                if gone:
+                    missing.extend(gone)
+                    chunk = [key for key in chunk if key not in gone]
+                    continue
+                # Otherwise another write touched one of the pages: back off and retry
+                conflicts += 1
+                if conflicts >= max_attempts:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=f"Pages changed concurrently; {updated} of {len(keys)} were updated"
+                    )
+                time.sleep(random.uniform(0, 0.05 * 2 ** conflicts))
+        if updated:
+            self._pages_changed()
+        return {"updated": updated, "missing": missing, "published_at": published_at}
+
+    def _transact_publish(
+        self,
+        keys: List[Tuple[int, str]],
+        published: bool,
+        published_at: Optional[str],
+        now: str
+    ) -> Optional[List[str]]:
+        """One transaction over at most 100 pages; returns the per-item cancellation reasons on failure"""
+        actions = []
+        for page_id, title in keys:
+            values = {
+                ":published": published,
+                ":now": now,
+                ":syncKey": self._sync_key(page_id, title, now),
+            }
+            update_expression = "SET published = :published, updated_at = :now, syncKey = :syncKey"
+            if published:
+                update_expression += ", published_at = :published_at, syncBucket = :syncBucket"
+                values[":published_at"] = published_at
+                values[":syncBucket"] = SYNC_BUCKET
+            actions.append({"Update": {
+                "TableName": self.table.table_name,
+                "Key": {"id": page_id, "title": title},
+                "UpdateExpression": update_expression,
+                "ConditionExpression": "attribute_exists(id)",
+                "ExpressionAttributeValues": values,
+            }})
+        try:
+            # The resource's client, so keys and values are plain Python types
+            with_backoff(self.table.meta.client.transact_write_items, TransactItems=actions)
+            return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
                 raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Item not found or access denied"
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error publishing pages: {str(e)}"
                 )
+            return [reason.get("Code", "None") for reason in e.response.get("CancellationReasons", [])]
+
+    @staticmethod
+    def _schedule_key(publish_at: str, page_id: Any, title: str) -> str:
+        return f"{publish_at}#{page_id}#{title}"
+
+    def _require_schedule(self) -> None:
+        if self.schedule is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Scheduled publishing is not configured"
+            )
+
+    def schedule_publish(self, keys: List[Tuple[int, str]], publish_at: datetime, published: bool = True) -> List[dict]:
+        """Queue pages to be published (or unpublished) at publish_at by the scheduled_publish job"""
+        self._require_schedule()
+        if publish_at.tzinfo:
+            # Stored timestamps are naive UTC
+            publish_at = publish_at.astimezone(timezone.utc).replace(tzinfo=None)
+        at = publish_at.isoformat()
+        entries = [
+            {
+                "scheduleBucket": SCHEDULE_BUCKET,
+                "runKey": self._schedule_key(at, page_id, title),
+                "id": int(page_id),
+                "title": title,
+                "published": published,
+                "publish_at": at,
+            }
+            for page_id, title in dict.fromkeys(keys)
+        ]
+        try:
+            with self.schedule.batch_writer() as batch:
+                for entry in entries:
+                    batch.put_item(Item=entry)
+        except ClientError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error deleting page: {str(e)}"
+                detail=f"Error scheduling pages: {str(e)}"
             )
-    
+        return entries
+
+    def get_scheduled(self, until: Optional[datetime] = None, limit: Optional[int] = None) -> List[dict]:
+        """Pending schedule entries in publish_at order (only those due by until, if given)"""
+        self._require_schedule()
+        key_condition = Key("scheduleBucket").eq(SCHEDULE_BUCKET)
+        if until:
+            # '~' sorts after the '#' separator, so every entry at exactly `until` is included
+            key_condition = key_condition & Key("runKey").lte(until.isoformat() + "~")
+        query_kwargs = {"KeyConditionExpression": key_condition}
+        entries = []
+        try:
+            while limit is None or len(entries) < limit:
+                response = with_backoff(self.schedule.query, **query_kwargs)
+                entries.extend(response.get("Items", []))
+                if "LastEvaluatedKey" not in response:
+                    break
+                query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error reading publish schedule: {str(e)}"
+            )
+        return self._convert_decimals(entries[:limit] if limit else entries)
+
+    def cancel_scheduled(self, run_keys: List[str]) -> None:
+        self._require_schedule()
+        with self.schedule.batch_writer() as batch:
+            for run_key in run_keys:
+                batch.delete_item(Key={"scheduleBucket": SCHEDULE_BUCKET, "runKey": run_key})
+
+    def _tombstone(self, page_id: int, title: str) -> dict:
+        """PageTombstones item recording a deletion on the sync feed, so offline clients can drop the page"""
+        deleted_at = datetime.utcnow()
+        expires_at = deleted_at + timedelta(days=self.settings.sync_tombstone_ttl_days)
+        return {
+            "syncBucket": SYNC_BUCKET,
+            "syncKey": self._sync_key(page_id, title, deleted_at.isoformat()),
+            "id": page_id,
+            "title": title,
+            "deleted_at": deleted_at.isoformat(),
+            "expires_at": int(expires_at.timestamp()),
+        }
+
+    @staticmethod
+    def _encode_cursor(sync_key: str) -> str:
+        return base64.urlsafe_b64encode(sync_key.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> str:
+        try:
+            return base64.urlsafe_b64decode(cursor.encode()).decode()
+        except (ValueError, UnicodeDecodeError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    def _query_sync_feed(self, table, after: str, limit: int, index_name: Optional[str] = None) -> Dict[str, Any]:
+        key_condition = Key("syncBucket").eq(SYNC_BUCKET)
+        if after:
+            key_condition = key_condition & Key("syncKey").gt(after)
+        query_kwargs = {"KeyConditionExpression": key_condition, "Limit": limit}
+        if index_name:
+            query_kwargs["IndexName"] = index_name
+        return table.query(**query_kwargs)
+
+    def get_changes(
+        self,
+        since: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Return published-page upserts and deletions after a cursor (or timestamp), oldest first.
+        Pages that were unpublished are reported as deletions.
+        """
+        if since and since.tzinfo:
+            # Stored timestamps are naive UTC
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        if self.tombstones is None:
+            # Without tombstones clients would never learn of deleted pages
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Sync feed is not configured"
+            )
+        after = self._decode_cursor(cursor) if cursor else (since.isoformat() if since else "")
+
+        # Tombstones expire after a while; a client older than that must re-download everything
+        oldest_tombstone = datetime.utcnow() - timedelta(days=self.settings.sync_tombstone_ttl_days)
+        full_resync = bool(after) and after < oldest_tombstone.isoformat()
+
+        try:
+            pages = self._query_sync_feed(self.table, after, limit, index_name=SYNC_INDEX)
+            tombstones = self._query_sync_feed(self.tombstones, after, limit)
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error reading page changes: {str(e)}"
+            )
+
+        changes = []
+        for item in self._convert_decimals(pages.get("Items", [])):
+            if item.get("published", False):
+                changes.append({"op": "upsert", "page": item})
+            elif self._was_published(item):
+                changes.append({"op": "delete"})
+            else:
+                # A draft indexed before drafts were kept off sync-index: not reported,
+                # but it still advances the cursor
+                changes.append({"op": None})
+            changes[-1].update(id=item["id"], title=item["title"], syncKey=item["syncKey"], changed_at=item["updated_at"])
+        for item in self._convert_decimals(tombstones.get("Items", [])):
+            changes.append({
+                "op": "delete",
+                "id": item["id"],
+                "title": item["title"],
+                "syncKey": item["syncKey"],
+                "changed_at": item["deleted_at"],
+            })
+
+        changes.sort(key=lambda change: change["syncKey"])
+        has_more = (
+            len(changes) > limit or
+            "LastEvaluatedKey" in pages or
+            "LastEvaluatedKey" in tombstones
+        )
+        changes = changes[:limit]
+        next_key = changes[-1]["syncKey"] if changes else after
+        changes = [change for change in changes if change["op"]]
+        # Only pages sent as upserts need their offloaded bodies
+        upserts = [change for change in changes if change["op"] == "upsert"]
+        for change, page in zip(upserts, self._hydrate_all([change["page"] for change in upserts])):
+            change["page"] = page
+
+        return {
+            "changes": changes,
+            "cursor": self._encode_cursor(next_key),
+            "has_more": has_more,
+            "full_resync": full_resync,
+        }
+
+    def get_nearby_pages(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        limit: int = 50,
+        published: Optional[bool] = True,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """Find pages within radius_m of a point, closest first (geohash prefix ranges on the GSI)"""
+        cells = geohash.covering_cells(lat, lon, radius_m, min_precision=GEOHASH_PREFIX_LENGTH)
+        filter_expression = Attr("published").eq(True) if published else None
+
+        candidates = {}
+        try:
+            for cell in cells:
+                query_kwargs = {
+                    "IndexName": GEOHASH_INDEX,
+                    "KeyConditionExpression": (
+                        Key("geohashPrefix").eq(cell[:GEOHASH_PREFIX_LENGTH]) &
+                        Key("geohash").begins_with(cell)
+                    ),
+                    **self._read_projection(fields, PAGE_LIST_FIELDS, required=["id", "title", "lat", "lon"]),
+                }
+                if filter_expression is not None:
+                    query_kwargs["FilterExpression"] = filter_expression
+
+                while True:
+                    response = self.table.query(**query_kwargs)
+                    for item in response.get("Items", []):
+                        candidates[(item["id"], item["title"])] = item
+                    if "LastEvaluatedKey" not in response:
+                        break
+                    query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error searching nearby pages: {str(e)}"
+            )
+
+        nearby = []
+        for item in self._convert_decimals(list(candidates.values())):
+            distance = geohash.haversine_m(lat, lon, item["lat"], item["lon"])
+            if distance <= radius_m:
+                nearby.append({**item, "distance_m": round(distance, 1)})
+
+        nearby.sort(key=lambda page: page["distance_m"])
+        return self._hydrate_all(nearby[:limit])
+
+    @staticmethod
+    def _search_filter(
+        search_term: Optional[str] = "",
+        city: Optional[str] = None,
+        type: Optional[str] = None,
+        tag: Optional[str] = None,
+        published: Optional[bool] = None
+    ):
+        """Build the scan FilterExpression for a search, or None when the search matches nothing"""
+        has_term = bool(search_term and search_term.strip())
+        term_filter = (
+            Attr("title").contains(search_term) |
+            Attr("pageContent").contains(search_term) |
+            Attr("contentExcerpt").contains(search_term)
+        ) if has_term else None
+
+        if not city and not type:
+            if not has_term:
+                if not published:
+                    return None
+                if tag:
+                    return Attr("published").eq(True) & Attr("tags").contains(tag)
+                return Attr("published").eq(True)
+            if not published:
+                return term_filter
+            return term_filter & Attr("published").eq(True)
+        elif city and not type:
+            if not has_term:
+                return Attr("city").contains(city)
+            return term_filter & Attr("city").eq(city)
+        elif type and not city:
+            if not has_term:
+                return Attr("type").eq(type)
+            return term_filter & Attr("type").eq(type)
+        else:  # both city and type provided
+            if not has_term:
+                return Attr("city").eq(city) & Attr("type").eq(type)
+            return term_filter & Attr("city").eq(city) & Attr("type").eq(type)
+
     def search_pages(
         self,
         search_term: Optional[str] = "",
@@ -286,113 +1110,168 @@ class PageRepository(Repository):
         type: Optional[str] = None,
         tag: Optional[str] = None,
         published: Optional[bool] = None,
-        limit: int = 50
+        limit: int = 50,
+        fields: Optional[Sequence[str]] = None
     ) -> List[dict]:
         """Search pages by title or description (using scan - not optimal for large datasets)"""
+        snapshot = self._published_snapshot() if published else None
+        if snapshot is not None:
+            return list(snapshot.search(search_term, city, type, tag, limit, fields or PAGE_LIST_FIELDS))
+        key = (self.table.table_name, search_term, city, type, tag, published, limit, tuple(fields or ()))
+        tag_key = self._indexed_tag(search_term, city, type, tag, published)
+        if tag_key:
+            return search_pages_flight.do(key, lambda: list(self._iter_tag_pages(tag_key, limit, fields)))
+        filter_expression = self._search_filter(search_term, city=city, type=type, tag=tag, published=published)
+        if filter_expression is None:
+            return []
+        # Concurrent identical searches share one scan
+        return search_pages_flight.do(key, lambda: self._scan_search(filter_expression, limit, fields))
+
+    def _indexed_tag(
+        self,
+        search_term: Optional[str],
+        city: Optional[str],
+        type: Optional[str],
+        tag: Optional[str],
+        published: Optional[bool]
+    ) -> Optional[str]:
+        """The normalized tag when a search is a published tag-only search the PageTags index can answer"""
+        if self.tag_index is None or not tag or not published or city or type or (search_term and search_term.strip()):
+            return None
+        tags = normalize_tags(tag)
+        return tags[0] if len(tags) == 1 else None
+
+    def _iter_tag_pages(self, tag: str, limit: int, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Published pages carrying exactly this tag: a PageTags query, then BatchGetItem on the pages"""
+        query_kwargs = {"KeyConditionExpression": Key("tag").eq(tag), "Limit": min(MAX_BATCH_GET_KEYS, limit)}
+        projection = self._read_projection(fields, PAGE_LIST_FIELDS, required=["id", "title", "published"])
+        remaining = limit
         try:
-            response = None
-            if not city and not type:
-                if not search_term or search_term.strip() == "":
-                    print("Searching all pages that are published", "tag:", tag)
-                    if published:
-                        if tag:
-                            response = self.table.scan(
-                                FilterExpression=Attr("published").eq(True) & Attr("tags").contains(tag),
-                                Limit=limit
-                            )
-                        else:
-                            response = self.table.scan(
-                            FilterExpression=(
-                                Attr("published").eq(True)
-                            ),
-                            Limit=limit
-                        )
-                else:
-                    if not published:
-                        response = self.table.scan(
-                            FilterExpression=(
-                                Attr("title").contains(search_term) | 
-                                Attr("pageContent").contains(search_term)
-                            ),
-                            Limit=limit
-                        )
-                    else:
-                        response = self.table.scan(
-                            FilterExpression=(
-                                (Attr("title").contains(search_term) | 
-                                Attr("pageContent").contains(search_term)) &
-                                Attr("published").eq(True)
-                            ),
-                            Limit=limit
-                        )
-            elif city and not type:
-                print("Searching pages for city:", city)
-                if not search_term or len(search_term.strip()) == 0:
-                    response = self.table.scan(
-                        FilterExpression=Attr("city").contains(city),
-                        Limit=limit
-                    )
-                    print(response)
-                else:
-                    print("Searching pages in city with term:", search_term)
-                    response = self.table.scan(
-                        FilterExpression=(
-                            (Attr("title").contains(search_term) | 
-                            Attr("pageContent").contains(search_term)) &
-                            Attr("city").eq(city)
-                        ),
-                        Limit=limit
-                    )
-            elif type and not city:
-                if not search_term or search_term.strip() == "":
-                    response = self.table.scan(
-                        FilterExpression=Attr("type").eq(type),
-                        Limit=limit
-                    )
-                else:
-                    response = self.table.scan(
-                        FilterExpression=(
-                            (Attr("title").contains(search_term) | 
-                            Attr("pageContent").contains(search_term)) &
-                            Attr("type").eq(type)
-                        ),
-                        Limit=limit
-                    )
-            else:  # both city and type provided
-                if not search_term or search_term.strip() == "":
-                    response = self.table.scan(
-                        FilterExpression=Attr("city").eq(city) & Attr("type").eq(type),
-                        Limit=limit
-                    )
-                else:
-                    response = self.table.scan(
-                        FilterExpression=(
-                            (Attr("title").contains(search_term) | 
-                            Attr("pageContent").contains(search_term)) &
-                            Attr("city").eq(city) &
-                            Attr("type").eq(type)
-                        ),
-                        Limit=limit
-                    )
-            return self._convert_decimals(response.get("Items", []))
+            while remaining > 0:
+                response = with_backoff(self.tag_index.query, **query_kwargs)
+                keys = [{"id": item["id"], "title": item["title"]} for item in response.get("Items", [])]
+                for page in self._batch_get_pages(keys, projection):
+                    if not page.get("published"):
+                        continue
+                    yield self.content.hydrate(page)
+                    remaining -= 1
+                    if remaining == 0:
+                        return
+                if "LastEvaluatedKey" not in response:
+                    return
+                query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
         except ClientError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error searching pages: {str(e)}"
             )
 
+    def _batch_get_pages(self, keys: List[dict], projection: Dict[str, Any]) -> List[dict]:
+        """BatchGetItem at most 100 keys, retrying unprocessed keys; pages come back in key order"""
+        if not keys:
+            # BatchGetItem rejects an empty key list
+            return []
+        # The resource's client, so keys and values are plain Python types
+        client = self.table.meta.client
+        request = {self.table.table_name: {"Keys": keys, **projection}}
+        found = {}
+        attempt = 0
+        while request:
+            response = with_backoff(client.batch_get_item, RequestItems=request)
+            for item in response.get("Responses", {}).get(self.table.table_name, []):
+                found[self._page_key(item["id"], item["title"])] = item
+            request = response.get("UnprocessedKeys") or {}
+            if request:
+                attempt += 1
+                time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+        pages = [found[k] for k in (self._page_key(key["id"], key["title"]) for key in keys) if k in found]
+        return self._convert_decimals(pages)
+
+    def _scan_search(self, filter_expression, limit: int, fields: Optional[Sequence[str]] = None) -> List[dict]:
+        try:
+            response = self.table.scan(
+                FilterExpression=filter_expression,
+                Limit=limit,
+                **self._read_projection(fields, PAGE_LIST_FIELDS)
+            )
+            return self._hydrate_all(self._convert_decimals(response.get("Items", [])))
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error searching pages: {str(e)}"
+            )
+
+    def iter_search_pages(
+        self,
+        search_term: Optional[str] = "",
+        city: Optional[str] = None,
+        type: Optional[str] = None,
+        tag: Optional[str] = None,
+        published: Optional[bool] = None,
+        limit: int = 50,
+        fields: Optional[Sequence[str]] = None
+    ) -> Iterator[dict]:
+        """Streaming variant of search_pages: yields matches page by page until limit is reached"""
+        snapshot = self._published_snapshot() if published else None
+        if snapshot is not None:
+            return snapshot.search(search_term, city, type, tag, limit, fields or PAGE_LIST_FIELDS)
+        tag_key = self._indexed_tag(search_term, city, type, tag, published)
+        if tag_key:
+            return self._iter_tag_pages(tag_key, limit, fields)
+        filter_expression = self._search_filter(search_term, city=city, type=type, tag=tag, published=published)
+        if filter_expression is None:
+            return iter(())
+        scan_kwargs = {"FilterExpression": filter_expression, **self._read_projection(fields, PAGE_LIST_FIELDS)}
+        return map(self.content.hydrate, self._iter_scan(scan_kwargs, limit))
+
+    def iter_pages(self, limit: int = 50, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Streaming variant of list_pages"""
+        return map(self.content.hydrate, self._iter_scan(self._read_projection(fields, PAGE_LIST_FIELDS), limit))
+
+    def iter_published_pages(self, limit: int = 50, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Streaming variant of list_published_pages"""
+        snapshot = self._published_snapshot()
+        if snapshot is not None:
+            return snapshot.iter_pages(limit, fields or PAGE_LIST_FIELDS)
+        scan_kwargs = {"FilterExpression": Attr("published").eq(True), **self._read_projection(fields, PAGE_LIST_FIELDS)}
+        return map(self.content.hydrate, self._iter_scan(scan_kwargs, limit))
+
 class AnalyticsRepository(Repository):
     """Repository for Analytics DynamoDB operations"""
     
-    def __init__(self, table):
+    def __init__(
+        self,
+        table,
+        sketches: Optional[SketchBuffer] = None,
+        sharding: Optional[WriteSharding] = None,
+        hourly=None,
+        daily=None
+    ):
         self.table = table
+        self.sketches = sketches
+        self.sharding = sharding
+        # Rollup tables written by app.jobs.compact_analytics, with how far back a row's window reaches
+        self.rollups = [(t, span - 1) for t, span in ((hourly, HOUR), (daily, DAY)) if t is not None]
+
+    @staticmethod
+    def _merge_shards(items: List[dict]) -> List[dict]:
+        """Fold write-sharded rows ("<event>@shard<n>") back into one row per (event, timestamp)"""
+        merged = {}
+        for item in items:
+            event = logical_event(item["event"])
+            key = (event, item["timestamp"])
+            if key in merged:
+                merged[key]["count"] += item.get("count", 0)
+            else:
+                merged[key] = {**item, "event": event}
+        return list(merged.values())
     
     # Analytics-specific methods would go here
     def get_recent_events(self, limit: int = 100) -> List[dict]:
         """Retrieve recent analytics events"""
         try:
-            response = self.table.scan(Limit=limit)
-            return PageRepository._convert_decimals(response.get("Items", []))
+            response = self.table.scan(FilterExpression=Attr("compacted").not_exists(), Limit=limit)
+            return self._merge_shards(PageRepository._convert_decimals(response.get("Items", [])))
         except ClientError as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -403,22 +1282,27 @@ class AnalyticsRepository(Repository):
         """Retrieve analytics data for a specific event"""
         try:
             if event_name:
-                response = self.table.scan(
-                    FilterExpression=Attr("event").eq(event_name) & Attr("timestamp").gte(oldest) if oldest else Attr("event").eq(event_name),
-                    Limit=limit
-                )
+                # Also match the event's write shards
+                event_filter = Attr("event").eq(event_name) | Attr("event").begins_with(f"{event_name}@shard")
             elif event_type:
-                print(f"Fetching analytics for event type: {event_type} since {oldest}")
-                response = self.table.scan(
-                    FilterExpression=Attr("event").contains(event_type) & Attr("timestamp").gte(oldest) if oldest else Attr("event").contains(event_type),
-                    Limit=limit
-                )
+                logger.debug("Fetching analytics for event type %s since %s", event_type, oldest)
+                event_filter = Attr("event").contains(event_type)
+
+            # Minute rows that are not compacted yet, plus the hour/day rows older minutes were folded into
+            items = []
+            for table, overlap in [(self.table, 0)] + self.rollups:
+                scan_filter = event_filter & Attr("compacted").not_exists()
+                if oldest:
+                    # Keep rollup rows whose window still overlaps oldest
+                    scan_filter = scan_filter & Attr("timestamp").gte(oldest - overlap)
+                items.extend(table.scan(FilterExpression=scan_filter, Limit=limit).get("Items", []))
+
             ## group by timestamp and sum counts
-            results = AnalyticsRepository._convert_decimals(response.get("Items", []))
+            results = self._merge_shards(AnalyticsRepository._convert_decimals(items))
 
             ## default group by timestamp, which is per minute
             ## options include minute, hour, day
-            print(group)
+            logger.debug("Grouping analytics by %s", group)
             aggregated = {}
             for item in results:
                 ts = item["timestamp"]
@@ -442,8 +1326,8 @@ class AnalyticsRepository(Repository):
                 detail=f"Error retrieving analytics data for event '{event_name}': {str(e)}" if event_name else f"Error retrieving analytics data for event type '{event_type}': {str(e)}"
             )
         
-    def log_event(self, event: str, timestamp: Optional[str] = None) -> None:
-        """Log a page view event"""
+    def log_event(self, event: str, timestamp: Optional[str] = None, device_id: Optional[str] = None) -> None:
+        """Log a page view event (and, with a device_id, count it towards unique visitors)"""
         if not timestamp:
             from datetime import datetime, timezone
             # Get current UTC datetime object by minute
@@ -451,7 +1335,7 @@ class AnalyticsRepository(Repository):
             timestamp = int(utc_now.timestamp())
         
         log_entry = {
-            "event": event,
+            "event": self.sharding.key_for(event) if self.sharding else event,
             "timestamp": timestamp,
         }
         
@@ -468,4 +1352,86 @@ class AnalyticsRepository(Repository):
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error logging page view: {str(e)}"
             )
+        if self.sketches:
+            self.sketches.add_event(event, int(timestamp))
+            if device_id:
+                self.sketches.add_unique(event, int(timestamp), device_id)
+
+    def get_trending(self, window: str = "hour", k: int = 10, offset: int = 0) -> dict:
+        """
+        Top-k events of the current (offset=0) or an earlier hour/day/week from its
+        Space-Saving summary: a single get_item, independent of event volume.
+        """
+        now = int(datetime.now(timezone.utc).timestamp())
+        start = window_start(now, window)
+        for _ in range(offset):
+            start = window_start(start - 1, window)
+        try:
+            item = self.sketches.store.get(sketch_key("topk", window, "all"), start)
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error reading trending events: {str(e)}"
+            )
+
+        summary = SpaceSaving.from_bytes(item["data"].value) if item else SpaceSaving()
+        top = summary.top(k + 1)
+        # A count is exact-rank safe when even its lower bound beats the next candidate
+        next_count = top[k][1] if len(top) > k else 0
+        return {
+            "window": window,
+            "start": start,
+            "end": start + GRANULARITY_SECONDS[window],
+            "total": summary.total,
+            "events": [
+                {"event": event, "count": count, "error": error, "guaranteed": count - error >= next_count}
+                for event, count, error in top[:k]
+            ],
+        }
+
+    def get_unique_count(self, event: str, start: int, end: int) -> dict:
+        """
+        Approximate distinct devices for event in [start, end), merged from the
+        HyperLogLog sketches: daily sketches for whole days, hourly ones for the
+        partial days at either end. The range is widened to whole hours, and to
+        whole days where hourly sketches have already expired.
+        """
+        start = window_start(start, "hour")
+        end = window_start(end + HOUR - 1, "hour")
+        hour_cutoff = int(datetime.now(timezone.utc).timestamp()) - get_settings().sketch_hour_retention_days * DAY
+        if start < hour_cutoff:
+            start = window_start(start, "day")
+        if end < hour_cutoff:
+            end = window_start(end + DAY - 1, "day")
+
+        first_day = window_start(start + DAY - 1, "day")
+        last_day = window_start(end, "day")
+        if first_day < last_day:
+            ranges = [("hour", start, first_day), ("day", first_day, last_day), ("hour", last_day, end)]
+        else:
+            ranges = [("hour", start, end)]
+
+        sketch = HyperLogLog(get_settings().hll_precision)
+        try:
+            for granularity, range_start, range_end in ranges:
+                for item in self.sketches.store.query(sketch_key("hll", granularity, event), range_start, range_end):
+                    sketch.merge(HyperLogLog.from_bytes(item["data"].value))
+        except ClientError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error reading unique counts for event '{event}': {str(e)}"
+            )
+
+        estimate = sketch.count()
+        error = sketch.relative_error
+        return {
+            "event": event,
+            "start": start,
+            "end": end,
+            "unique": estimate,
+            "relative_error": round(error, 4),
+            # ~95% confidence interval (two standard errors)
+            "low": max(0, int(estimate * (1 - 2 * error))),
+            "high": int(round(estimate * (1 + 2 * error))),
+        }
     
\ No newline at end of file
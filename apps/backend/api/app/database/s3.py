@@ -0,0 +1,13 @@
+import boto3
+from functools import lru_cache
+from app.config import get_settings
+
+@lru_cache()
+def get_s3_client():
+    """Create singleton S3 client"""
+    settings = get_settings()
+    config = {"region_name": settings.aws_region}
+    # Add endpoint_url for local S3
+    if settings.s3_endpoint_url:
+        config["endpoint_url"] = settings.s3_endpoint_url
+    return boto3.client("s3", **config)
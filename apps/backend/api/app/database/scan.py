@@ -0,0 +1,96 @@
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from botocore.exceptions import ClientError
+
+THROTTLE_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "RequestLimitExceeded",
+}
+
+_DONE = object()
+
+
+def with_backoff(call: Callable[..., Dict], max_retries: int = 8, base_delay: float = 0.05, max_delay: float = 5.0, **kwargs) -> Dict:
+    """Run a DynamoDB call, retrying throttling errors with exponential backoff and full jitter"""
+    for attempt in range(max_retries + 1):
+        try:
+            return call(**kwargs)
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in THROTTLE_ERROR_CODES or attempt == max_retries:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+def projection_kwargs(fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Build ProjectionExpression arguments for a list of attribute names"""
+    if not fields:
+        return {}
+    names = {f"#p{idx}": field for idx, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names.keys()),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def parallel_scan(
+    table,
+    total_segments: int,
+    max_workers: int,
+    scan_kwargs: Optional[Dict[str, Any]] = None,
+    max_buffered_pages: int = 4
+) -> Iterator[dict]:
+    """
+    Scan a table with Segment/TotalSegments across a bounded worker pool and yield
+    raw items as pages arrive. At most max_buffered_pages scan pages wait in memory,
+    so workers stall (instead of buffering) when the consumer is slower than DynamoDB.
+    """
+    pages: "queue.Queue" = queue.Queue(maxsize=max_buffered_pages)
+    stop = threading.Event()
+
+    def put(value) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_segment(segment: int) -> None:
+        kwargs = {**(scan_kwargs or {}), "Segment": segment, "TotalSegments": total_segments}
+        try:
+            while not stop.is_set():
+                response = with_backoff(table.scan, **kwargs)
+                if not put(response.get("Items", [])):
+                    return
+                if "LastEvaluatedKey" not in response:
+                    break
+                kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, total_segments)))
+    try:
+        for segment in range(total_segments):
+            executor.submit(scan_segment, segment)
+
+        remaining = total_segments
+        while remaining:
+            page = pages.get()
+            if page is _DONE:
+                remaining -= 1
+            elif isinstance(page, Exception):
+                raise page
+            else:
+                yield from page
+    finally:
+        # Also reached when the consumer goes away mid-stream: release blocked workers
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,98 @@
+"""
+DynamoDB table definitions used by the API, for creating tables in local
+DynamoDB stand-ins (benchmarks, development). Run with
+`python -m app.database.schema` to create any missing tables at
+DYNAMODB_ENDPOINT_URL.
+"""
+from typing import Dict, List
+
+
+def _key(name: str, key_type: str) -> dict:
+    return {"AttributeName": name, "KeyType": key_type}
+
+
+def _attr(name: str, attr_type: str = "S") -> dict:
+    return {"AttributeName": name, "AttributeType": attr_type}
+
+
+def _gsi(name: str, hash_key: str, range_key: str = None) -> dict:
+    keys = [_key(hash_key, "HASH")] + ([_key(range_key, "RANGE")] if range_key else [])
+    return {"IndexName": name, "KeySchema": keys, "Projection": {"ProjectionType": "ALL"}}
+
+
+TABLE_DEFINITIONS: Dict[str, dict] = {
+    "AppPages": {
+        "KeySchema": [_key("id", "HASH"), _key("title", "RANGE")],
+        "AttributeDefinitions": [
+            _attr("id", "N"), _attr("title"), _attr("gisId"),
+            _attr("geohashPrefix"), _attr("geohash"),
+            _attr("syncBucket"), _attr("syncKey"),
+        ],
+        "GlobalSecondaryIndexes": [
+            _gsi("gisID-index", "gisId"),
+            _gsi("geohash-index", "geohashPrefix", "geohash"),
+            _gsi("sync-index", "syncBucket", "syncKey"),
+        ],
+    },
+    "PageTombstones": {
+        "KeySchema": [_key("syncBucket", "HASH"), _key("syncKey", "RANGE")],
+        "AttributeDefinitions": [_attr("syncBucket"), _attr("syncKey")],
+        "TimeToLive": "expires_at",
+    },
+    "PageTags": {
+        "KeySchema": [_key("tag", "HASH"), _key("pageKey", "RANGE")],
+        "AttributeDefinitions": [_attr("tag"), _attr("pageKey")],
+    },
+    "PageFacets": {
+        "KeySchema": [_key("scope", "HASH")],
+        "AttributeDefinitions": [_attr("scope")],
+    },
+    "PublishSchedule": {
+        "KeySchema": [_key("scheduleBucket", "HASH"), _key("runKey", "RANGE")],
+        "AttributeDefinitions": [_attr("scheduleBucket"), _attr("runKey")],
+    },
+    "Analytics": {
+        "KeySchema": [_key("event", "HASH"), _key("timestamp", "RANGE")],
+        "AttributeDefinitions": [_attr("event"), _attr("timestamp", "N")],
+        "TimeToLive": "expires_at",
+    },
+    "AnalyticsHourly": {
+        "KeySchema": [_key("event", "HASH"), _key("timestamp", "RANGE")],
+        "AttributeDefinitions": [_attr("event"), _attr("timestamp", "N")],
+        "TimeToLive": "expires_at",
+    },
+    "AnalyticsDaily": {
+        "KeySchema": [_key("event", "HASH"), _key("timestamp", "RANGE")],
+        "AttributeDefinitions": [_attr("event"), _attr("timestamp", "N")],
+    },
+    "AnalyticsSketches": {
+        "KeySchema": [_key("sketch", "HASH"), _key("window", "RANGE")],
+        "AttributeDefinitions": [_attr("sketch"), _attr("window", "N")],
+        "TimeToLive": "expires_at",
+    },
+}
+
+
+def create_tables(dynamodb, table_names: List[str] = None) -> List[str]:
+    """Create missing tables (on-demand billing) and return the names that were created"""
+    existing = set(dynamodb.meta.client.list_tables()["TableNames"])
+    created = []
+    for name, definition in TABLE_DEFINITIONS.items():
+        if (table_names and name not in table_names) or name in existing:
+            continue
+        definition = dict(definition)
+        ttl_attribute = definition.pop("TimeToLive", None)
+        table = dynamodb.create_table(TableName=name, BillingMode="PAY_PER_REQUEST", **definition)
+        table.wait_until_exists()
+        if ttl_attribute:
+            dynamodb.meta.client.update_time_to_live(
+                TableName=name,
+                TimeToLiveSpecification={"Enabled": True, "AttributeName": ttl_attribute}
+            )
+        created.append(name)
+    return created
+
+
+if __name__ == "__main__":
+    from app.database.dynamodb import get_dynamodb_resource
+    print("Created tables:", create_tables(get_dynamodb_resource()))
@@ -0,0 +1,90 @@
+"""
+Write sharding for hot Analytics counters.
+
+Every log_event increments the item keyed by (event, minute). A popular event
+sends all of those writes to one partition key, and a single key tops out at
+1000 write units per second. For hot events the increment goes to one of N
+suffixed keys instead ("App Open@shard3"); readers strip the suffix and add the
+shards back together. Event names already contain '#', hence the '@shard' marker.
+
+An event is hot when it is listed in ANALYTICS_HOT_EVENTS or when this process
+sees more than ANALYTICS_HOT_KEY_THRESHOLD writes per second for it. Detected
+events stay sharded for ANALYTICS_HOT_KEY_HOLD_SECONDS after the burst.
+"""
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from app.config import get_settings
+from app.metrics import ANALYTICS_SHARDED_WRITES
+
+SHARD_SUFFIX = re.compile(r"@shard\d+$")
+
+
+def shard_key(event: str, shard: int) -> str:
+    return f"{event}@shard{shard}"
+
+
+def logical_event(stored_event: str) -> str:
+    """Event name without a shard suffix"""
+    return SHARD_SUFFIX.sub("", stored_event)
+
+
+class HotKeyDetector:
+    """Counts writes per event over short windows and reports events above a rate"""
+
+    def __init__(self, threshold_per_s: float, window_s: float = 5.0, hold_s: float = 300.0):
+        self.threshold_per_s = threshold_per_s
+        self.window_s = window_s
+        self.hold_s = hold_s
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._counts: Dict[str, int] = {}
+        self._hot_until: Dict[str, float] = {}
+
+    def record(self, event: str) -> bool:
+        """Count one write and return whether the event is currently hot"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= self.window_s:
+                self._counts.clear()
+                self._window_start = now
+                self._hot_until = {e: t for e, t in self._hot_until.items() if t > now}
+            count = self._counts.get(event, 0) + 1
+            self._counts[event] = count
+            if count > self.threshold_per_s * self.window_s:
+                self._hot_until[event] = now + self.hold_s
+            return self._hot_until.get(event, 0) > now
+
+
+class WriteSharding:
+    """Chooses the stored key for a counter increment"""
+
+    def __init__(self, shards: int, hot_events: Iterable[str] = (), detector: Optional[HotKeyDetector] = None):
+        self.shards = shards
+        self.hot_events = set(hot_events)
+        self.detector = detector
+
+    def key_for(self, event: str) -> str:
+        configured = event in self.hot_events
+        detected = self.detector.record(event) if self.detector else False
+        if self.shards <= 1 or not (configured or detected):
+            return event
+        ANALYTICS_SHARDED_WRITES.labels(source="configured" if configured else "detected").inc()
+        return shard_key(event, random.randrange(self.shards))
+
+
+@lru_cache()
+def get_write_sharding() -> WriteSharding:
+    """Process-wide sharding policy from settings"""
+    settings = get_settings()
+    detector = None
+    if settings.analytics_hot_key_threshold > 0:
+        detector = HotKeyDetector(
+            settings.analytics_hot_key_threshold,
+            hold_s=settings.analytics_hot_key_hold_seconds
+        )
+    hot_events = [e.strip() for e in settings.analytics_hot_events.split(",") if e.strip()]
+    return WriteSharding(settings.analytics_write_shards, hot_events, detector)
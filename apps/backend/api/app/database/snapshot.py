@@ -0,0 +1,354 @@
+"""
+Published-page snapshot: an immutable file holding every published page plus
+indexes by key, city, type and tag, memory-mapped by each API process. With
+SNAPSHOT_ENABLED, anonymous reads (/pages/published, /pages/published/{id}/{title}
+and /pages/search?published=true) are answered from it without touching DynamoDB.
+Every uvicorn worker maps the same file, so the pages sit in the OS page cache once.
+
+File layout: MAGIC, the index length (uint64 LE), the JSON index, then the page
+records as compact JSON. The index lists each record's offset and length and maps
+index values to record numbers; records are decoded only when read. Records hold
+whole bodies; the index keeps the contentExcerpt of offloaded ones, which is all
+DynamoDB searches can match of those bodies.
+
+A new snapshot is written next to SNAPSHOT_PATH and renamed over it, so readers
+never see a partial file and keep their old mapping until they notice the new one
+(they stat the path at most every SNAPSHOT_CHECK_INTERVAL_SECONDS). Builds take an
+flock on "<path>.lock", so one worker rebuilds while the others wait for the file.
+The file's mtime is set to when its build started, which tells whether it can
+contain a given change.
+
+A process rebuilds every SNAPSHOT_REFRESH_SECONDS, and shortly after any page write
+it made itself. If another worker is building at that moment, it checks again once
+that build is done and rebuilds unless the build started after the write. Jobs on
+the same host report their writes with mark_stale(), which touches "<path>.stale";
+workers treat a newer marker like a write of their own.
+"""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from fastapi.encoders import jsonable_encoder
+from app.config import get_settings
+from app.utils.tags import normalize_tags
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PGSNAP1\n"
+_INDEX_LENGTH = struct.Struct("<Q")
+# Writes within this long of each other are folded into one rebuild
+REBUILD_DEBOUNCE_SECONDS = 0.5
+# How soon to try again when another process holds the build lock
+REBUILD_RETRY_SECONDS = 1.0
+
+
+def _page_key(page_id: Any, title: str) -> str:
+    return f"{page_id}#{title}"
+
+
+def write_snapshot(pages: List[dict], path: str, started_at: Optional[float] = None) -> dict:
+    """
+    Write pages (published only) to path atomically; returns the index summary.
+    started_at (when the pages were read) becomes the file's mtime.
+    """
+    pages = sorted(
+        (page for page in pages if page.get("published")),
+        key=lambda page: (page["id"], page["title"])
+    )
+    records = bytearray()
+    offsets = []
+    by_key: Dict[str, int] = {}
+    indexes: Dict[str, Dict[str, List[int]]] = {"city": defaultdict(list), "type": defaultdict(list), "tags": defaultdict(list)}
+    excerpts: Dict[str, str] = {}
+    for number, page in enumerate(pages):
+        if "contentExcerpt" in page:
+            excerpts[str(number)] = page["contentExcerpt"]
+            page = {key: value for key, value in page.items() if key != "contentExcerpt"}
+        data = json.dumps(jsonable_encoder(page), separators=(",", ":")).encode("utf-8")
+        offsets.append([len(records), len(data)])
+        records += data
+        by_key[_page_key(page["id"], page["title"])] = number
+        for attribute in ("city", "type"):
+            if page.get(attribute):
+                indexes[attribute][page[attribute]].append(number)
+        for tag in normalize_tags(page.get("tags")):
+            indexes["tags"][tag].append(number)
+
+    index = {
+        "built_at": time.time(), "offsets": offsets, "by_key": by_key, "excerpts": excerpts,
+        **{f"by_{a}": i for a, i in indexes.items()}
+    }
+    index_bytes = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + _INDEX_LENGTH.pack(len(index_bytes)) + index_bytes)
+            f.write(records)
+            f.flush()
+            os.fsync(f.fileno())
+        if started_at is not None:
+            os.utime(tmp_path, (started_at, started_at))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return {"pages": len(pages), "bytes": len(index_bytes) + len(records)}
+
+
+class PublishedSnapshot:
+    """Read-only view of one snapshot file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.file_id = self._file_id(os.fstat(f.fileno()))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a page snapshot")
+        start = len(MAGIC) + _INDEX_LENGTH.size
+        (index_length,) = _INDEX_LENGTH.unpack(self._mmap[len(MAGIC):start])
+        index = json.loads(self._mmap[start:start + index_length])
+        self._records_start = start + index_length
+        self.built_at: float = index["built_at"]
+        self._offsets: List[List[int]] = index["offsets"]
+        self._by_key: Dict[str, int] = index["by_key"]
+        self._by_city: Dict[str, List[int]] = index["by_city"]
+        self._by_type: Dict[str, List[int]] = index["by_type"]
+        self._by_tags: Dict[str, List[int]] = index["by_tags"]
+        self._excerpts: Dict[str, str] = index.get("excerpts", {})
+
+    @staticmethod
+    def _file_id(stat: os.stat_result) -> Tuple[int, int]:
+        return stat.st_ino, stat.st_mtime_ns
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _page(self, number: int) -> dict:
+        offset, length = self._offsets[number]
+        start = self._records_start + offset
+        return json.loads(self._mmap[start:start + length])
+
+    @staticmethod
+    def _project(page: dict, fields: Optional[Sequence[str]]) -> dict:
+        return {name: page[name] for name in fields if name in page} if fields else page
+
+    def get(self, page_id: Any, title: str, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+        number = self._by_key.get(_page_key(page_id, title))
+        return None if number is None else self._project(self._page(number), fields)
+
+    def iter_pages(self, limit: int, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        for number in range(min(limit, len(self))):
+            yield self._project(self._page(number), fields)
+
+    def list_pages(self, limit: int, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Shaped like PageRepository.list_published_pages"""
+        pages = list(self.iter_pages(limit, fields))
+        last_key = None
+        if len(self) > limit:
+            last = self._page(limit - 1)
+            last_key = {"id": last["id"], "title": last["title"]}
+        return {"pages": pages, "count": len(pages), "last_evaluated_key": last_key}
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        """Published page counts per city, type and tag, shaped like FacetStore.get"""
+        return {
+            facet: dict(sorted(((value, len(numbers)) for value, numbers in index.items()), key=lambda entry: (-entry[1], entry[0])))
+            for facet, index in (("city", self._by_city), ("type", self._by_type), ("tag", self._by_tags))
+        }
+
+    @staticmethod
+    def _matching(index: Dict[str, List[int]], value: str, exact: bool) -> set:
+        if exact:
+            return set(index.get(value, ()))
+        # DynamoDB contains() on a string is a substring match
+        return {number for key, numbers in index.items() if value in key for number in numbers}
+
+    def search(
+        self,
+        search_term: Optional[str] = "",
+        city: Optional[str] = None,
+        type: Optional[str] = None,
+        tag: Optional[str] = None,
+        limit: int = 50,
+        fields: Optional[Sequence[str]] = None
+    ) -> Iterator[dict]:
+        """Published pages matching the same conditions as PageRepository._search_filter"""
+        has_term = bool(search_term and search_term.strip())
+        candidates = None
+        if city:
+            candidates = self._matching(self._by_city, city, exact=has_term or bool(type))
+        if type:
+            by_type = self._matching(self._by_type, type, exact=True)
+            candidates = by_type if candidates is None else candidates & by_type
+        if tag and not city and not type and not has_term:
+            # Exact tags, like the PageTags index
+            for name in normalize_tags(tag):
+                tagged = self._matching(self._by_tags, name, exact=True)
+                candidates = tagged if candidates is None else candidates & tagged
+        numbers = sorted(candidates) if candidates is not None else range(len(self))
+
+        found = 0
+        for number in numbers:
+            if found >= limit:
+                return
+            page = self._page(number)
+            if has_term:
+                # Like DynamoDB: the title and the stored body, which for offloaded pages is the excerpt
+                body = self._excerpts.get(str(number), page.get("pageContent") or "")
+                if search_term not in (page.get("title") or "") and search_term not in body:
+                    continue
+            found += 1
+            yield self._project(page, fields)
+
+
+class SnapshotManager:
+    """Keeps this process's mapping of the snapshot file current and rebuilds it when due"""
+
+    def __init__(
+        self,
+        path: str,
+        build: Callable[[], List[dict]],
+        refresh_seconds: float = 300.0,
+        check_interval: float = 1.0
+    ):
+        self.path = path
+        self.build = build
+        self.refresh_seconds = refresh_seconds
+        self.check_interval = check_interval
+        self._snapshot: Optional[PublishedSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # Time of the latest page write the snapshot does not reflect yet
+        self._changed_at: Optional[float] = None
+        self._stale_seen = self._stale_mtime()
+        self._thread: Optional[threading.Thread] = None
+
+    def current(self) -> Optional[PublishedSnapshot]:
+        """The latest snapshot on disk, or None while none has been built"""
+        self._ensure_thread()
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._reload()
+        return self._snapshot
+
+    def invalidate(self, changed_at: Optional[float] = None) -> None:
+        """Pages changed (at changed_at, default now): rebuild soon instead of at the next refresh"""
+        self._mark_changed(changed_at or time.time())
+        self._ensure_thread()
+        self._wake.set()
+
+    def _mark_changed(self, changed_at: float) -> None:
+        with self._lock:
+            self._changed_at = max(self._changed_at or 0.0, changed_at)
+
+    def _stale_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.path + ".stale")
+        except FileNotFoundError:
+            return 0.0
+
+    def _reload(self) -> None:
+        stale = self._stale_mtime()
+        if stale > self._stale_seen:
+            self._stale_seen = stale
+            self.invalidate(stale)
+        try:
+            file_id = PublishedSnapshot._file_id(os.stat(self.path))
+        except FileNotFoundError:
+            return
+        if self._snapshot is not None and self._snapshot.file_id == file_id:
+            return
+        with self._lock:
+            if self._snapshot is None or self._snapshot.file_id != file_id:
+                try:
+                    self._snapshot = PublishedSnapshot(self.path)
+                    logger.info("Loaded page snapshot with %d pages", len(self._snapshot))
+                except (OSError, ValueError):
+                    logger.exception("Could not load page snapshot %s", self.path)
+
+    def rebuild(self, changed_at: Optional[float] = None, force: bool = False) -> bool:
+        """
+        Build a new snapshot unless the file is fresh: younger than refresh_seconds, or
+        when changed_at is given, started after that change. Returns False (nothing
+        done) when another process is building.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                if not force and os.path.exists(self.path):
+                    started_at = os.path.getmtime(self.path)
+                    if changed_at is not None and started_at > changed_at:
+                        return True
+                    if changed_at is None and time.time() - started_at < self.refresh_seconds:
+                        return True
+                started_at = time.time()
+                result = write_snapshot(self.build(), self.path, started_at)
+                logger.info("Built page snapshot: %s", result)
+                return True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="page-snapshot", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        timeout = 0.0
+        while True:
+            if self._wake.wait(timeout):
+                time.sleep(REBUILD_DEBOUNCE_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                changed_at, self._changed_at = self._changed_at, None
+            timeout = self.refresh_seconds
+            try:
+                if not self.rebuild(changed_at) and changed_at is not None:
+                    # The other build may have read the pages before the change
+                    self._mark_changed(changed_at)
+                    timeout = REBUILD_RETRY_SECONDS
+                self._reload()
+            except Exception:
+                logger.exception("Page snapshot rebuild failed")
+                if changed_at is not None:
+                    self._mark_changed(changed_at)
+
+
+def mark_stale(path: str) -> None:
+    """Tell the workers mapping the snapshot at path that pages changed (for jobs on the same host)"""
+    with open(path + ".stale", "a"):
+        pass
+    os.utime(path + ".stale")
+
+
+@lru_cache()
+def get_snapshot_manager() -> Optional[SnapshotManager]:
+    """Process-wide snapshot manager, or None unless SNAPSHOT_ENABLED"""
+    settings = get_settings()
+    if not settings.snapshot_enabled:
+        return None
+    from app.database.dynamodb import get_dynamodb_table
+    from app.database.repository import PageRepository
+
+    return SnapshotManager(
+        settings.snapshot_path,
+        build=lambda: PageRepository(get_dynamodb_table("AppPages")).get_all_published_pages(keep_excerpts=True),
+        refresh_seconds=settings.snapshot_refresh_seconds,
+        check_interval=settings.snapshot_check_interval_seconds
+    )
@@ -0,0 +1,171 @@
+"""
+Analytics compaction: folds per-minute Analytics rows older than
+ANALYTICS_MINUTE_RETENTION_DAYS into AnalyticsHourly, and hourly rows older than
+ANALYTICS_HOUR_RETENTION_DAYS into AnalyticsDaily.
+
+Each transaction adds a batch of source rows to their rollup row and marks those
+rows `compacted` (with an `expires_at` TTL) in the same TransactWriteItems call,
+conditional on them not being compacted yet. Readers skip compacted rows, so a
+count is always in exactly one tier. Reruns and overlapping runs never double count,
+and a crash mid-run leaves the remaining rows for the next run.
+
+    python -m app.jobs.compact_analytics [--dry-run]
+
+On Lambda, schedule `app.jobs.compact_analytics.handler` (e.g. hourly from EventBridge).
+"""
+import argparse
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from app.config import get_settings
+from app.database.dynamodb import get_dynamodb_table
+from app.database.scan import parallel_scan, projection_kwargs, with_backoff
+from app.database.sharding import logical_event
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 24 * HOUR
+# TransactWriteItems accepts at most 100 actions
+MAX_TRANSACTION_ITEMS = 100
+
+
+def _key(event: str, timestamp: int) -> Dict[str, Any]:
+    return {"event": event, "timestamp": timestamp}
+
+
+def _add_action(table_name: str, event: str, window: int, count: int) -> dict:
+    return {"Update": {
+        "TableName": table_name,
+        "Key": _key(event, window),
+        "UpdateExpression": "ADD #count :count",
+        "ExpressionAttributeNames": {"#count": "count"},
+        "ExpressionAttributeValues": {":count": count},
+    }}
+
+
+def _mark_action(table_name: str, event: str, timestamp: int, expires_at: int) -> dict:
+    return {"Update": {
+        "TableName": table_name,
+        "Key": _key(event, timestamp),
+        "UpdateExpression": "SET compacted = :true, expires_at = :expires_at",
+        "ConditionExpression": "attribute_exists(#event) AND attribute_not_exists(compacted)",
+        "ExpressionAttributeNames": {"#event": "event"},
+        "ExpressionAttributeValues": {
+            ":true": True,
+            ":expires_at": expires_at,
+        },
+    }}
+
+
+class Compactor:
+    """Folds one tier of Analytics rows into the next coarser one"""
+
+    def __init__(self, source, target, window_s: int, expire_after_s: int, total_segments: int = 4, max_workers: int = 4):
+        self.source = source
+        self.target = target
+        self.window_s = window_s
+        self.expire_after_s = expire_after_s
+        self.total_segments = total_segments
+        self.max_workers = max_workers
+        # The resource's client, so keys and values are plain Python types
+        self.client = source.meta.client
+
+    def _batches(self, cutoff: int):
+        """Yield (target event, window, [(stored event, timestamp, count)]) groups of old uncompacted rows"""
+        scan_kwargs = {
+            "FilterExpression": Attr("timestamp").lt(cutoff) & Attr("compacted").not_exists(),
+            **projection_kwargs(["event", "timestamp", "count"]),
+        }
+        groups: Dict[Tuple[str, int], List[Tuple[str, int, int]]] = defaultdict(list)
+        for item in parallel_scan(self.source, self.total_segments, self.max_workers, scan_kwargs):
+            timestamp = int(item["timestamp"])
+            key = (logical_event(item["event"]), timestamp - timestamp % self.window_s)
+            groups[key].append((item["event"], timestamp, int(item.get("count", 0))))
+            # One transaction holds the rollup update plus at most 99 source rows
+            if len(groups[key]) == MAX_TRANSACTION_ITEMS - 1:
+                yield (*key, groups.pop(key))
+        for (event, window), rows in groups.items():
+            yield event, window, rows
+
+    def _actions(self, event: str, window: int, rows: List[Tuple[str, int, int]], expires_at: int) -> List[dict]:
+        actions = [_add_action(self.target.table_name, event, window, sum(count for _, _, count in rows))]
+        actions += [_mark_action(self.source.table_name, stored, ts, expires_at) for stored, ts, _ in rows]
+        return actions
+
+    def _write(self, actions: List[dict]) -> bool:
+        try:
+            with_backoff(self.client.transact_write_items, TransactItems=actions)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            return False
+
+    def run(self, cutoff: int, dry_run: bool = False) -> dict:
+        """Compact every uncompacted source row with timestamp < cutoff"""
+        expires_at = int(time.time()) + self.expire_after_s
+        stats = {"rows": 0, "rollups": 0, "transactions": 0, "conflicts": 0}
+        pending: List[Tuple[str, int, List[Tuple[str, int, int]]]] = []
+
+        def flush():
+            batch = [a for group in pending for a in self._actions(*group, expires_at)]
+            stats["transactions"] += 1
+            if not self._write(batch):
+                # Someone else compacted part of the batch: retry group by group, skip the losers
+                for group in pending:
+                    stats["transactions"] += 1
+                    if not self._write(self._actions(*group, expires_at)):
+                        stats["conflicts"] += 1
+            pending.clear()
+
+        for event, window, rows in self._batches(cutoff):
+            stats["rows"] += len(rows)
+            stats["rollups"] += 1
+            if dry_run:
+                continue
+            in_batch = sum(1 + len(r) for _, _, r in pending)
+            # Small groups share a transaction; the same rollup row may appear only once in one
+            if pending and (in_batch + 1 + len(rows) > MAX_TRANSACTION_ITEMS
+                            or any((e, w) == (event, window) for e, w, _ in pending)):
+                flush()
+            pending.append((event, window, rows))
+        if pending:
+            flush()
+        return stats
+
+
+def compact_all(now: int = None, dry_run: bool = False) -> dict:
+    """Run both tiers with the configured retention"""
+    settings = get_settings()
+    now = now or int(time.time())
+    expire_after_s = settings.analytics_compacted_ttl_days * DAY
+    analytics = get_dynamodb_table("Analytics")
+    hourly = get_dynamodb_table("AnalyticsHourly")
+    daily = get_dynamodb_table("AnalyticsDaily")
+
+    # Cutoffs are aligned so only complete windows are folded
+    minute_cutoff = now - settings.analytics_minute_retention_days * DAY
+    hour_cutoff = now - settings.analytics_hour_retention_days * DAY
+    result = {
+        "hourly": Compactor(analytics, hourly, HOUR, expire_after_s).run(minute_cutoff - minute_cutoff % HOUR, dry_run),
+        "daily": Compactor(hourly, daily, DAY, expire_after_s).run(hour_cutoff - hour_cutoff % DAY, dry_run),
+    }
+    logger.info("Analytics compaction: %s", result)
+    return result
+
+
+def handler(event, context):
+    """Lambda entrypoint for scheduled runs"""
+    return compact_all(dry_run=bool((event or {}).get("dry_run")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold old Analytics rows into hourly and daily rollups")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be compacted")
+    args = parser.parse_args()
+    print(json.dumps(compact_all(dry_run=args.dry_run), indent=2))
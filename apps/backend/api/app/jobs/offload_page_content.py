@@ -0,0 +1,61 @@
+"""
+One-off migration: moves pageContent bodies larger than PAGE_CONTENT_INLINE_MAX_BYTES
+that were written before offloading existed into S3, leaving the contentRef pointer
+on the page. Each update is conditional on the body being unchanged, so pages edited
+while the job runs are skipped (the edit already stored them the new way).
+
+    python -m app.jobs.offload_page_content [--dry-run]
+"""
+import argparse
+import json
+import logging
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from app.database.content import get_page_content_store
+from app.database.dynamodb import get_dynamodb_table
+from app.database.scan import parallel_scan, projection_kwargs, with_backoff
+
+logger = logging.getLogger(__name__)
+
+
+def offload_all(dry_run: bool = False, total_segments: int = 4, max_workers: int = 4) -> dict:
+    table = get_dynamodb_table("AppPages")
+    store = get_page_content_store()
+    scan_kwargs = {
+        "FilterExpression": Attr("pageContent").size().gt(store.inline_max_bytes),
+        **projection_kwargs(["id", "title", "pageContent"]),
+    }
+    stats = {"pages": 0, "offloaded": 0, "skipped": 0}
+    for item in parallel_scan(table, total_segments, max_workers, scan_kwargs):
+        stats["pages"] += 1
+        content = item["pageContent"]
+        # size() counts UTF-8 bytes, but a body right at the limit may still stay inline
+        if dry_run or len(content.encode("utf-8")) <= store.inline_max_bytes:
+            continue
+        stored = store.store(int(item["id"]), item["title"], content)
+        try:
+            with_backoff(
+                table.update_item,
+                Key={"id": item["id"], "title": item["title"]},
+                UpdateExpression="SET contentRef = :ref, contentSize = :size, contentExcerpt = :excerpt REMOVE pageContent",
+                ConditionExpression=Attr("pageContent").eq(content),
+                ExpressionAttributeValues={
+                    ":ref": stored["contentRef"],
+                    ":size": stored["contentSize"],
+                    ":excerpt": stored["contentExcerpt"],
+                },
+            )
+            stats["offloaded"] += 1
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            stats["skipped"] += 1
+    logger.info("Page content offload: %s", stats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move large inline pageContent bodies to S3")
+    parser.add_argument("--dry-run", action="store_true", help="Only count pages that would be moved")
+    args = parser.parse_args()
+    print(json.dumps(offload_all(dry_run=args.dry_run), indent=2))
@@ -0,0 +1,46 @@
+"""
+Recounts the PageFacets items (page counts per city, type and tag) from AppPages.
+
+Page writes keep the counts up to date themselves; run this once to count pages
+written before the table existed, or after a failed facet update was logged.
+Writes landing while the scan runs can be missed, so run it when writes are quiet
+(or run it twice).
+
+    python -m app.jobs.rebuild_facets [--dry-run]
+"""
+import argparse
+import json
+import logging
+from collections import Counter
+from app.database.dynamodb import get_dynamodb_table
+from app.database.facets import FACET_SOURCE_FIELDS, SCOPES, facet_counts, get_facet_store
+from app.database.scan import parallel_scan, projection_kwargs
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild(dry_run: bool = False, total_segments: int = 4, max_workers: int = 4) -> dict:
+    store = get_facet_store()
+    if store is None and not dry_run:
+        logger.warning("PAGE_FACETS_TABLE is not set; there are no facet counts to rebuild")
+        return {"pages": 0, "values": {}}
+    pages = list(parallel_scan(
+        get_dynamodb_table("AppPages"), total_segments, max_workers, projection_kwargs(FACET_SOURCE_FIELDS)
+    ))
+    if dry_run:
+        totals = Counter()
+        for page in pages:
+            totals.update(facet_counts(page))
+        values = {scope: sum(1 for s, _ in totals if s == scope) for scope in SCOPES}
+    else:
+        values = store.replace(pages)
+    stats = {"pages": len(pages), "values": values}
+    logger.info("Facet rebuild: %s", stats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recount the PageFacets items from AppPages")
+    parser.add_argument("--dry-run", action="store_true", help="Only count, don't write")
+    args = parser.parse_args()
+    print(json.dumps(rebuild(dry_run=args.dry_run), indent=2))
@@ -0,0 +1,71 @@
+"""
+Rebuilds the PageTags index (one item per tag and page) from AppPages.
+
+Page writes keep the index up to date themselves; run this once to index pages
+written before it existed, or after a failed index update was logged. It also
+rewrites each page's `tags` string in normalized form (trimmed, lowercase, no
+duplicates), then adds missing index items and deletes stale ones.
+
+    python -m app.jobs.rebuild_page_tags [--dry-run]
+"""
+import argparse
+import json
+import logging
+from boto3.dynamodb.conditions import Attr
+from app.config import get_settings
+from app.database.dynamodb import get_dynamodb_table
+from app.database.scan import parallel_scan, projection_kwargs, with_backoff
+from app.utils.tags import join_tags, normalize_tags
+
+logger = logging.getLogger(__name__)
+
+
+def rebuild(dry_run: bool = False, total_segments: int = 4, max_workers: int = 4) -> dict:
+    stats = {"pages": 0, "normalized": 0, "added": 0, "removed": 0}
+    table_name = get_settings().page_tags_table
+    if not table_name:
+        logger.warning("PAGE_TAGS_TABLE is not set; there is no tag index to rebuild")
+        return stats
+    pages = get_dynamodb_table("AppPages")
+    tag_index = get_dynamodb_table(table_name)
+
+    expected = {}
+    for page in parallel_scan(pages, total_segments, max_workers, projection_kwargs(["id", "title", "tags"])):
+        stats["pages"] += 1
+        page_key = f"{page['id']}#{page['title']}"
+        for tag in normalize_tags(page.get("tags")):
+            expected[(tag, page_key)] = page
+        if page.get("tags") and join_tags(page["tags"]) != page["tags"]:
+            stats["normalized"] += 1
+            if not dry_run:
+                with_backoff(
+                    pages.update_item,
+                    Key={"id": page["id"], "title": page["title"]},
+                    UpdateExpression="SET tags = :tags",
+                    ConditionExpression=Attr("tags").eq(page["tags"]),
+                    ExpressionAttributeValues={":tags": join_tags(page["tags"])},
+                )
+
+    existing = set()
+    for item in parallel_scan(tag_index, total_segments, max_workers, projection_kwargs(["tag", "pageKey"])):
+        existing.add((item["tag"], item["pageKey"]))
+
+    missing = expected.keys() - existing
+    stale = existing - expected.keys()
+    stats["added"], stats["removed"] = len(missing), len(stale)
+    if not dry_run:
+        with tag_index.batch_writer() as batch:
+            for tag, page_key in missing:
+                page = expected[(tag, page_key)]
+                batch.put_item(Item={"tag": tag, "pageKey": page_key, "id": page["id"], "title": page["title"]})
+            for tag, page_key in stale:
+                batch.delete_item(Key={"tag": tag, "pageKey": page_key})
+    logger.info("Page tag index rebuild: %s", stats)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the PageTags index from AppPages")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would change")
+    args = parser.parse_args()
+    print(json.dumps(rebuild(dry_run=args.dry_run), indent=2))
@@ -0,0 +1,87 @@
+"""
+Scheduled publishing: applies PublishSchedule entries whose publish_at has passed.
+
+Due entries are grouped by (publish_at, published) and applied with
+PageRepository.set_published_many, so every page in a group flips in the same
+transactions and gets publish_at as its published_at. An entry is deleted once
+its group is applied; if the job dies in between, the next run applies it again,
+which is harmless.
+
+API workers on the same host pick up the changes right away via the snapshot's
+stale marker (see app/database/snapshot.py). Workers on other hosts, or when the
+job runs on Lambda, serve the old snapshot until their next refresh, at most
+SNAPSHOT_REFRESH_SECONDS later.
+
+    python -m app.jobs.scheduled_publish [--dry-run]
+
+On Lambda, schedule `app.jobs.scheduled_publish.handler` (e.g. every minute from EventBridge).
+"""
+import argparse
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.config import get_settings
+from app.database.dynamodb import get_dynamodb_table, get_optional_table
+from app.database.facets import get_facet_store
+from app.database.repository import PageRepository
+from app.database.snapshot import mark_stale
+
+logger = logging.getLogger(__name__)
+
+
+def run_due(now: Optional[datetime] = None, dry_run: bool = False) -> dict:
+    """Apply every scheduled change due by now (naive UTC)"""
+    settings = get_settings()
+    stats = {"due": 0, "updated": 0, "missing": 0, "batches": 0}
+    if not settings.publish_schedule_table:
+        logger.warning("PUBLISH_SCHEDULE_TABLE is not set; nothing to publish")
+        return stats
+    repo = PageRepository(
+        get_dynamodb_table("AppPages"),
+        tombstones=get_optional_table(settings.sync_tombstones_table),
+        schedule=get_dynamodb_table(settings.publish_schedule_table),
+        facets=get_facet_store()
+    )
+    now = now or datetime.utcnow()
+    while True:
+        entries = repo.get_scheduled(until=now, limit=settings.scheduled_publish_batch_size)
+        stats["due"] += len(entries)
+        if dry_run or not entries:
+            break
+
+        groups: Dict[Tuple[str, bool], List[dict]] = defaultdict(list)
+        for entry in entries:
+            groups[(entry["publish_at"], entry["published"])].append(entry)
+        for (publish_at, published), group in sorted(groups.items()):
+            result = repo.set_published_many(
+                [(entry["id"], entry["title"]) for entry in group],
+                published=published,
+                published_at=publish_at
+            )
+            repo.cancel_scheduled([entry["runKey"] for entry in group])
+            stats["batches"] += 1
+            stats["updated"] += result["updated"]
+            stats["missing"] += len(result["missing"])
+            if result["missing"]:
+                logger.warning("Scheduled publish skipped missing pages: %s", result["missing"])
+
+        if len(entries) < settings.scheduled_publish_batch_size:
+            break
+    if stats["updated"] and settings.snapshot_enabled:
+        mark_stale(settings.snapshot_path)
+    logger.info("Scheduled publish: %s", stats)
+    return stats
+
+
+def handler(event, context):
+    """Lambda entrypoint for scheduled runs"""
+    return run_due(dry_run=bool((event or {}).get("dry_run")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply scheduled publishes that are due")
+    parser.add_argument("--dry-run", action="store_true", help="Only count due entries")
+    args = parser.parse_args()
+    print(json.dumps(run_due(dry_run=args.dry_run), indent=2))
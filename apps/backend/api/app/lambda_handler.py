@@ -0,0 +1,125 @@
+"""
+AWS Lambda entrypoint (Dockerfile CMD: app.lambda_handler.handler).
+
+Everything a request needs is built once per execution environment, during the
+Lambda init phase rather than on the first request: the FastAPI app and its
+routers, the boto3 resource/clients, the DynamoDB table wrappers and the Cognito
+JWKS. Mangum is only imported here, so uvicorn/EC2 deployments never pay for it.
+
+With SnapStart the warmed state is captured in the snapshot, and anything that
+must not be shared between restored copies is refreshed after restore.
+Set LAMBDA_EAGER_INIT=false to skip all of it: the first call then builds only
+the app, and clients are created by the first request that uses them. python-jose
+and requests are imported by token verification, so anonymous requests never
+load them. boto3 and FastAPI are needed by every API route and stay module-level
+imports.
+"""
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger("app.lambda_handler")
+
+_init_started = time.perf_counter()
+_handler = None
+
+WARM_TABLES = ("AppPages", "Analytics")
+
+# Minimal API Gateway (HTTP API, payload v2) event used to exercise the ASGI stack at init
+_WARMUP_EVENT = {
+    "version": "2.0",
+    "routeKey": "GET /health",
+    "rawPath": "/health",
+    "rawQueryString": "",
+    "headers": {"host": "warmup.local"},
+    "requestContext": {
+        "http": {"method": "GET", "path": "/health", "protocol": "HTTP/1.1", "sourceIp": "127.0.0.1"},
+        "requestId": "warmup",
+        "stage": "$default",
+    },
+    "isBase64Encoded": False,
+}
+
+
+class _WarmupContext:
+    function_name = "warmup"
+    aws_request_id = "warmup"
+
+    @staticmethod
+    def get_remaining_time_in_millis() -> int:
+        return 30000
+
+
+def _build_handler():
+    """Import the app and wrap it for API Gateway"""
+    from mangum import Mangum
+    from app.main import app
+
+    return Mangum(app, lifespan="off")
+
+
+def warm_clients() -> None:
+    """Construct the shared boto3 clients/tables, prefetch the Cognito JWKS and load python-jose"""
+    import jose.jwt  # noqa: F401  (app.auth.cognito imports it on first use; load it during init)
+    from app.auth.dependencies import get_cognito_verifier
+    from app.config import get_settings
+    from app.database.dynamodb import get_dynamodb_table, get_optional_table
+    from app.database.s3 import get_s3_client
+
+    for table_name in WARM_TABLES:
+        get_dynamodb_table(table_name)
+    get_optional_table(get_settings().sync_tombstones_table)
+    get_s3_client()
+
+    try:
+        get_cognito_verifier()._get_jwks()
+    except Exception as e:
+        # Not fatal: the first authenticated request retries the fetch
+        logger.warning("JWKS prefetch failed: %s", e)
+
+
+def initialize() -> None:
+    """Build the handler, warm clients and run one in-process request through the stack"""
+    global _handler
+    if _handler is not None:
+        return
+
+    started = time.perf_counter()
+    _handler = _build_handler()
+    warm_clients()
+    _handler(_WARMUP_EVENT, _WarmupContext())
+    logger.info(
+        "Lambda init complete in %.1f ms (%.1f ms since module import)",
+        (time.perf_counter() - started) * 1000,
+        (time.perf_counter() - _init_started) * 1000
+    )
+
+
+def _after_restore() -> None:
+    """Refresh per-environment state that a SnapStart snapshot would otherwise share"""
+    random.seed()
+    # Re-fetches only if the snapshotted keys are older than the verifier's cache window
+    warm_clients()
+
+
+def handler(event, context):
+    """Lambda handler"""
+    global _handler
+    if _handler is None:
+        # Lazy mode: only the app; clients, the JWKS and python-jose load when a request needs them
+        _handler = _build_handler()
+    return _handler(event, context)
+
+
+if os.environ.get("LAMBDA_EAGER_INIT", "true").lower() not in ("0", "false", "no"):
+    initialize()
+
+try:
+    # Only present on Lambda runtimes that support SnapStart; init above has already
+    # run by the time the snapshot is taken
+    from snapshot_restore_py import register_after_restore
+except ImportError:
+    pass
+else:
+    register_after_restore(_after_restore)
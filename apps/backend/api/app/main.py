@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+import hmac
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes.api import router as api_router
 from app.routes.pages import router as pages_router
 from app.routes.analytics import router as analytics_router
+from app.routes.bundles import router as bundles_router
+from app.routes.export import router as export_router
+from app.admission import AdmissionMiddleware
 from app.config import get_settings
+from app.metrics import MetricsMiddleware, render_metrics
+from app.logging_config import setup_logging
 
 
 app = FastAPI(
@@ -13,7 +19,15 @@ app = FastAPI(
 )
 
 settings = get_settings()
+setup_logging(
+    level=settings.log_level,
+    log_format=settings.log_format,
+    sample_rates=settings.log_sample_rates,
+    queue_size=settings.log_queue_size
+)
 
+# Innermost, so shed requests still get CORS headers and show up in the metrics
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*", "http://localhost:5173"],
@@ -21,21 +35,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(api_router, prefix="/api/v1", tags=["api"])
 app.include_router(pages_router, prefix="/api/v1", tags=["pages"])
 app.include_router(analytics_router, prefix="/api/v1", tags=["analytics"])
+app.include_router(bundles_router, prefix="/api/v1", tags=["bundles"])
+app.include_router(export_router, prefix="/api/v1", tags=["export"])
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "table": settings.dynamodb_table_name}
 
-# Lambda handler
-"""
-from mangum import Mangum
-handler = Mangum(app)
-"""
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics for this process (or all workers in multiprocess mode)"""
+    if not settings.metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    expected = f"Bearer {settings.metrics_token}"
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+# Lambda deployments use app.lambda_handler.handler, which wraps this app with Mangum
 
 if __name__ == "__main__":
     import uvicorn
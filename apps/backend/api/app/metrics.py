@@ -0,0 +1,129 @@
+import os
+import time
+from typing import Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, REGISTRY
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DYNAMODB_LATENCY = Histogram(
+    "dynamodb_call_duration_seconds",
+    "Latency of individual DynamoDB calls",
+    ["table", "operation"],
+    buckets=LATENCY_BUCKETS,
+)
+DYNAMODB_ERRORS = Counter(
+    "dynamodb_errors_total",
+    "DynamoDB calls that raised, by error code",
+    ["table", "operation", "code"],
+)
+DYNAMODB_CONSUMED_CAPACITY = Counter(
+    "dynamodb_consumed_capacity_units_total",
+    "Consumed read/write capacity units reported by DynamoDB",
+    ["table", "operation", "index"],
+)
+DYNAMODB_SCANNED_ITEMS = Counter(
+    "dynamodb_scanned_items_total",
+    "Items evaluated by scans and queries (before filters)",
+    ["table", "operation"],
+)
+DYNAMODB_RETURNED_ITEMS = Counter(
+    "dynamodb_returned_items_total",
+    "Items returned by scans and queries (after filters)",
+    ["table", "operation"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by result",
+    ["cache", "result"],
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Coalesced reads: leader calls went to DynamoDB, shared calls reused an in-flight result",
+    ["group", "result"],
+)
+ANALYTICS_SHARDED_WRITES = Counter(
+    "analytics_sharded_writes_total",
+    "Analytics increments spread over shard keys, by why the event was sharded",
+    ["source"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejected_total",
+    "Requests shed by admission control (see app/admission.py), by rule and limit hit",
+    ["route", "reason"],
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_dynamodb_call(table: str, operation: str, duration_s: float, response: Optional[dict] = None) -> None:
+    """Record latency, consumed capacity and scanned/returned counts of one DynamoDB call"""
+    DYNAMODB_LATENCY.labels(table=table, operation=operation).observe(duration_s)
+    if not response:
+        return
+
+    capacity = response.get("ConsumedCapacity")
+    # Batch and transaction calls report one entry per table they touched
+    for entry in capacity if isinstance(capacity, list) else [capacity] if capacity else []:
+        entry_table = entry.get("TableName", table)
+        DYNAMODB_CONSUMED_CAPACITY.labels(table=entry_table, operation=operation, index="").inc(
+            (entry.get("Table") or {}).get("CapacityUnits", entry.get("CapacityUnits", 0))
+        )
+        for kind in ("GlobalSecondaryIndexes", "LocalSecondaryIndexes"):
+            for index_name, units in (entry.get(kind) or {}).items():
+                DYNAMODB_CONSUMED_CAPACITY.labels(table=entry_table, operation=operation, index=index_name).inc(
+                    units.get("CapacityUnits", 0)
+                )
+
+    if "ScannedCount" in response:
+        DYNAMODB_SCANNED_ITEMS.labels(table=table, operation=operation).inc(response["ScannedCount"])
+        DYNAMODB_RETURNED_ITEMS.labels(table=table, operation=operation).inc(response.get("Count", 0))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template (not per concrete path)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> tuple:
+    """Prometheus text exposition (aggregated across workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
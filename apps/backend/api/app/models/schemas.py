@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field, create_model
+from typing import Optional, Dict, Any, Tuple, Type
 from datetime import datetime
+from functools import lru_cache
 
 class PageBase(BaseModel):
     """Base schema for Pages"""
@@ -15,6 +16,8 @@ class PageCreate(PageBase):
     city: Optional[str] = None
     type: Optional[str] = None
     gisId: Optional[str] = None
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
     pageContent: Optional[str] = None
 
 class PageUpdate(BaseModel):
@@ -24,6 +27,8 @@ class PageUpdate(BaseModel):
     city: Optional[str] = None
     type: Optional[str] = None
     gisId: Optional[str] = None
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
     tags: Optional[str] = None
     pageContent: Optional[str] = None
     published: Optional[bool] = None
@@ -37,6 +42,10 @@ class PageResponse(PageBase):
     type: Optional[str] = None
     tags: Optional[str] = None
     image: Optional[str] = None
+    gisId: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    geohash: Optional[str] = None
     pageContent: Optional[str] = None
     updated_at: Optional[datetime] = None
     published: Optional[bool] = False
@@ -44,12 +53,86 @@ class PageResponse(PageBase):
     class Config:
         from_attributes = True
 
+class NearbyPageResponse(PageResponse):
+    """Schema for Page responses from a proximity search"""
+    distance_m: float
+
+@lru_cache(maxsize=128)
+def sparse_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Response model with only the given fields of model (for ?fields= requests)"""
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
 class PaginatedPageResponse(BaseModel):
     """Schema for paginated responses"""
     pages: list[PageResponse]
     count: int
     last_evaluated_key: Optional[Dict[str, Any]] = None
 
+class PageChange(BaseModel):
+    """Schema for a single entry of the page sync feed"""
+    op: str  # "upsert" or "delete"
+    id: int
+    title: str
+    changed_at: datetime
+    page: Optional[PageResponse] = None
+
+class PageChangesResponse(BaseModel):
+    """Schema for the incremental page sync feed"""
+    changes: list[PageChange]
+    cursor: str
+    has_more: bool
+    full_resync: bool = False
+
+class BulkExistsRequest(BaseModel):
+    """Schema for a bulk gisId existence lookup"""
+    gis_ids: list[str] = Field(..., min_length=1, max_length=500)
+
+class BulkExistsResponse(BaseModel):
+    """Schema for bulk gisId lookups: gisId -> page (summary fields unless full) or None"""
+    results: Dict[str, Optional[Dict[str, Any]]]
+    found: int
+
+class PageKey(BaseModel):
+    """Primary key of a page"""
+    id: int
+    title: str
+
+class BulkPublishRequest(BaseModel):
+    """Schema for publishing or unpublishing many pages at once"""
+    pages: list[PageKey] = Field(..., min_length=1, max_length=500)
+    published: bool = True
+
+class BulkPublishResponse(BaseModel):
+    """Schema for bulk publish results"""
+    updated: int
+    missing: list[PageKey]
+    published_at: Optional[datetime] = None
+
+class PublishScheduleRequest(BulkPublishRequest):
+    """Schema for queueing a bulk publish (or unpublish) at a later time"""
+    publish_at: datetime
+
+class ScheduledPublish(BaseModel):
+    """Schema for a pending scheduled publish"""
+    id: int
+    title: str
+    published: bool
+    publish_at: datetime
+
+class PublishScheduleResponse(BaseModel):
+    """Schema for pending scheduled publishes, soonest first"""
+    scheduled: list[ScheduledPublish]
+
+class FacetsResponse(BaseModel):
+    """Schema for page counts per city, type and tag, largest first"""
+    published: bool
+    city: Dict[str, int]
+    type: Dict[str, int]
+    tag: Dict[str, int]
+
 class AnalyticsData(BaseModel):
     """Schema for Analytics Data"""
     event: str
@@ -58,6 +141,31 @@ class AnalyticsData(BaseModel):
     class Config:
         from_attributes = True
 
+class UniqueCountResponse(BaseModel):
+    """Schema for approximate distinct-device counts (HyperLogLog)"""
+    event: str
+    start: int
+    end: int
+    unique: int
+    relative_error: float  # standard error as a fraction of unique
+    low: int
+    high: int
+
+class TrendingEvent(BaseModel):
+    """Schema for one entry of a trending window"""
+    event: str
+    count: int  # upper bound of the true count
+    error: int  # count - error is a lower bound
+    guaranteed: bool  # certainly among the top k
+
+class TrendingResponse(BaseModel):
+    """Schema for the most frequent events of an hour/day/week"""
+    window: str
+    start: int
+    end: int
+    total: int
+    events: list[TrendingEvent]
+
 class UploadRequest(BaseModel):
     """Schema for S3 Upload Request"""
     file_name: str
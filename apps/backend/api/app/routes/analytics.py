@@ -1,18 +1,30 @@
 from fastapi import APIRouter, Depends, Query, Path, status, HTTPException
 from typing import Dict, Optional
+import time
 from app.models.schemas import (
-    AnalyticsData
+    AnalyticsData, TrendingResponse, UniqueCountResponse
 )
 from app.database.dynamodb import get_dynamodb_table
 from app.database.repository import AnalyticsRepository
+from app.database.sharding import get_write_sharding
 from app.auth.dependencies import verify_access_token
+from app.sketches.store import get_sketch_buffer
+
+# Longest range /unique will merge sketches for
+MAX_UNIQUE_RANGE_SECONDS = 400 * 24 * 3600
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 def get_repository() -> AnalyticsRepository:
     """Dependency to get repository instance"""
     table = get_dynamodb_table("Analytics")
-    return AnalyticsRepository(table)
+    return AnalyticsRepository(
+        table,
+        sketches=get_sketch_buffer(),
+        sharding=get_write_sharding(),
+        hourly=get_dynamodb_table("AnalyticsHourly"),
+        daily=get_dynamodb_table("AnalyticsDaily")
+    )
 
 @router.get(
     "/",
@@ -56,6 +68,41 @@ async def get_event_analytics(
             detail=f"Error retrieving analytics data for event '{event_name}': {str(e)}"
         )
 
+@router.get(
+    "/unique",
+    response_model=UniqueCountResponse,
+    summary="Approximate unique devices for an event"
+)
+async def get_unique_count(
+    event: str = Query(..., min_length=1, description="Name of the event"),
+    start: Optional[int] = Query(None, description="Range start (unix seconds), default 24 hours before end"),
+    end: Optional[int] = Query(None, description="Range end (unix seconds), default now"),
+    repo: AnalyticsRepository = Depends(get_repository)
+):
+    """Distinct devices that logged the event in [start, end), from HyperLogLog sketches"""
+    end = end if end is not None else int(time.time())
+    start = start if start is not None else end - 24 * 3600
+    if not 0 < end - start <= MAX_UNIQUE_RANGE_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start and the range at most 400 days"
+        )
+    return repo.get_unique_count(event, start, end)
+
+@router.get(
+    "/trending",
+    response_model=TrendingResponse,
+    summary="Most frequent events this hour, day or week"
+)
+async def get_trending(
+    window: str = Query("hour", pattern="^(hour|day|week)$", description="Window size"),
+    k: int = Query(10, ge=1, le=50, description="Number of events"),
+    offset: int = Query(0, ge=0, le=168, description="Windows back from the current one"),
+    repo: AnalyticsRepository = Depends(get_repository)
+):
+    """Top-k events from the window's streaming (Space-Saving) summary"""
+    return repo.get_trending(window=window, k=k, offset=offset)
+
 @router.post(
     "/log",
     status_code=status.HTTP_201_CREATED,
@@ -63,11 +110,12 @@ async def get_event_analytics(
 )
 async def log_event(
     event: str = Query(..., min_length=1, description="Name of the event to log"),
+    device_id: Optional[str] = Query(None, min_length=1, max_length=200, description="Anonymous device id, counted towards unique visitors"),
     repo: AnalyticsRepository = Depends(get_repository)
 ):
     """Log an event with optional timestamp"""
     try:
-        repo.log_event(event=event)
+        repo.log_event(event=event, device_id=device_id)
         return {"message": "Event logged successfully"}
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, Query, status, HTTPException
+from typing import Dict, Optional
+from app.bundles.builder import BundleStore, get_bundle_store, plan_update, publish_bundle
+from app.database.dynamodb import get_dynamodb_table
+from app.database.repository import PageRepository
+from app.auth.dependencies import verify_access_token
+from app.config import get_settings
+
+router = APIRouter(prefix="/bundles", tags=["bundles"])
+
+@router.get(
+    "/latest",
+    response_model=dict,
+    summary="Get the downloads needed to update an offline bundle"
+)
+def get_latest_bundle(
+    version: Optional[int] = Query(None, ge=1, description="Bundle version the client currently has"),
+    store: BundleStore = Depends(get_bundle_store)
+):
+    """
+    Return the smallest set of downloads (patch chain or full archive) that
+    brings the client from its version to the latest bundle
+    """
+    settings = get_settings()
+    plan = plan_update(store.load_index(), version)
+    if plan["latest"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No bundle has been built yet"
+        )
+    for step in plan["steps"]:
+        step["url"] = store.url(step.pop("key"), settings.bundle_url_expiry_seconds)
+    return plan
+
+@router.post(
+    "/",
+    response_model=dict,
+    status_code=status.HTTP_201_CREATED,
+    summary="Build a new bundle version"
+)
+def build_bundle(
+    token_payload: Dict = Depends(verify_access_token),
+    store: BundleStore = Depends(get_bundle_store)
+):
+    """Build a bundle from published pages and GIS layers (no-op when nothing changed)"""
+    repo = PageRepository(get_dynamodb_table("AppPages"))
+    return publish_bundle(repo.get_all_published_pages(), store)
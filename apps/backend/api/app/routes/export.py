@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query, Path, status, HTTPException
+from typing import Dict, Optional
+from app.database.dynamodb import get_dynamodb_table
+from app.database.repository import Repository, PageRepository, AnalyticsRepository
+from app.auth.dependencies import verify_access_token
+from app.config import get_settings
+from app.utils.streaming import ndjson_response
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+EXPORTABLE_TABLES = {
+    "pages": ("AppPages", PageRepository),
+    "analytics": ("Analytics", AnalyticsRepository),
+}
+
+@router.get(
+    "/{table}",
+    summary="Export a whole table as NDJSON"
+)
+def export_table(
+    table: str = Path(..., description="Table to export: pages or analytics"),
+    fields: Optional[str] = Query(None, description="Comma-separated attributes to export (default: all)"),
+    segments: Optional[int] = Query(None, ge=1, le=64, description="Parallel scan segments"),
+    workers: Optional[int] = Query(None, ge=1, le=16, description="Concurrent segment scanners"),
+    hydrate: bool = Query(True, description="Pages: fetch offloaded bodies into pageContent instead of exporting their S3 pointers"),
+    token_payload: Dict = Depends(verify_access_token)
+):
+    """Stream every item of the table, one JSON object per line, for backups and admin exports"""
+    if table not in EXPORTABLE_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown table '{table}'"
+        )
+    settings = get_settings()
+    table_name, repository_class = EXPORTABLE_TABLES[table]
+    repo: Repository = repository_class(get_dynamodb_table(table_name))
+
+    items = repo.export_items(
+        total_segments=segments or settings.export_total_segments,
+        max_workers=workers or settings.export_max_workers,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        **({"hydrate": hydrate} if repository_class is PageRepository else {})
+    )
+    return ndjson_response(items, filename=f"{table_name}.ndjson")
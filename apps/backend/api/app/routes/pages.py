@@ -1,20 +1,81 @@
 from fastapi import APIRouter, Depends, Query, Path, status, HTTPException
-from typing import Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Dict, Optional, Tuple, Type
+from datetime import datetime
 from app.models.schemas import (
-    PageCreate, PageUpdate, PageResponse, PaginatedPageResponse, UploadRequest
+    PageCreate, PageUpdate, PageResponse, NearbyPageResponse, PaginatedPageResponse,
+    PageChangesResponse, UploadRequest, BulkExistsRequest, BulkExistsResponse, sparse_model,
+    BulkPublishRequest, BulkPublishResponse, PublishScheduleRequest, PublishScheduleResponse,
+    FacetsResponse
 )
-from app.database.dynamodb import get_dynamodb_table
+from app.database.dynamodb import get_dynamodb_table, get_optional_table
+from app.database.facets import get_facet_store
 from app.database.repository import PageRepository
-from app.auth.dependencies import get_current_username, verify_access_token
+from app.database.snapshot import get_snapshot_manager
+from app.auth.dependencies import get_current_username, verify_access_token, verify_optional_access_token
+from app.database.s3 import get_s3_client
 from app.config import get_settings
-import boto3
+from app.utils.streaming import STREAM_FORMATS, stream_response
 
 router = APIRouter(prefix="/pages", tags=["pages"])
 
+# Buffered responses keep the original page size; streamed ones may ask for more
+MAX_LIMIT = 100
+MAX_STREAM_LIMIT = 5000
+STREAM_QUERY = Query(
+    None,
+    pattern=f"^({'|'.join(STREAM_FORMATS)})$",
+    description="Stream results as they are read: ndjson (one page per line) or json (chunked array)"
+)
+
+def check_limit(limit: int, stream: Optional[str]) -> None:
+    """Only streamed responses may exceed the buffered page size"""
+    if not stream and limit > MAX_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit above {MAX_LIMIT} requires stream=ndjson or stream=json"
+        )
+
+FIELDS_QUERY = Query(
+    None,
+    description="Comma-separated page attributes to return (default: all), e.g. id,title,image"
+)
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel] = PageResponse) -> Optional[Tuple[str, ...]]:
+    """Validate a fields= list against the response model; names come back in model order"""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - model.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return tuple(name for name in model.model_fields if name in requested) or None
+
+def page_models(pages, fields: Optional[Tuple[str, ...]] = None, model: Type[BaseModel] = PageResponse):
+    response_model = sparse_model(model, fields) if fields else model
+    return (response_model(**page) for page in pages)
+
+def sparse_response(content) -> JSONResponse:
+    """Trimmed models don't match the route's response_model, so they are serialized as-is"""
+    return JSONResponse(jsonable_encoder(content))
+
 def get_repository() -> PageRepository:
     """Dependency to get repository instance"""
+    settings = get_settings()
     table = get_dynamodb_table("AppPages")
-    return PageRepository(table)
+    return PageRepository(
+        table,
+        tombstones=get_optional_table(settings.sync_tombstones_table),
+        schedule=get_optional_table(settings.publish_schedule_table),
+        snapshot=get_snapshot_manager(),
+        tag_index=get_optional_table(settings.page_tags_table),
+        facets=get_facet_store()
+    )
 
 @router.post(
     "/",
@@ -37,27 +98,59 @@ async def create_page(
     summary="List all user pages"
 )
 async def list_pages(
-    limit: int = Query(50, ge=1, le=100),
+    limit: int = Query(50, ge=1, le=MAX_STREAM_LIMIT),
+    stream: Optional[str] = STREAM_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
     token_payload: Dict = Depends(verify_access_token),
     repo: PageRepository = Depends(get_repository)
 ):
-    result = repo.list_pages(limit=limit)
+    check_limit(limit, stream)
+    selected = parse_fields(fields)
+    if stream:
+        return stream_response(
+            page_models(repo.iter_pages(limit=limit, fields=selected), selected), stream,
+            trailer=lambda count: {"count": count, "last_evaluated_key": None}
+        )
+    result = repo.list_pages(limit=limit, fields=selected)
+    if selected:
+        return sparse_response({
+            "pages": list(page_models(result["pages"], selected)),
+            "count": result["count"],
+            "last_evaluated_key": result.get("last_evaluated_key")
+        })
     return PaginatedPageResponse(
         pages=[PageResponse(**page) for page in result["pages"]],
         count=result["count"],
         last_evaluated_key=result.get("last_evaluated_key")
     )
 
+# Hot public reads are plain (threadpool) routes so concurrent identical requests
+# can share one DynamoDB call in the repository (app.database.coalesce)
 @router.get(
     "/published",
     response_model=PaginatedPageResponse,
     summary="List all published pages"
 )
-async def list_pages(
-    limit: int = Query(50, ge=1, le=100),
+def list_pages(
+    limit: int = Query(50, ge=1, le=MAX_STREAM_LIMIT),
+    stream: Optional[str] = STREAM_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
     repo: PageRepository = Depends(get_repository)
 ):
-    result = repo.list_published_pages(limit=limit)
+    check_limit(limit, stream)
+    selected = parse_fields(fields)
+    if stream:
+        return stream_response(
+            page_models(repo.iter_published_pages(limit=limit, fields=selected), selected), stream,
+            trailer=lambda count: {"count": count, "last_evaluated_key": None}
+        )
+    result = repo.list_published_pages(limit=limit, fields=selected)
+    if selected:
+        return sparse_response({
+            "pages": list(page_models(result["pages"], selected)),
+            "count": result["count"],
+            "last_evaluated_key": result.get("last_evaluated_key")
+        })
     return PaginatedPageResponse(
         pages=[PageResponse(**page) for page in result["pages"]],
         count=result["count"],
@@ -69,21 +162,123 @@ async def list_pages(
     response_model=dict,
     summary="Search pages"
 )
-async def search_pages(
+def search_pages(
     q: Optional[str] = Query(None, description="Search term"),
     city: Optional[str] = Query(None, description="City to filter by"),
     published: Optional[bool] = Query(None, description="Published status to filter by"),
     tag: Optional[str] = Query(None, description="Tag to filter by"),
     type: Optional[str] = Query(None, description="Type to filter by"),
-    limit: int = Query(50, ge=1, le=100),
+    limit: int = Query(50, ge=1, le=MAX_STREAM_LIMIT),
+    stream: Optional[str] = STREAM_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
     repo: PageRepository = Depends(get_repository)
 ):
     """Search pages by title or description"""
-    pages = repo.search_pages(search_term=q, city=city, type=type, published=published, tag=tag, limit=limit)
+    check_limit(limit, stream)
+    selected = parse_fields(fields)
+    if stream:
+        pages = repo.iter_search_pages(
+            search_term=q, city=city, type=type, published=published, tag=tag, limit=limit, fields=selected
+        )
+        return stream_response(page_models(pages, selected), stream)
+    pages = repo.search_pages(
+        search_term=q, city=city, type=type, published=published, tag=tag, limit=limit, fields=selected
+    )
     return {
-        "pages": [PageResponse(**page) for page in pages]
+        "pages": list(page_models(pages, selected))
     }
 
+@router.get(
+    "/changes",
+    response_model=PageChangesResponse,
+    summary="Get published page changes since a timestamp or cursor"
+)
+async def get_page_changes(
+    since: Optional[datetime] = Query(None, description="Only return changes after this UTC timestamp"),
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous call (takes precedence over since)"),
+    limit: int = Query(100, ge=1, le=500),
+    repo: PageRepository = Depends(get_repository)
+):
+    """
+    Incremental sync feed for offline clients: upserts for published pages and
+    deletions (including unpublished pages), oldest first. Keep calling with the
+    returned cursor while has_more is true; store the last cursor for the next sync.
+    """
+    return repo.get_changes(since=since, cursor=cursor, limit=limit)
+
+@router.get(
+    "/nearby",
+    response_model=dict,
+    summary="Find published pages near a point"
+)
+async def get_nearby_pages(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search center"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude of the search center"),
+    radius: float = Query(5000, gt=0, le=50000, description="Search radius in meters"),
+    limit: int = Query(50, ge=1, le=100),
+    fields: Optional[str] = FIELDS_QUERY,
+    repo: PageRepository = Depends(get_repository)
+):
+    """Return published pages within the radius, sorted by distance"""
+    selected = parse_fields(fields, NearbyPageResponse)
+    pages = repo.get_nearby_pages(lat=lat, lon=lon, radius_m=radius, limit=limit, fields=selected)
+    return {
+        "pages": list(page_models(pages, selected, NearbyPageResponse))
+    }
+
+@router.post(
+    "/publish/bulk",
+    response_model=BulkPublishResponse,
+    summary="Publish or unpublish many pages at once"
+)
+def bulk_publish_pages(
+    request: BulkPublishRequest,
+    token_payload: Dict = Depends(verify_access_token),
+    repo: PageRepository = Depends(get_repository)
+):
+    """
+    Apply published=true/false to up to 500 pages with DynamoDB transactions of
+    100 pages each. Pages that don't exist are skipped and listed under missing.
+    """
+    result = repo.set_published_many(
+        [(page.id, page.title) for page in request.pages], published=request.published
+    )
+    return {
+        **result,
+        "missing": [{"id": page_id, "title": title} for page_id, title in result["missing"]],
+    }
+
+@router.post(
+    "/publish/schedule",
+    response_model=PublishScheduleResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Schedule a bulk publish or unpublish"
+)
+async def schedule_publish(
+    request: PublishScheduleRequest,
+    token_payload: Dict = Depends(verify_access_token),
+    repo: PageRepository = Depends(get_repository)
+):
+    """Queue pages to be published (or unpublished) at publish_at by the scheduled_publish job"""
+    entries = repo.schedule_publish(
+        [(page.id, page.title) for page in request.pages], request.publish_at, published=request.published
+    )
+    return {"scheduled": entries}
+
+# Registered before /{page_id}/{title}, which would otherwise match this path
+@router.get(
+    "/publish/schedule",
+    response_model=PublishScheduleResponse,
+    summary="List pending scheduled publishes"
+)
+async def get_publish_schedule(
+    limit: int = Query(100, ge=1, le=1000),
+    token_payload: Dict = Depends(verify_access_token),
+    repo: PageRepository = Depends(get_repository)
+):
+    """Pending scheduled publishes, soonest first"""
+    return {"scheduled": repo.get_scheduled(limit=limit)}
+
 @router.get(
     "/{page_id}/{title}",
     response_model=PageResponse,
@@ -92,16 +287,20 @@ async def search_pages(
 async def get_page(
     page_id: str = Path(..., description="Page ID"),
     title: str = Path(..., description="Page Title"),
+    fields: Optional[str] = FIELDS_QUERY,
     repo: PageRepository = Depends(get_repository),
     token_payload: Dict = Depends(verify_access_token)
 ):
     """Get a specific page by ID"""
-    page = repo.get_page(page_id, title, authorized=token_payload)
+    selected = parse_fields(fields)
+    page = repo.get_page(page_id, title, authorized=token_payload, fields=selected)
     if not page:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Page not found"
         )
+    if selected:
+        return sparse_response(sparse_model(PageResponse, selected)(**page))
     return PageResponse(**page)
 
 @router.get(
@@ -112,15 +311,19 @@ async def get_page(
 async def get_published_page (
     page_id: str = Path(..., description="Page ID"),
     title: str = Path(..., description="Page Title"),
+    fields: Optional[str] = FIELDS_QUERY,
     repo: PageRepository = Depends(get_repository),
 ):
     """Get a specific published page by ID"""
-    page = repo.get_page(page_id, title)
+    selected = parse_fields(fields)
+    page = repo.get_page(page_id, title, fields=selected)
     if not page:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Page not found"
         )
+    if selected:
+        return sparse_response(sparse_model(PageResponse, selected)(**page))
     return PageResponse(**page)
 
 @router.put(
@@ -201,19 +404,45 @@ async def get_page_count(
     count = repo.get_count_pages()
     return {"count": count}
 
+@router.get(
+    "/facets",
+    response_model=FacetsResponse,
+    summary="Get page counts per city, type and tag"
+)
+def get_page_facets(
+    published: bool = Query(False, description="Count published pages only (required without a token)"),
+    token_payload: Optional[Dict] = Depends(verify_optional_access_token),
+    repo: PageRepository = Depends(get_repository)
+):
+    """
+    Counts for filter menus, kept up to date on every page write instead of scanning.
+    Counts over all pages include drafts, so only authenticated callers get them.
+    """
+    if not published and token_payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Counts over unpublished pages require authentication; use published=true",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return {"published": published, **repo.get_facets(published)}
+
 @router.get(
     "/exists",
     response_model=dict,
     summary="Check if a page with the given gisID exists and return it",
 )
-async def check_page_exists(
+def check_page_exists(
     gis_id: str = Query(..., description="GIS ID to check"),
+    fields: Optional[str] = FIELDS_QUERY,
     repo: PageRepository = Depends(get_repository),
 ):
     """
     Return whether a page exists for this gisID and, if so, the page item.
     """
-    page = repo.get_page_by_gis_id(gis_id)
+    selected = parse_fields(fields)
+    page = repo.get_page_by_gis_id(gis_id, fields=selected)
+    if page and selected:
+        page = sparse_model(PageResponse, selected)(**page)
 
     return {
         "gisID": gis_id,
@@ -221,12 +450,37 @@ async def check_page_exists(
         "page": page,     # either the item dict or None
     }
 
+@router.post(
+    "/exists/bulk",
+    response_model=BulkExistsResponse,
+    summary="Check many gisIDs at once",
+)
+def check_pages_exist(
+    request: BulkExistsRequest,
+    full: bool = Query(False, description="Return whole pages instead of summary fields"),
+    fields: Optional[str] = FIELDS_QUERY,
+    repo: PageRepository = Depends(get_repository),
+):
+    """
+    Answer a whole map viewport in one request: maps each gisID to its page
+    (id, title, gisId, type, city, published, lat, lon, or the given fields) or null.
+    """
+    selected = parse_fields(fields)
+    results = repo.get_pages_by_gis_ids(request.gis_ids, full=full, fields=selected)
+    if selected:
+        model = sparse_model(PageResponse, selected)
+        results = {gis_id: model(**page).model_dump() if page else None for gis_id, page in results.items()}
+    return {
+        "results": results,
+        "found": sum(page is not None for page in results.values()),
+    }
+
 @router.post("/generate-upload-url")
 # Ensure you verify the user is logged in here using your existing dependency
 async def generate_upload_url(req: UploadRequest, 
                               token_payload = Depends(verify_access_token)): 
     settings = get_settings()
-    s3_client = boto3.client("s3", region_name=settings.aws_region)
+    s3_client = get_s3_client()
     BUCKET_NAME = settings.s3_bucket_name
     object_name = f"images/{req.file_name}"
     
@@ -0,0 +1,76 @@
+"""
+HyperLogLog distinct counter. With the default precision (p=12, 4096 one-byte
+registers) a sketch is 4 KB uncompressed, has a standard error of about 1.6%
+and can be merged with any other sketch of the same precision.
+"""
+import hashlib
+import math
+import zlib
+from typing import Iterable
+
+DEFAULT_PRECISION = 12
+_FORMAT_VERSION = 1
+
+
+def hash64(value: str) -> int:
+    """Stable 64-bit hash of a string (identifiers are never stored, only hashes)"""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Approximate count of distinct 64-bit hashes"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: bytes = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError("register count does not match precision")
+
+    @property
+    def relative_error(self) -> float:
+        """Standard error of count() as a fraction of the true value"""
+        return 1.04 / math.sqrt(self.m)
+
+    def add_hash(self, value: int) -> None:
+        index = value >> (64 - self.precision)
+        remaining = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, value: str) -> None:
+        self.add_hash(hash64(value))
+
+    def update(self, hashes: Iterable[int]) -> "HyperLogLog":
+        for value in hashes:
+            self.add_hash(value)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch into this one (union of the counted sets)"""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes([_FORMAT_VERSION, self.precision]) + bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        raw = zlib.decompress(data)
+        if raw[0] != _FORMAT_VERSION:
+            raise ValueError(f"unsupported sketch format {raw[0]}")
+        return cls(precision=raw[1], registers=raw[2:])
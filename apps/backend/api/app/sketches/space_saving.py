@@ -0,0 +1,60 @@
+"""
+Space-Saving heavy hitters (Metwally et al.): tracks the most frequent keys of an
+unbounded stream with a fixed number of counters. Every key whose true count
+exceeds total / capacity is guaranteed to be tracked, and each counter's
+overestimate is bounded by its recorded error.
+"""
+import json
+import zlib
+from typing import Dict, List, Mapping, Tuple
+
+DEFAULT_CAPACITY = 200
+
+
+class SpaceSaving:
+    """Top-k summary with at most `capacity` counters"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, error]
+        self.counters: Dict[str, List[int]] = {}
+
+    def add(self, key: str, count: int = 1) -> None:
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [count, 0]
+        else:
+            # Evict the smallest counter; the newcomer inherits its count as error
+            victim = min(self.counters, key=lambda k: self.counters[k][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[key] = [floor + count, floor]
+
+    def update(self, counts: Mapping[str, int]) -> "SpaceSaving":
+        # Largest first, so small keys are the ones evicted when the summary is full
+        for key, count in sorted(counts.items(), key=lambda kv: -kv[1]):
+            self.add(key, count)
+        return self
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """(key, count, error) for the k largest counters, largest first"""
+        ranked = sorted(self.counters.items(), key=lambda kv: (-kv[1][0], kv[0]))
+        return [(key, count, error) for key, (count, error) in ranked[:k]]
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(json.dumps({
+            "capacity": self.capacity,
+            "total": self.total,
+            "counters": self.counters,
+        }, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpaceSaving":
+        doc = json.loads(zlib.decompress(data))
+        summary = cls(doc["capacity"])
+        summary.total = doc["total"]
+        summary.counters = doc["counters"]
+        return summary
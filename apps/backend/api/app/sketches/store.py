@@ -0,0 +1,253 @@
+"""
+Persistence for analytics sketches in the AnalyticsSketches table.
+
+Items are keyed by `sketch` ("<kind>|<granularity>|<event>", e.g. "hll|hour|Home#view",
+or "topk|day|all") and `window` (start of the hour/day/week as a unix timestamp) and hold the serialized
+sketch in `data`. Writers merge into the stored sketch with optimistic concurrency
+on `version`, so several API processes can flush into the same window safely.
+
+Ingest does not touch this table directly: SketchBuffer collects updates in memory
+and a background thread merges them every SKETCH_FLUSH_INTERVAL_SECONDS (or sooner
+once SKETCH_FLUSH_MAX_PENDING updates are waiting). A failed flush puts the windows
+it did not write back into the buffer for the next one. Updates still buffered when
+a process is killed are lost, which only makes the approximate counts slightly low.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from app.config import get_settings
+from app.database.dynamodb import get_dynamodb_table
+from app.sketches.hyperloglog import HyperLogLog, hash64
+from app.sketches.space_saving import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+SKETCH_TABLE = "AnalyticsSketches"
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+GRANULARITY_SECONDS = {"hour": HOUR, "day": DAY, "week": WEEK}
+UNIQUE_GRANULARITIES = ("hour", "day")
+TRENDING_GRANULARITIES = ("hour", "day", "week")
+# The unix epoch was a Thursday; weeks start on Monday 00:00 UTC
+_WEEK_OFFSET = 4 * DAY
+
+
+def window_start(timestamp: int, granularity: str) -> int:
+    if granularity == "week":
+        return timestamp - (timestamp - _WEEK_OFFSET) % WEEK
+    return timestamp - timestamp % GRANULARITY_SECONDS[granularity]
+
+
+def sketch_key(kind: str, granularity: str, event: str) -> str:
+    return f"{kind}|{granularity}|{event}"
+
+
+class SketchStore:
+    """Reads and merge-writes serialized sketches"""
+
+    def __init__(self, table, max_retries: int = 5):
+        self.table = table
+        self.max_retries = max_retries
+
+    def query(self, key: str, start: int, end: int) -> List[dict]:
+        """Stored windows of one sketch with start <= window < end"""
+        if end <= start:
+            return []
+        query_kwargs = {"KeyConditionExpression": Key("sketch").eq(key) & Key("window").between(start, end - 1)}
+        items = []
+        while True:
+            response = self.table.query(**query_kwargs)
+            items.extend(response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                return items
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    def get(self, key: str, window: int) -> Optional[dict]:
+        return self.table.get_item(Key={"sketch": key, "window": window}).get("Item")
+
+    def merge(
+        self,
+        key: str,
+        window: int,
+        update: Callable[[Optional[bytes]], bytes],
+        expires_at: Optional[int] = None
+    ) -> None:
+        """
+        Replace the stored sketch with update(stored bytes or None). Retries when
+        another writer changed the item between the read and the conditional put.
+        """
+        for _ in range(self.max_retries):
+            item = self.table.get_item(Key={"sketch": key, "window": window}, ConsistentRead=True).get("Item")
+            version = int(item["version"]) if item else 0
+            new_item = {
+                "sketch": key,
+                "window": window,
+                "data": update(item["data"].value if item else None),
+                "version": version + 1,
+                "updated_at": int(time.time()),
+            }
+            if expires_at:
+                new_item["expires_at"] = expires_at
+            condition = Attr("version").eq(version) if item else Attr("sketch").not_exists()
+            try:
+                self.table.put_item(Item=new_item, ConditionExpression=condition)
+                return
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+        raise RuntimeError(f"gave up merging sketch {key}@{window} after {self.max_retries} conflicts")
+
+
+def _merge_hll(hashes: Set[int], precision: int) -> Callable[[Optional[bytes]], bytes]:
+    def update(stored: Optional[bytes]) -> bytes:
+        sketch = HyperLogLog.from_bytes(stored) if stored else HyperLogLog(precision)
+        return sketch.update(hashes).to_bytes()
+    return update
+
+
+def _merge_top_k(counts: Dict[str, int], capacity: int) -> Callable[[Optional[bytes]], bytes]:
+    def update(stored: Optional[bytes]) -> bytes:
+        summary = SpaceSaving.from_bytes(stored) if stored else SpaceSaving(capacity)
+        return summary.update(counts).to_bytes()
+    return update
+
+
+class SketchBuffer:
+    """Collects sketch updates in memory and merges them into SketchStore in the background"""
+
+    def __init__(
+        self,
+        store: SketchStore,
+        flush_interval: float = 10.0,
+        max_pending: int = 5000,
+        precision: int = 12,
+        hour_retention_days: int = 90,
+        trending_capacity: int = 200
+    ):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.precision = precision
+        self.hour_retention_days = hour_retention_days
+        self.trending_capacity = trending_capacity
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Buffered per stored sketch, (granularity, event, window) and (granularity, window),
+        # so a failed flush can put back exactly the sketches it did not write
+        self._uniques: Dict[Tuple[str, str, int], Set[int]] = defaultdict(set)
+        self._counts: Dict[Tuple[str, int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._pending = 0
+
+    def add_unique(self, event: str, timestamp: int, identity: str) -> None:
+        """Count identity (e.g. a device id) towards the distinct visitors of event"""
+        identity_hash = hash64(identity)
+        with self._lock:
+            for granularity in UNIQUE_GRANULARITIES:
+                self._uniques[(granularity, event, window_start(timestamp, granularity))].add(identity_hash)
+            self._pending += 1
+            pending = self._pending
+        self._after_add(pending)
+
+    def add_event(self, event: str, timestamp: int) -> None:
+        """Count one occurrence of event towards the trending (top-k) summaries"""
+        with self._lock:
+            for granularity in TRENDING_GRANULARITIES:
+                self._counts[(granularity, window_start(timestamp, granularity))][event] += 1
+            self._pending += 1
+            pending = self._pending
+        self._after_add(pending)
+
+    def _after_add(self, pending: int) -> None:
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="sketch-flush", daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Sketch flush failed")
+
+    def flush(self) -> None:
+        """
+        Merge everything buffered so far into the store. When a merge fails, the
+        sketches not yet written go back into the buffer for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                uniques, self._uniques = self._uniques, defaultdict(set)
+                counts, self._counts = self._counts, defaultdict(lambda: defaultdict(int))
+                self._pending = 0
+            flushed = len(uniques) + len(counts)
+            try:
+                self._flush_uniques(uniques)
+                self._flush_counts(counts)
+            except Exception:
+                self._restore(uniques, counts)
+                raise
+            if flushed:
+                logger.debug("Flushed %d sketch windows", flushed)
+
+    def _flush_uniques(self, uniques: Dict[Tuple[str, str, int], Set[int]]) -> None:
+        """Merge each buffered HLL window, dropping it from uniques once written"""
+        for key in list(uniques):
+            granularity, event, window = key
+            expires_at = window + self.hour_retention_days * DAY if granularity == "hour" else None
+            self.store.merge(sketch_key("hll", granularity, event), window, _merge_hll(uniques[key], self.precision), expires_at)
+            del uniques[key]
+
+    def _flush_counts(self, counts: Dict[Tuple[str, int], Dict[str, int]]) -> None:
+        """Merge each buffered top-k window, dropping it from counts once written"""
+        for key in list(counts):
+            granularity, window = key
+            expires_at = window + self.hour_retention_days * DAY if granularity == "hour" else None
+            self.store.merge(
+                sketch_key("topk", granularity, "all"), window,
+                _merge_top_k(counts[key], self.trending_capacity), expires_at
+            )
+            del counts[key]
+
+    def _restore(self, uniques: Dict[Tuple[str, str, int], Set[int]], counts: Dict[Tuple[str, int], Dict[str, int]]) -> None:
+        """Put unwritten sketch updates back, combined with whatever arrived during the flush"""
+        with self._lock:
+            for key, hashes in uniques.items():
+                self._uniques[key].update(hashes)
+            for key, events in counts.items():
+                for event, count in events.items():
+                    self._counts[key][event] += count
+            self._pending += sum(map(len, uniques.values())) + sum(sum(events.values()) for events in counts.values())
+
+
+@lru_cache()
+def get_sketch_buffer() -> SketchBuffer:
+    """Process-wide sketch buffer (flushed on exit)"""
+    settings = get_settings()
+    buffer = SketchBuffer(
+        SketchStore(get_dynamodb_table(SKETCH_TABLE)),
+        flush_interval=settings.sketch_flush_interval_seconds,
+        max_pending=settings.sketch_flush_max_pending,
+        precision=settings.hll_precision,
+        hour_retention_days=settings.sketch_hour_retention_days,
+        trending_capacity=settings.trending_capacity
+    )
+    atexit.register(buffer.flush)
+    return buffer
@@ -0,0 +1,123 @@
+import math
+from typing import List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE_MAP = {c: i for i, c in enumerate(_BASE32)}
+
+EARTH_RADIUS_M = 6371008.8
+
+# Approximate cell size (width, height) in meters at the equator for each precision
+_CELL_SIZE_M = {
+    1: (5009400.0, 4992600.0),
+    2: (1252300.0, 624100.0),
+    3: (156500.0, 156000.0),
+    4: (39100.0, 19500.0),
+    5: (4890.0, 4890.0),
+    6: (1220.0, 610.0),
+    7: (153.0, 153.0),
+    8: (38.2, 19.1),
+    9: (4.77, 4.77),
+}
+
+
+def encode(lat: float, lon: float, precision: int = 9) -> str:
+    """Encode a latitude/longitude pair into a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> Tuple[float, float, float, float]:
+    """Decode a geohash into its bounding box (min_lat, min_lon, max_lat, max_lon)"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Decode a geohash into the latitude/longitude of its cell center"""
+    min_lat, min_lon, max_lat, max_lon = decode_bbox(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def neighbors(geohash: str) -> List[str]:
+    """Return the 8 cells surrounding a geohash cell (same precision)"""
+    min_lat, min_lon, max_lat, max_lon = decode_bbox(geohash)
+    lat_step = max_lat - min_lat
+    lon_step = max_lon - min_lon
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+
+    cells = []
+    for d_lat in (-1, 0, 1):
+        for d_lon in (-1, 0, 1):
+            if d_lat == 0 and d_lon == 0:
+                continue
+            lat = center_lat + d_lat * lat_step
+            if lat > 90 or lat < -90:
+                continue
+            lon = (center_lon + d_lon * lon_step + 180) % 360 - 180
+            cells.append(encode(lat, lon, len(geohash)))
+    return cells
+
+
+def precision_for_radius(radius_m: float, lat: float = 0.0, min_precision: int = 1, max_precision: int = 9) -> int:
+    """Pick the finest precision whose cells are still at least as large as the radius,
+    so that a cell plus its 8 neighbors fully covers a circle of that radius."""
+    lon_scale = max(math.cos(math.radians(lat)), 0.01)
+    for precision in range(max_precision, min_precision - 1, -1):
+        width, height = _CELL_SIZE_M[precision]
+        if min(width * lon_scale, height) >= radius_m:
+            return precision
+    return min_precision
+
+
+def covering_cells(lat: float, lon: float, radius_m: float, min_precision: int = 1) -> List[str]:
+    """Return the geohash cells (center + neighbors) that cover a circle around a point"""
+    precision = precision_for_radius(radius_m, lat=lat, min_precision=min_precision)
+    center = encode(lat, lon, precision)
+    return list(dict.fromkeys([center, *neighbors(center)]))
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _iter_positions(coordinates) -> Iterable[Tuple[float, float]]:
+    """Yield every [lon, lat] position from a (possibly nested) GeoJSON coordinates array"""
+    if not coordinates:
+        return
+    if isinstance(coordinates[0], (int, float)):
+        yield coordinates[0], coordinates[1]
+        return
+    for part in coordinates:
+        yield from _iter_positions(part)
+
+
+def representative_point(geometry: Optional[dict]) -> Optional[Tuple[float, float]]:
+    """Return a (lat, lon) point for a GeoJSON geometry (bounding box center)"""
+    if not geometry:
+        return None
+    positions = list(_iter_positions(geometry.get("coordinates")))
+    if not positions:
+        return None
+    lons = [lon for lon, _ in positions]
+    lats = [lat for _, lat in positions]
+    return (min(lats) + max(lats)) / 2, (min(lons) + max(lons)) / 2
+
+
+@lru_cache()
+def get_feature_locations() -> Dict[str, Tuple[float, float]]:
+    """Load GlobalID -> (lat, lon) for every feature in the configured GIS layer directory"""
+    settings = get_settings()
+    locations: Dict[str, Tuple[float, float]] = {}
+    if not settings.gis_data_dir:
+        return locations
+    if not os.path.isdir(settings.gis_data_dir):
+        logger.warning("GIS data directory %s not found; pages can't be located by gisId", settings.gis_data_dir)
+        return locations
+
+    for file_name in sorted(os.listdir(settings.gis_data_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(settings.gis_data_dir, file_name)) as f:
+            layer = json.load(f)
+        for feature in layer.get("features", []):
+            global_id = (feature.get("properties") or {}).get("GlobalID")
+            point = representative_point(feature.get("geometry"))
+            if global_id and point:
+                locations[global_id] = point
+    return locations
+
+
+def get_feature_location(gis_id: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Return the (lat, lon) of a GIS feature by its GlobalID, if known"""
+    if not gis_id:
+        return None
+    return get_feature_locations().get(gis_id)
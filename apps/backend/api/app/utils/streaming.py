@@ -0,0 +1,55 @@
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_FORMATS = ("ndjson", "json")
+
+
+def iter_ndjson(items: Iterable[Any]) -> Iterator[bytes]:
+    """Serialize items one per line as they are produced"""
+    for item in items:
+        yield _dumps(item) + b"\n"
+
+
+def ndjson_response(items: Iterable[Any], filename: Optional[str] = None) -> StreamingResponse:
+    """Stream items as newline-delimited JSON"""
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'} if filename else None
+    return StreamingResponse(iter_ndjson(items), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(jsonable_encoder(value), separators=(",", ":")).encode("utf-8")
+
+
+def iter_json_object(
+    items: Iterable[Any],
+    key: str = "pages",
+    trailer: Optional[Callable[[int], Dict[str, Any]]] = None
+) -> Iterator[bytes]:
+    """
+    Write {"<key>": [...], ...trailer} incrementally: the array is emitted item by
+    item and trailer(count) adds the fields only known once the array is complete
+    """
+    yield b'{' + _dumps(key) + b':['
+    count = 0
+    for item in items:
+        yield (b"," if count else b"") + _dumps(item)
+        count += 1
+    yield b"]"
+    for name, value in (trailer(count) if trailer else {}).items():
+        yield b"," + _dumps(name) + b":" + _dumps(value)
+    yield b"}"
+
+
+def stream_response(
+    items: Iterable[Any],
+    stream_format: str,
+    key: str = "pages",
+    trailer: Optional[Callable[[int], Dict[str, Any]]] = None
+) -> StreamingResponse:
+    """Stream items as NDJSON or as a chunked JSON object shaped like the buffered response"""
+    if stream_format == "ndjson":
+        return ndjson_response(items)
+    return StreamingResponse(iter_json_object(items, key, trailer), media_type="application/json")
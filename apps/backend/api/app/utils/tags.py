@@ -0,0 +1,19 @@
+from typing import Iterable, List, Optional, Union
+
+
+def normalize_tags(tags: Optional[Union[str, Iterable[str]]]) -> List[str]:
+    """
+    Canonical tag list for a page: pages store tags as one comma-separated string
+    ("snow,Ski, ski"); this splits it, trims and lowercases each tag, and drops
+    empties and duplicates (first occurrence wins)
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return list(dict.fromkeys(tag.strip().lower() for tag in tags if tag and tag.strip()))
+
+
+def join_tags(tags: Optional[Union[str, Iterable[str]]]) -> str:
+    """The stored form of a tag list"""
+    return ",".join(normalize_tags(tags))
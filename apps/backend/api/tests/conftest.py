@@ -0,0 +1,93 @@
+"""
+Shared fixtures: every test runs against moto's in-memory DynamoDB and S3, with
+the tables from app.database.schema and a fresh copy of the cached clients.
+"""
+import os
+
+# Settings are read on first use, so the environment has to be in place before any app import
+os.environ.update({
+    "AWS_REGION": "us-east-1",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "COGNITO_USER_POOL_ID": "us-east-1_test",
+    "COGNITO_APP_CLIENT_ID": "test-client",
+    "COGNITO_DOMAIN": "test",
+    "DYNAMODB_TABLE_NAME": "AppPages",
+    "S3_BUCKET_NAME": "test-bucket",
+    "ADMISSION_ENABLED": "false",
+    "GIS_DATA_DIR": "",
+    "SYNC_TOMBSTONES_TABLE": "PageTombstones",
+    "PUBLISH_SCHEDULE_TABLE": "PublishSchedule",
+    "PAGE_TAGS_TABLE": "PageTags",
+    "PAGE_FACETS_TABLE": "PageFacets",
+})
+
+import sys
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.database.schema import create_tables
+from app.sketches.store import get_sketch_buffer
+
+
+def clear_cached_clients():
+    """Cached getters (settings, tables, stores, ...) start fresh in every test"""
+    for name, module in list(sys.modules.items()):
+        if name == "app" or name.startswith("app."):
+            for value in list(vars(module).values()):
+                if callable(getattr(value, "cache_clear", None)):
+                    value.cache_clear()
+
+
+@pytest.fixture
+def aws(monkeypatch, tmp_path):
+    monkeypatch.setenv("SNAPSHOT_PATH", str(tmp_path / "published-pages.snapshot"))
+    clear_cached_clients()
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        create_tables(dynamodb)
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="test-bucket")
+        yield dynamodb
+        # Anything still buffered must reach the fake table, not AWS at interpreter exit
+        if get_sketch_buffer.cache_info().currsize:
+            get_sketch_buffer().flush()
+    clear_cached_clients()
+
+
+@pytest.fixture
+def repo(aws):
+    from app.routes.pages import get_repository
+    return get_repository()
+
+
+@pytest.fixture
+def client(aws):
+    from fastapi.testclient import TestClient
+    from app.auth.dependencies import verify_access_token
+    from app.main import app
+
+    app.dependency_overrides[verify_access_token] = lambda: {"username": "admin"}
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def create_page(repo):
+    """
+    Create a page the way POST /pages does, then apply any PageUpdate fields
+    (tags, published, ...) the way PUT /pages/{id}/{title} does
+    """
+    from app.models.schemas import PageCreate, PageUpdate
+
+    def create(page_id: int, title: str = None, **updates) -> dict:
+        page = PageCreate(id=page_id, title=title or f"Page {page_id}", gisId=f"{{GIS-{page_id}}}", city="arcadia", type="park")
+        created = repo.create_page(page.model_dump())
+        if updates:
+            created = repo.update_page(page_id, page.title, PageUpdate(**updates).model_dump())
+        return created
+    return create
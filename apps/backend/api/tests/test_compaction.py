@@ -0,0 +1,42 @@
+from app.jobs.compact_analytics import DAY, HOUR, Compactor
+
+NOW = 1_700_000_000
+OLD = NOW - 10 * DAY
+OLD_HOUR = OLD - OLD % HOUR
+
+
+def rows(table):
+    return {(item["event"], int(item["timestamp"])): item for item in table.scan()["Items"]}
+
+
+def test_compaction_folds_old_minutes_into_hours(aws):
+    analytics, hourly = aws.Table("Analytics"), aws.Table("AnalyticsHourly")
+    with analytics.batch_writer() as batch:
+        for minute in range(3):
+            batch.put_item(Item={"event": "Home#view", "timestamp": OLD_HOUR + minute * 60, "count": 2})
+        batch.put_item(Item={"event": "Home#view", "timestamp": NOW, "count": 5})
+    compactor = Compactor(analytics, hourly, HOUR, expire_after_s=DAY)
+
+    assert compactor.run(NOW - DAY, dry_run=True)["rows"] == 3
+    assert rows(hourly) == {}
+    stats = compactor.run(NOW - DAY)
+    assert stats["rows"] == 3 and stats["rollups"] == 1 and stats["conflicts"] == 0
+    assert int(rows(hourly)[("Home#view", OLD_HOUR)]["count"]) == 6
+    source = rows(analytics)
+    assert all(source[("Home#view", OLD_HOUR + m * 60)]["compacted"] for m in range(3))
+    assert "compacted" not in source[("Home#view", NOW)]
+
+    # A rerun finds nothing left, so nothing is counted twice
+    assert compactor.run(NOW - DAY)["rows"] == 0
+    assert int(rows(hourly)[("Home#view", OLD_HOUR)]["count"]) == 6
+
+
+def test_compaction_splits_large_windows(aws):
+    analytics, hourly = aws.Table("Analytics"), aws.Table("AnalyticsHourly")
+    # 150 rows in one hour window need more than one 100-item transaction
+    with analytics.batch_writer() as batch:
+        for second in range(150):
+            batch.put_item(Item={"event": "Map#view", "timestamp": OLD_HOUR + second, "count": 1})
+    stats = Compactor(analytics, hourly, HOUR, expire_after_s=DAY).run(NOW - DAY)
+    assert stats["rows"] == 150 and stats["transactions"] >= 2
+    assert int(rows(hourly)[("Map#view", OLD_HOUR)]["count"]) == 150
@@ -0,0 +1,36 @@
+import json
+
+from app.jobs.offload_page_content import offload_all
+
+BODY = "trail notes " * 500  # over PAGE_CONTENT_INLINE_MAX_BYTES, so it goes to S3
+
+
+def export(client, **params):
+    response = client.get("/api/v1/export/pages", params=params)
+    assert response.status_code == 200
+    return {item["id"]: item for item in map(json.loads, response.text.splitlines())}
+
+
+def test_page_export_includes_offloaded_bodies(aws, client, create_page):
+    create_page(1, pageContent=BODY)
+    create_page(2, pageContent="short")
+    assert "contentRef" in aws.Table("AppPages").get_item(Key={"id": 1, "title": "Page 1"})["Item"]
+
+    pages = export(client)
+    assert pages[1]["pageContent"] == BODY and "contentRef" not in pages[1]
+    assert pages[2]["pageContent"] == "short"
+    assert export(client, fields="id,pageContent")[1] == {"id": 1, "pageContent": BODY}
+
+    raw = export(client, hydrate="false")
+    assert "pageContent" not in raw[1] and raw[1]["contentRef"]
+
+
+def test_offload_job_moves_inline_bodies(aws, repo):
+    table = aws.Table("AppPages")
+    table.put_item(Item={"id": 1, "title": "Old page", "pageContent": BODY})
+    table.put_item(Item={"id": 2, "title": "Short page", "pageContent": "short"})
+
+    assert offload_all() == {"pages": 1, "offloaded": 1, "skipped": 0}
+    item = table.get_item(Key={"id": 1, "title": "Old page"})["Item"]
+    assert "pageContent" not in item
+    assert repo.get_page("1", "Old page", authorized={"username": "admin"})["pageContent"] == BODY
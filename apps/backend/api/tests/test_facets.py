@@ -0,0 +1,47 @@
+import pytest
+
+
+def test_facets_follow_page_writes(repo, create_page):
+    create_page(1, tags="Hiking, ski", published=True)
+    create_page(2, tags="hiking")
+    assert repo.get_facets(published=False) == {
+        "city": {"arcadia": 2}, "type": {"park": 2}, "tag": {"hiking": 2, "ski": 1}
+    }
+    assert repo.get_facets(published=True)["tag"] == {"hiking": 1, "ski": 1}
+
+    repo.facets.cache_seconds = 0
+    repo.update_page("2", "Page 2", {"city": "blair", "tags": "ski"})
+    repo.delete_page("1", "Page 1")
+    assert repo.get_facets(published=False) == {"city": {"blair": 1}, "type": {"park": 1}, "tag": {"ski": 1}}
+    assert repo.get_facets(published=True) == {"city": {}, "type": {}, "tag": {}}
+
+
+def test_draft_facets_need_a_token(client, create_page):
+    from app.auth.dependencies import verify_optional_access_token
+    from app.main import app
+
+    create_page(1, tags="hiking", published=True)
+    create_page(2, tags="secret")
+    response = client.get("/api/v1/pages/facets")
+    assert response.status_code == 401
+    response = client.get("/api/v1/pages/facets", params={"published": "true"})
+    assert response.status_code == 200 and response.json()["tag"] == {"hiking": 1}
+
+    app.dependency_overrides[verify_optional_access_token] = lambda: {"username": "admin"}
+    response = client.get("/api/v1/pages/facets", params={"published": "false"})
+    assert response.status_code == 200 and response.json()["tag"] == {"hiking": 1, "secret": 1}
+
+
+def test_facets_without_facet_table(aws, monkeypatch):
+    from fastapi import HTTPException
+    from app.config import get_settings
+    from app.routes.pages import get_repository
+
+    monkeypatch.setenv("PAGE_FACETS_TABLE", "")
+    get_settings.cache_clear()
+    repo = get_repository()
+    repo.create_page({"id": 1, "title": "Page 1", "city": "arcadia"})
+    assert aws.Table("PageFacets").scan()["Count"] == 0
+    with pytest.raises(HTTPException) as error:
+        repo.get_facets(published=True)
+    assert error.value.status_code == 503
@@ -0,0 +1,55 @@
+import pytest
+from app.utils import geohash
+
+ARCADIA = (44.2525, -91.5015)
+
+
+def test_encode_known_value():
+    # Reference value from the original geohash.org implementation
+    assert geohash.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_decode_round_trip():
+    cell = geohash.encode(*ARCADIA, 9)
+    lat, lon = geohash.decode(cell)
+    south, west, north, east = geohash.decode_bbox(cell)
+    assert south <= ARCADIA[0] <= north and west <= ARCADIA[1] <= east
+    assert geohash.haversine_m(lat, lon, *ARCADIA) < 5
+
+
+def test_prefix_contains_point():
+    cell = geohash.encode(*ARCADIA, 9)
+    for precision in range(1, 9):
+        assert geohash.encode(*ARCADIA, precision) == cell[:precision]
+
+
+def test_neighbors_surround_cell():
+    cell = geohash.encode(*ARCADIA, 6)
+    around = geohash.neighbors(cell)
+    assert len(around) == 8 and len(set(around)) == 8 and cell not in around
+    assert all(len(n) == 6 for n in around)
+    lat, lon = geohash.decode(cell)
+    south, west, north, east = geohash.decode_bbox(cell)
+    assert geohash.encode(lat + (north - south), lon, 6) in around
+    assert geohash.encode(lat, lon - (east - west), 6) in around
+
+
+def test_covering_cells_contain_every_point_in_radius():
+    radius = 2000
+    cells = geohash.covering_cells(*ARCADIA, radius)
+    precision = len(cells[0])
+    for dlat, dlon in ((0.017, 0), (-0.017, 0), (0, 0.024), (0, -0.024), (0.012, 0.017)):
+        lat, lon = ARCADIA[0] + dlat, ARCADIA[1] + dlon
+        assert geohash.haversine_m(*ARCADIA, lat, lon) <= radius * 1.05
+        assert geohash.encode(lat, lon, precision) in cells
+
+
+@pytest.mark.parametrize("radius", [50, 500, 5000, 50000])
+def test_precision_shrinks_with_radius(radius):
+    assert geohash.precision_for_radius(radius, ARCADIA[0]) >= geohash.precision_for_radius(radius * 10, ARCADIA[0])
+
+
+def test_haversine():
+    assert geohash.haversine_m(0, 0, 0, 0) == 0
+    # One degree of latitude is ~111.2 km
+    assert geohash.haversine_m(44, -91, 45, -91) == pytest.approx(111_195, rel=1e-3)
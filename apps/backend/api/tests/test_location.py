@@ -0,0 +1,45 @@
+import json
+
+from app.config import get_settings
+from app.utils.gis import get_feature_locations
+
+
+def test_update_rejects_half_a_location(client, create_page):
+    create_page(1)
+    response = client.put("/api/v1/pages/1/Page 1", json={"lat": 44.25})
+    assert response.status_code == 400
+    response = client.put("/api/v1/pages/1/Page 1", json={"lat": 44.25, "lon": -91.5})
+    assert response.status_code == 200
+
+
+def test_nearby_finds_published_pages_in_radius(client, create_page):
+    create_page(1, lat=44.2525, lon=-91.5015, published=True)
+    create_page(2, lat=44.2600, lon=-91.5015, published=True)
+    create_page(3, lat=44.2530, lon=-91.5010)
+    response = client.get("/api/v1/pages/nearby", params={"lat": 44.2525, "lon": -91.5015, "radius": 2000})
+    assert response.status_code == 200
+    pages = response.json()["pages"]
+    # Drafts are left out, and the rest come closest first
+    assert [page["id"] for page in pages] == [1, 2]
+    assert pages[0]["distance_m"] < pages[1]["distance_m"]
+    response = client.get("/api/v1/pages/nearby", params={"lat": 44.2525, "lon": -91.5015, "radius": 500})
+    assert [page["id"] for page in response.json()["pages"]] == [1]
+
+
+def test_unknown_gis_id_clears_the_location(client, create_page, monkeypatch, tmp_path):
+    layer = {"features": [{
+        "properties": {"GlobalID": "{GIS-1}"},
+        "geometry": {"type": "Point", "coordinates": [-91.5015, 44.2525]},
+    }]}
+    (tmp_path / "Parks.json").write_text(json.dumps(layer))
+    monkeypatch.setenv("GIS_DATA_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    get_feature_locations.cache_clear()
+
+    page = create_page(1)
+    assert (page["lat"], page["lon"]) == (44.2525, -91.5015)
+    response = client.put("/api/v1/pages/1/Page 1", json={"gisId": "{GIS-9}"})
+    assert response.status_code == 200
+    page = client.get("/api/v1/pages/1/Page 1").json()
+    assert page["gisId"] == "{GIS-9}"
+    assert page.get("lat") is None and page.get("lon") is None and page.get("geohash") is None
@@ -0,0 +1,30 @@
+from prometheus_client import REGISTRY
+
+from app.config import get_settings
+
+
+def calls(operation):
+    return REGISTRY.get_sample_value(
+        "dynamodb_call_duration_seconds_count", {"table": "AppPages", "operation": operation}
+    ) or 0
+
+
+def test_metrics_need_the_token(client, monkeypatch):
+    import app.main
+
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(app.main, "settings", get_settings().model_copy(update={"metrics_token": "secret"}))
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert "dynamodb_call_duration_seconds" in response.text
+
+
+def test_client_calls_are_recorded(repo, create_page):
+    create_page(1, tags="hiking", published=True)
+    transactions, batch_gets = calls("transact_write_items"), calls("batch_get_item")
+    assert [page["id"] for page in repo.search_pages(tag="hiking", published=True)] == [1]
+    repo.delete_page("1", "Page 1")
+    assert calls("batch_get_item") == batch_gets + 1
+    assert calls("transact_write_items") == transactions + 1
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from app.database import repository
+from app.jobs import scheduled_publish
+
+
+def stored(aws, page_id, title=None):
+    return aws.Table("AppPages").get_item(Key={"id": page_id, "title": title or f"Page {page_id}"}).get("Item")
+
+
+def test_set_published_many_chunks_transactions(aws, repo, create_page, monkeypatch):
+    for page_id in range(1, 151):
+        create_page(page_id)
+    calls = []
+    transact = repo._transact_publish
+    monkeypatch.setattr(repo, "_transact_publish", lambda keys, *args: calls.append(len(keys)) or transact(keys, *args))
+
+    result = repo.set_published_many([(page_id, f"Page {page_id}") for page_id in range(1, 151)])
+    assert calls == [100, 50]
+    assert result["updated"] == 150 and result["missing"] == []
+    page = stored(aws, 150)
+    assert page["published"] is True and page["published_at"] == result["published_at"]
+    assert page["syncBucket"] == repository.SYNC_BUCKET
+
+
+def test_set_published_many_skips_missing_pages(aws, repo, create_page):
+    create_page(1)
+    create_page(2)
+    result = repo.set_published_many([(1, "Page 1"), (99, "Gone"), (2, "Page 2"), (1, "Page 1")])
+    # The transaction is cancelled by the missing key, then retried without it
+    assert result["updated"] == 2
+    assert result["missing"] == [(99, "Gone")]
+    assert stored(aws, 1)["published"] and stored(aws, 2)["published"]
+    assert stored(aws, 99, "Gone") is None
+
+
+def test_unpublish_keeps_page_off_sync_bucket_change(aws, repo, create_page):
+    create_page(1, published=True)
+    result = repo.set_published_many([(1, "Page 1")], published=False)
+    assert result["published_at"] is None
+    page = stored(aws, 1)
+    assert page["published"] is False
+    # Once published, the page stays on the feed so clients learn it was unpublished
+    assert page["syncBucket"] == repository.SYNC_BUCKET
+
+
+def test_set_published_many_backs_off_on_conflicts(repo, create_page, monkeypatch):
+    create_page(1)
+    sleeps = []
+    monkeypatch.setattr(repository.time, "sleep", sleeps.append)
+    outcomes = iter([["TransactionConflict"], ["TransactionConflict"], None])
+    monkeypatch.setattr(repo, "_transact_publish", lambda *args: next(outcomes))
+
+    assert repo.set_published_many([(1, "Page 1")])["updated"] == 1
+    assert len(sleeps) == 2
+
+    monkeypatch.setattr(repo, "_transact_publish", lambda *args: ["TransactionConflict"])
+    with pytest.raises(HTTPException) as error:
+        repo.set_published_many([(1, "Page 1")], max_attempts=3)
+    assert error.value.status_code == 409
+
+
+def test_scheduled_publish_applies_due_entries(aws, repo, create_page):
+    for page_id in (1, 2, 3):
+        create_page(page_id)
+    now = datetime(2030, 1, 1, 12, 0)
+    repo.schedule_publish([(1, "Page 1"), (2, "Page 2")], now - timedelta(minutes=5))
+    repo.schedule_publish([(3, "Page 3")], now + timedelta(hours=1))
+    repo.schedule_publish([(42, "Deleted")], now - timedelta(minutes=1))
+
+    assert scheduled_publish.run_due(now=now, dry_run=True)["due"] == 3
+    stats = scheduled_publish.run_due(now=now)
+    assert stats == {"due": 3, "updated": 2, "missing": 1, "batches": 2}
+    page = stored(aws, 1)
+    assert page["published"] and page["published_at"] == (now - timedelta(minutes=5)).isoformat()
+    assert not stored(aws, 3).get("published")
+    # Applied entries are removed; the future one is still queued
+    assert [entry["id"] for entry in repo.get_scheduled()] == [3]
+    assert scheduled_publish.run_due(now=now)["due"] == 0
+
+
+def test_bulk_publish_route(client, create_page):
+    create_page(1)
+    response = client.post("/api/v1/pages/publish/bulk", json={
+        "pages": [{"id": 1, "title": "Page 1"}, {"id": 2, "title": "Page 2"}],
+        "published": True,
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated"] == 1 and body["missing"] == [{"id": 2, "title": "Page 2"}]
+
+
+def test_scheduling_without_schedule_table(client, monkeypatch):
+    from app.config import get_settings
+
+    monkeypatch.setenv("PUBLISH_SCHEDULE_TABLE", "")
+    get_settings.cache_clear()
+    response = client.post("/api/v1/pages/publish/schedule", json={
+        "pages": [{"id": 1, "title": "Page 1"}],
+        "publish_at": (datetime.utcnow() + timedelta(hours=1)).isoformat(),
+    })
+    assert response.status_code == 503
+    assert client.get("/api/v1/pages/publish/schedule").status_code == 503
+    assert scheduled_publish.run_due()["due"] == 0
@@ -0,0 +1,92 @@
+import pytest
+from app.sketches.hyperloglog import HyperLogLog, hash64
+from app.sketches.space_saving import SpaceSaving
+from app.sketches.store import SketchBuffer, SketchStore, sketch_key, window_start
+
+
+def test_hll_estimate_within_error():
+    sketch = HyperLogLog(12)
+    for i in range(20000):
+        sketch.add(f"device-{i}")
+    # Standard error at p=12 is ~1.6%; allow four of them
+    assert sketch.count() == pytest.approx(20000, rel=0.065)
+
+
+def test_hll_small_counts_and_duplicates():
+    sketch = HyperLogLog()
+    for _ in range(3):
+        for i in range(10):
+            sketch.add(str(i))
+    assert sketch.count() == 10
+
+
+def test_hll_merge_is_union():
+    a, b = HyperLogLog(10), HyperLogLog(10)
+    a.update(hash64(f"x{i}") for i in range(5000))
+    b.update(hash64(f"x{i}") for i in range(2500, 7500))
+    assert a.merge(b).count() == pytest.approx(7500, rel=0.13)
+
+
+def test_hll_serialization_round_trip():
+    sketch = HyperLogLog(8)
+    sketch.update(hash64(str(i)) for i in range(300))
+    copy = HyperLogLog.from_bytes(sketch.to_bytes())
+    assert copy.precision == 8 and copy.count() == sketch.count()
+
+
+def test_hll_rejects_bad_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+    with pytest.raises(ValueError):
+        HyperLogLog(17)
+
+
+def test_window_start():
+    timestamp = 1_700_000_000
+    assert window_start(timestamp, "hour") == timestamp - timestamp % 3600
+    assert window_start(timestamp, "day") % 86400 == 0
+    # Weeks start on Monday 00:00 UTC (1970-01-05 was a Monday)
+    assert (window_start(timestamp, "week") - 4 * 86400) % (7 * 86400) == 0
+
+
+class FailingStore:
+    """SketchStore stand-in that fails after a number of merges"""
+
+    def __init__(self, fail_after: int):
+        self.fail_after = fail_after
+        self.merged = {}
+
+    def merge(self, key, window, update, expires_at=None):
+        if len(self.merged) >= self.fail_after:
+            raise RuntimeError("throttled")
+        self.merged[(key, window)] = update(self.merged.get((key, window)))
+
+
+def test_flush_failure_keeps_unwritten_updates():
+    store = FailingStore(fail_after=1)
+    buffer = SketchBuffer(store)
+    buffer.add_unique("Home#view", 1_700_000_000, "device-1")
+    buffer.add_event("Home#view", 1_700_000_000)
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    # One window was written; the rest is still buffered and nothing is merged twice
+    assert len(store.merged) == 1
+    store.fail_after = 100
+    buffer.flush()
+    assert len(store.merged) == 2 + 3
+    hour = window_start(1_700_000_000, "hour")
+    assert HyperLogLog.from_bytes(store.merged[(sketch_key("hll", "hour", "Home#view"), hour)]).count() == 1
+    assert SpaceSaving.from_bytes(store.merged[(sketch_key("topk", "hour", "all"), hour)]).top(1) == [("Home#view", 1, 0)]
+
+
+def test_store_merges_across_flushes(aws):
+    store = SketchStore(aws.Table("AnalyticsSketches"))
+    buffer = SketchBuffer(store, precision=10)
+    for flush_round in range(2):
+        for i in range(50):
+            buffer.add_unique("Map#view", 1_700_000_000, f"device-{flush_round * 25 + i}")
+        buffer.flush()
+    day = window_start(1_700_000_000, "day")
+    item = store.get(sketch_key("hll", "day", "Map#view"), day)
+    assert int(item["version"]) == 2
+    assert HyperLogLog.from_bytes(item["data"].value).count() == pytest.approx(75, abs=3)
@@ -0,0 +1,105 @@
+import os
+import time
+from app.database import snapshot
+from app.database.snapshot import PublishedSnapshot, SnapshotManager, mark_stale, write_snapshot
+
+PAGES = [
+    {"id": 2, "title": "Bluff", "city": "arcadia", "type": "park", "tags": "hiking,scenic", "published": True},
+    {"id": 1, "title": "Landing", "city": "blair", "type": "water access", "tags": "Kayak", "published": True,
+     "pageContent": "canoe landing on the river"},
+    {"id": 3, "title": "Draft", "city": "arcadia", "type": "park", "tags": "hiking", "published": False},
+]
+
+
+def test_snapshot_holds_published_pages_only(tmp_path):
+    path = str(tmp_path / "pages.snapshot")
+    assert write_snapshot(PAGES, path)["pages"] == 2
+    view = PublishedSnapshot(path)
+    assert len(view) == 2
+    assert view.get(1, "Landing", fields=["id", "city"]) == {"id": 1, "city": "blair"}
+    assert view.get(3, "Draft") is None
+    assert [page["id"] for page in view.iter_pages(10)] == [1, 2]
+    assert view.list_pages(1)["last_evaluated_key"] == {"id": 1, "title": "Landing"}
+
+
+def test_snapshot_search_and_facets(tmp_path):
+    path = str(tmp_path / "pages.snapshot")
+    write_snapshot(PAGES, path)
+    view = PublishedSnapshot(path)
+    assert [page["id"] for page in view.search(tag="HIKING")] == [2]
+    assert [page["id"] for page in view.search(tag="kay")] == []
+    assert [page["id"] for page in view.search(city="arc")] == [2]
+    assert [page["id"] for page in view.search("canoe")] == [1]
+    assert view.facets() == {
+        "city": {"arcadia": 1, "blair": 1},
+        "type": {"park": 1, "water access": 1},
+        "tag": {"hiking": 1, "kayak": 1, "scenic": 1},
+    }
+
+
+def test_snapshot_search_matches_only_the_excerpt_of_offloaded_bodies(aws, tmp_path, create_page):
+    from app.routes.pages import get_repository
+
+    body = "put-in at the bridge. " * 250 + "portage around the dam"
+    create_page(1, pageContent=body, published=True)
+    pages = get_repository().get_all_published_pages(keep_excerpts=True)
+    assert pages[0]["pageContent"] == body and "portage" not in pages[0]["contentExcerpt"]
+
+    path = str(tmp_path / "pages.snapshot")
+    write_snapshot(pages, path)
+    view = PublishedSnapshot(path)
+    # DynamoDB only stores the excerpt of an offloaded body, so only that is searchable
+    assert [page["id"] for page in view.search("bridge")] == [1]
+    assert list(view.search("portage")) == []
+    assert view.get(1, "Page 1") == {key: value for key, value in pages[0].items() if key != "contentExcerpt"}
+
+
+def test_rebuild_skips_fresh_file(tmp_path):
+    builds = []
+    manager = SnapshotManager(str(tmp_path / "pages.snapshot"), build=lambda: builds.append(1) or PAGES)
+    assert manager.rebuild() and len(builds) == 1
+    # Younger than refresh_seconds, and started after this change
+    assert manager.rebuild() and len(builds) == 1
+    assert manager.rebuild(changed_at=time.time() - 60) and len(builds) == 1
+    assert manager.rebuild(changed_at=time.time() + 1) and len(builds) == 2
+    assert manager.rebuild(force=True) and len(builds) == 3
+
+
+def test_rebuild_reports_busy_lock(tmp_path):
+    import fcntl
+    path = str(tmp_path / "pages.snapshot")
+    manager = SnapshotManager(path, build=lambda: PAGES)
+    with open(path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        assert manager.rebuild() is False
+    assert manager.rebuild() is True
+
+
+def test_stale_marker_invalidates(tmp_path, monkeypatch):
+    path = str(tmp_path / "pages.snapshot")
+    manager = SnapshotManager(path, build=lambda: PAGES, check_interval=0)
+    changes = []
+    monkeypatch.setattr(manager, "invalidate", changes.append)
+    manager._reload()
+    assert changes == []
+    mark_stale(path)
+    os.utime(path + ".stale", (time.time() + 5, time.time() + 5))
+    manager._reload()
+    assert changes == [os.path.getmtime(path + ".stale")]
+    manager._reload()
+    assert len(changes) == 1
+
+
+def test_repository_serves_published_reads_from_snapshot(aws, monkeypatch, create_page):
+    create_page(1, tags="hiking", published=True)
+    create_page(2, tags="hiking")
+    monkeypatch.setenv("SNAPSHOT_ENABLED", "true")
+    snapshot.get_settings.cache_clear()
+    snapshot.get_snapshot_manager.cache_clear()
+    from app.routes.pages import get_repository
+    repo = get_repository()
+    repo.snapshot.rebuild(force=True)
+    # Reads no longer touch the table
+    aws.Table("AppPages").delete_item(Key={"id": 1, "title": "Page 1"})
+    assert [page["id"] for page in repo.search_pages(tag="hiking", published=True)] == [1]
+    assert repo.get_facets(published=True)["tag"] == {"hiking": 1}
@@ -0,0 +1,20 @@
+from app.sketches.space_saving import SpaceSaving
+
+
+def test_space_saving_keeps_heavy_hitters():
+    summary = SpaceSaving(capacity=5)
+    summary.update({"a": 100, "b": 50, "c": 30})
+    for i in range(40):
+        summary.add(f"noise-{i}")
+    top = summary.top(3)
+    assert [key for key, _, _ in top] == ["a", "b", "c"]
+    for key, count, error in top:
+        # Counts are overestimates bounded by their error
+        assert count - error <= {"a": 100, "b": 50, "c": 30}[key] <= count
+    assert summary.total == 220
+
+
+def test_space_saving_serialization_round_trip():
+    summary = SpaceSaving(3).update({"x": 3, "y": 2, "z": 1, "w": 1})
+    copy = SpaceSaving.from_bytes(summary.to_bytes())
+    assert copy.top(3) == summary.top(3) and copy.total == summary.total
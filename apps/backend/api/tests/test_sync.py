@@ -0,0 +1,64 @@
+import pytest
+from fastapi import HTTPException
+
+
+def feed(repo, cursor=None, limit=100):
+    return repo.get_changes(cursor=cursor, limit=limit)
+
+
+def ops(result):
+    return [(change["op"], change["id"]) for change in result["changes"]]
+
+
+def test_sync_feed_reports_published_pages_only(repo, create_page):
+    create_page(1, published=True)
+    create_page(2)
+    assert ops(feed(repo)) == [("upsert", 1)]
+
+    repo.publish_page("2", "Page 2")
+    repo.update_page("1", "Page 1", {"published": False})
+    result = feed(repo)
+    assert sorted(ops(result)) == [("delete", 1), ("upsert", 2)]
+    # The cursor picks up after the last change
+    assert feed(repo, result["cursor"])["changes"] == []
+
+
+def test_sync_feed_cursor_pages_through_changes(repo, create_page):
+    for page_id in range(1, 6):
+        create_page(page_id, published=True)
+    seen, cursor = [], None
+    while True:
+        result = feed(repo, cursor, limit=2)
+        seen += [change["id"] for change in result["changes"]]
+        cursor = result["cursor"]
+        if not result["has_more"]:
+            break
+    assert sorted(seen) == [1, 2, 3, 4, 5]
+
+
+def test_delete_writes_tombstone_for_published_pages(aws, repo, create_page):
+    create_page(1, published=True)
+    create_page(2)
+    cursor = feed(repo)["cursor"]
+    repo.delete_page("1", "Page 1")
+    repo.delete_page("2", "Page 2")
+    assert ops(feed(repo, cursor)) == [("delete", 1)]
+    assert aws.Table("PageTombstones").scan()["Count"] == 1
+    with pytest.raises(HTTPException) as error:
+        repo.delete_page("1", "Page 1")
+    assert error.value.status_code == 404
+
+
+def test_without_tombstones_table_deletes_skip_the_feed(aws, create_page, monkeypatch):
+    from app.config import get_settings
+    from app.routes.pages import get_repository
+
+    monkeypatch.setenv("SYNC_TOMBSTONES_TABLE", "")
+    get_settings.cache_clear()
+    repo = get_repository()
+    create_page(1, published=True)
+    repo.delete_page("1", "Page 1")
+    assert aws.Table("PageTombstones").scan()["Count"] == 0
+    with pytest.raises(HTTPException) as error:
+        feed(repo)
+    assert error.value.status_code == 503
@@ -0,0 +1,53 @@
+from app.utils.tags import join_tags, normalize_tags
+
+
+def test_normalize_splits_trims_lowercases_and_dedupes():
+    assert normalize_tags("snow,Ski, ski,, ,Hiking ") == ["snow", "ski", "hiking"]
+
+
+def test_normalize_accepts_lists_and_empty_values():
+    assert normalize_tags([" ATV", "atv", "", None, "trail"]) == ["atv", "trail"]
+    assert normalize_tags(None) == []
+    assert normalize_tags("") == []
+
+
+def test_join_tags_is_stored_form():
+    assert join_tags(["Kayak", "fishing ", "kayak"]) == "kayak,fishing"
+    assert join_tags(None) == ""
+
+
+def test_tag_index_search(aws, repo, create_page):
+    create_page(1, tags="Fishing,camping", published=True)
+    create_page(2, tags="fishing", published=True)
+    create_page(3, tags="fishing")
+    assert aws.Table("PageTags").scan()["Count"] == 4
+
+    assert sorted(page["id"] for page in repo.search_pages(tag="FISHING", published=True)) == [1, 2]
+    repo.update_page("2", "Page 2", {"tags": "camping"})
+    assert [page["id"] for page in repo.iter_search_pages(tag="fishing", published=True)] == [1]
+    assert sorted(page["id"] for page in repo.search_pages(tag="camping", published=True, limit=10)) == [1, 2]
+
+
+def test_tag_search_without_matches(client, create_page):
+    create_page(1, tags="hiking", published=True)
+    response = client.get("/api/v1/pages/search", params={"tag": "zzz", "published": "true"})
+    assert response.status_code == 200
+    assert response.json() == {"pages": []}
+
+    for stream, body in (("ndjson", ""), ("json", '{"pages":[]}')):
+        response = client.get("/api/v1/pages/search", params={"tag": "zzz", "published": "true", "stream": stream})
+        assert response.status_code == 200
+        assert response.text == body
+
+
+def test_tag_search_without_tag_table(aws, monkeypatch):
+    from app.config import get_settings
+    from app.routes.pages import get_repository
+
+    monkeypatch.setenv("PAGE_TAGS_TABLE", "")
+    get_settings.cache_clear()
+    repo = get_repository()
+    repo.create_page({"id": 1, "title": "Page 1"})
+    repo.update_page("1", "Page 1", {"tags": "fishing", "published": True})
+    assert aws.Table("PageTags").scan()["Count"] == 0
+    assert [page["id"] for page in repo.search_pages(tag="fishing", published=True)] == [1]
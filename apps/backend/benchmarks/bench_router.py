@@ -0,0 +1,146 @@
+"""
+In-process trail router vs OSRM on the same origin/destination pairs.
+
+Builds the routing service's trail graph (routingSpecificApi/fastapi/trail_graph.py)
+for each profile, samples node pairs from it and times, per pair, the local A*
+query (snapping included) and an OSRM /route request over a keep-alive
+connection. Pairs can be limited to short hops with --max-distance-m, which is
+the case /route now serves locally.
+
+Without --osrm-url the stub OSRM from stubs.py is started in-process, so the
+OSRM column is HTTP and (de)serialization overhead only, and distances are not
+compared. Point --osrm-url at a real osrm-routed built for the profile to compare
+latency and route lengths.
+
+    python bench_router.py --pairs 500 --profiles foot,atv,snowmobile
+    python bench_router.py --osrm-url http://localhost:4000 --profiles foot --max-distance-m 1500
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from report import percentile
+from run import ROUTING_DIR, free_port, git_revision
+from stubs import make_osrm_handler
+
+
+def latency_summary(latencies: list) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+def sample_pairs(graph, haversine_m, count: int, max_distance_m: float, rng: random.Random) -> list:
+    """(lat1, lon1, lat2, lon2) pairs of graph nodes, at most max_distance_m apart if given"""
+    pairs = []
+    attempts = 0
+    while len(pairs) < count and attempts < count * 1000:
+        attempts += 1
+        a, b = rng.randrange(len(graph)), rng.randrange(len(graph))
+        points = (graph.lat[a], graph.lon[a], graph.lat[b], graph.lon[b])
+        if a == b or (max_distance_m and haversine_m(*points) > max_distance_m):
+            continue
+        pairs.append(points)
+    return pairs
+
+
+def bench_profile(profile: str, args, osrm_url: str, rng: random.Random) -> dict:
+    from trail_graph import get_trail_graph, haversine_m
+
+    started = time.perf_counter()
+    graph = get_trail_graph(profile)
+    build_s = time.perf_counter() - started
+    if graph is None:
+        return {"profile": profile, "error": "no trail layers"}
+    pairs = sample_pairs(graph, haversine_m, args.pairs, args.max_distance_m, rng)
+
+    local_latencies, local_found, local_distances = [], 0, []
+    for lat1, lon1, lat2, lon2 in pairs:
+        t0 = time.perf_counter()
+        result = graph.route(lat1, lon1, lat2, lon2)
+        local_latencies.append(time.perf_counter() - t0)
+        local_found += result is not None
+        local_distances.append(result["distance_m"] if result else None)
+
+    session = requests.Session()
+    osrm_latencies, osrm_errors, osrm_distances = [], 0, []
+    for lat1, lon1, lat2, lon2 in pairs:
+        url = f"{osrm_url}/route/v1/{profile}/{lon1},{lat1};{lon2},{lat2}"
+        t0 = time.perf_counter()
+        try:
+            res = session.get(url, params={"overview": "full", "geometries": "geojson", "steps": "false"}, timeout=10)
+            data = res.json()
+            osrm_latencies.append(time.perf_counter() - t0)
+            routes = data.get("routes") or []
+            osrm_distances.append(routes[0]["distance"] if res.status_code == 200 and routes else None)
+        except (requests.RequestException, ValueError):
+            osrm_errors += 1
+            osrm_distances.append(None)
+
+    result = {
+        "profile": profile,
+        "nodes": len(graph),
+        "contracted_nodes": graph.key_nodes,
+        "build_ms": round(build_s * 1000, 1),
+        "pairs": len(pairs),
+        "trails": {**latency_summary(local_latencies), "found": local_found},
+        "osrm": {**latency_summary(osrm_latencies), "errors": osrm_errors},
+    }
+    if args.osrm_url:
+        # Route length on the trails relative to OSRM's, for pairs both engines routed
+        ratios = sorted(t / o for t, o in zip(local_distances, osrm_distances) if t and o)
+        result["distance_ratio_p50"] = round(percentile(ratios, 50), 3) if ratios else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--profiles", default="foot,atv,snowmobile")
+    parser.add_argument("--max-distance-m", type=float, default=0, help="Only pairs at most this far apart (0: any)")
+    parser.add_argument("--osrm-url", help="Real OSRM to compare against (default: in-process stub)")
+    parser.add_argument("--osrm-latency-ms", type=float, default=0.0, help="Artificial stub OSRM latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROUTING_DIR)
+    osrm_url = args.osrm_url
+    if not osrm_url:
+        port = free_port()
+        server = ThreadingHTTPServer(("127.0.0.1", port), make_osrm_handler(args.osrm_latency_ms / 1000))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        osrm_url = f"http://127.0.0.1:{port}"
+
+    rng = random.Random(args.seed)
+    results = [bench_profile(profile.strip(), args, osrm_url, rng) for profile in args.profiles.split(",")]
+
+    print(f"{'profile':<12}{'nodes':>8}{'contr.':>8}{'build ms':>10}  {'engine':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['profile']:<12}{result['error']}")
+            continue
+        for engine in ("trails", "osrm"):
+            row = result[engine]
+            print(f"{result['profile']:<12}{result['nodes']:>8}{result['contracted_nodes']:>8}{result['build_ms']:>10}  "
+                  f"{engine:<8}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+
+    if args.out:
+        report = {"meta": {"git": git_revision(), "args": vars(args)}, "profiles": results}
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
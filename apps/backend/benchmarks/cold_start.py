@@ -0,0 +1,183 @@
+"""
+Cold-start benchmark for the Lambda entrypoint (app.lambda_handler).
+
+Each sample is a fresh Python process, like a new Lambda execution environment:
+it imports the handler module (the init phase: app import, boto3 clients, JWKS
+prefetch, warm-up request) and then invokes it with synthetic API Gateway events.
+DynamoDB/S3 are served by a local moto server and the JWKS by the stub server.
+
+    python cold_start.py --samples 10 --out cold_start.json
+    python cold_start.py --baseline main.json --max-regression 0.2
+    python cold_start.py --lazy          # LAMBDA_EAGER_INIT=false: init on first call
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from contextlib import ExitStack
+
+from report import percentile
+from run import API_DIR, APP_CLIENT_ID, BUCKET, REGION, USER_POOL_ID, free_port, git_revision, start, wait_http
+from tokens import LocalIssuer
+
+# Runs inside the sampled process; prints one JSON line with timings in ms
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app.lambda_handler as lh
+init_ms = (time.perf_counter() - t0) * 1000
+
+def event(path, token=None):
+    headers = {"host": "bench.local"}
+    if token:
+        headers["authorization"] = "Bearer " + token
+    return {
+        "version": "2.0", "routeKey": "$default", "rawPath": path, "rawQueryString": "",
+        "headers": headers, "isBase64Encoded": False,
+        "requestContext": {"http": {"method": "GET", "path": path, "protocol": "HTTP/1.1",
+                                    "sourceIp": "127.0.0.1"}, "requestId": "bench", "stage": "$default"},
+    }
+
+class Context:
+    function_name = "bench"
+    aws_request_id = "bench"
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+token = sys.argv[1]
+timings = {"init_ms": init_ms}
+for name, path, auth in (("first_public_ms", "/api/v1/pages/published", False),
+                         ("first_auth_ms", "/api/v1/protected", True),
+                         ("warm_public_ms", "/api/v1/pages/published", False)):
+    t = time.perf_counter()
+    response = lh.handler(event(path, token if auth else None), Context())
+    timings[name] = (time.perf_counter() - t) * 1000
+    if response["statusCode"] >= 500:
+        timings["errors"] = timings.get("errors", 0) + 1
+print(json.dumps(timings))
+"""
+
+METRICS = ("init_ms", "first_public_ms", "first_auth_ms", "warm_public_ms", "cold_total_ms")
+
+
+def top_imports(env: dict, limit: int = 15) -> list:
+    """Slowest modules (cumulative microseconds) from python -X importtime"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.lambda_handler"],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=10, help="Fresh processes to start")
+    parser.add_argument("--lazy", action="store_true", help="Defer init to the first invocation")
+    parser.add_argument("--out", default="cold_start.json")
+    parser.add_argument("--baseline", help="Report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cold-start-")
+    issuer = LocalIssuer(REGION, USER_POOL_ID, APP_CLIENT_ID)
+    jwks_file = os.path.join(workdir, "jwks.json")
+    with open(jwks_file, "w") as f:
+        json.dump(issuer.jwks(), f)
+
+    ports = {name: free_port() for name in ("moto", "osrm", "jwks")}
+    moto_url = f"http://127.0.0.1:{ports['moto']}"
+    aws_env = {"AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench", "AWS_DEFAULT_REGION": REGION}
+    os.environ.update(aws_env)
+
+    samples = []
+    with ExitStack() as stack:
+        start(stack, [sys.executable, "-m", "moto.server", "-p", str(ports["moto"])],
+              log_path=os.path.join(workdir, "moto.log"))
+        start(stack, [sys.executable, "stubs.py", "--osrm-port", str(ports["osrm"]),
+                      "--jwks-port", str(ports["jwks"]), "--jwks-file", jwks_file])
+        wait_http(f"{moto_url}/moto-api/")
+        wait_http(f"http://127.0.0.1:{ports['jwks']}/")
+
+        import boto3
+        sys.path.insert(0, API_DIR)
+        from app.database.schema import create_tables
+
+        create_tables(boto3.resource("dynamodb", region_name=REGION, endpoint_url=moto_url))
+        boto3.client("s3", region_name=REGION, endpoint_url=moto_url).create_bucket(Bucket=BUCKET)
+
+        env = {
+            **os.environ,
+            "AWS_REGION": REGION,
+            "COGNITO_USER_POOL_ID": USER_POOL_ID,
+            "COGNITO_APP_CLIENT_ID": APP_CLIENT_ID,
+            "COGNITO_DOMAIN": "bench.local",
+            "COGNITO_JWKS_URL": f"http://127.0.0.1:{ports['jwks']}/jwks.json",
+            "DYNAMODB_TABLE_NAME": "AppPages",
+            "DYNAMODB_ENDPOINT_URL": moto_url,
+            "S3_BUCKET_NAME": BUCKET,
+            "S3_ENDPOINT_URL": moto_url,
+            "LOG_LEVEL": "WARNING",
+            "LAMBDA_EAGER_INIT": "false" if args.lazy else "true",
+        }
+        token = issuer.access_token()
+        for i in range(args.samples):
+            proc = subprocess.run([sys.executable, "-c", PROBE, token], cwd=API_DIR, env=env,
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                sys.exit(f"sample {i} failed:\n{proc.stderr}")
+            sample = json.loads(proc.stdout.strip().splitlines()[-1])
+            sample["cold_total_ms"] = sample["init_ms"] + sample["first_public_ms"]
+            samples.append(sample)
+            print(f"sample {i + 1}/{args.samples}: init {sample['init_ms']:.0f} ms, "
+                  f"first request {sample['first_public_ms']:.0f} ms")
+        imports = top_imports(env)
+
+    summary = {}
+    for metric in METRICS:
+        values = sorted(s[metric] for s in samples)
+        summary[metric] = {
+            "p50": round(percentile(values, 50), 1),
+            "p90": round(percentile(values, 90), 1),
+            "max": round(values[-1], 1),
+        }
+    report = {
+        "meta": {"revision": git_revision(), "samples": args.samples, "lazy": args.lazy},
+        "summary": summary,
+        "errors": sum(s.get("errors", 0) for s in samples),
+        "slowest_imports": imports,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'metric':<18}{'p50':>10}{'p90':>10}{'max':>10}")
+    for metric, stats in summary.items():
+        print(f"{metric:<18}{stats['p50']:>10.1f}{stats['p90']:>10.1f}{stats['max']:>10.1f}")
+    print("\nslowest imports (cumulative ms):")
+    for row in imports:
+        print(f"  {row['cumulative_ms']:>8.1f}  {row['module']}")
+    print(f"Report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["summary"]
+        problems = []
+        for metric, stats in summary.items():
+            before = baseline.get(metric, {}).get("p50")
+            if before and stats["p50"] > before * (1 + args.max_regression):
+                problems.append(f"{metric} p50 {before:.1f} -> {stats['p50']:.1f} ms")
+        for problem in problems:
+            print("REGRESSION", problem)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
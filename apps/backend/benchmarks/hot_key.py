@@ -0,0 +1,139 @@
+"""
+Hot-key benchmark for Analytics write sharding.
+
+Drives a burst of log_event writes where one event (like an app-open) takes most
+of the traffic, with sharding off, with the event configured as hot, and with
+automatic hot-key detection. For each mode it reports write throughput, how the
+hottest event's writes spread over partition keys, the per-key write rate that
+spread implies at --target-rps against DynamoDB's 1000 WCU/s per-key limit, and
+checks that get_event_analytics merges the shards back to the exact total.
+
+moto (the default stand-in) does not throttle, so the per-key projection is the
+number to watch; point --dynamodb-endpoint at DynamoDB Local for realistic latency.
+
+    python hot_key.py --writes 5000 --threads 16 --shards 8 --target-rps 3000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from run import API_DIR, BUCKET, REGION, free_port, start, wait_http
+
+PARTITION_KEY_WCU_LIMIT = 1000
+HOT_EVENT = "App Open"
+
+
+def make_events(writes: int, hot_share: float, seed: int) -> list:
+    rng = random.Random(seed)
+    cold = [f"Trail {i}#view" for i in range(50)]
+    return [HOT_EVENT if rng.random() < hot_share else rng.choice(cold) for _ in range(writes)]
+
+
+def run_mode(name: str, table, sharding, events: list, threads: int, target_rps: float) -> dict:
+    from app.database.repository import AnalyticsRepository
+    from app.database.sharding import logical_event
+
+    repo = AnalyticsRepository(table, sharding=sharding)
+    tag = f"[{name}] "
+    timestamp = int(time.time()) // 60 * 60
+    errors = defaultdict(int)
+
+    def write(event):
+        try:
+            repo.log_event(tag + event, timestamp)
+        except Exception as e:
+            errors[type(e).__name__] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(write, events))
+    elapsed = time.perf_counter() - started
+
+    # Writes per stored key for the hot event (one minute bucket, so key == partition key)
+    per_key = defaultdict(int)
+    scan_kwargs = {}
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response["Items"]:
+            if item["event"].startswith(tag + HOT_EVENT) and int(item["timestamp"]) == timestamp:
+                per_key[item["event"]] += int(item["count"])
+        if "LastEvaluatedKey" not in response:
+            break
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    hot_writes = sum(1 for e in events if e == HOT_EVENT)
+    merged = repo.get_event_analytics(event_name=tag + HOT_EVENT, event_type=None, limit=100000)
+    merged_total = sum(row["count"] for row in merged if row["timestamp"] == timestamp)
+    busiest_share = max(per_key.values()) / len(events) if per_key else 0
+    return {
+        "mode": name,
+        "writes_per_s": len(events) / elapsed,
+        "errors": dict(errors),
+        "hot_keys": len(per_key),
+        "busiest_key_share": busiest_share,
+        "projected_key_wcu": busiest_share * target_rps,
+        "merged_ok": merged_total == hot_writes and logical_event(merged[0]["event"]) == tag + HOT_EVENT,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--hot-share", type=float, default=0.6, help="Fraction of writes going to the hot event")
+    parser.add_argument("--target-rps", type=float, default=3000, help="Production write rate to project per-key load for")
+    parser.add_argument("--detect-threshold", type=float, default=20, help="writes/s that mark an event hot")
+    parser.add_argument("--dynamodb-endpoint", help="DynamoDB-compatible endpoint instead of a local moto server")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench", "AWS_DEFAULT_REGION": REGION,
+        "AWS_REGION": REGION, "COGNITO_USER_POOL_ID": "bench", "COGNITO_APP_CLIENT_ID": "bench",
+        "COGNITO_DOMAIN": "bench.local", "DYNAMODB_TABLE_NAME": "AppPages", "S3_BUCKET_NAME": BUCKET,
+        "LOG_LEVEL": "WARNING",
+    })
+    sys.path.insert(0, API_DIR)
+
+    with ExitStack() as stack:
+        endpoint = args.dynamodb_endpoint
+        if not endpoint:
+            port = free_port()
+            endpoint = f"http://127.0.0.1:{port}"
+            start(stack, [sys.executable, "-m", "moto.server", "-p", str(port)],
+                  log_path=os.path.join(tempfile.mkdtemp(prefix="hot-key-"), "moto.log"))
+            wait_http(f"{endpoint}/moto-api/")
+        os.environ["DYNAMODB_ENDPOINT_URL"] = endpoint
+
+        from app.database.dynamodb import get_dynamodb_resource, get_dynamodb_table
+        from app.database.schema import create_tables
+        from app.database.sharding import HotKeyDetector, WriteSharding
+
+        create_tables(get_dynamodb_resource(), ["Analytics"])
+        table = get_dynamodb_table("Analytics")
+        events = make_events(args.writes, args.hot_share, args.seed)
+        modes = [
+            ("unsharded", WriteSharding(1)),
+            ("configured", WriteSharding(args.shards, hot_events=[f"[configured] {HOT_EVENT}"])),
+            ("detected", WriteSharding(args.shards, detector=HotKeyDetector(args.detect_threshold, window_s=1.0))),
+        ]
+        results = [run_mode(name, table, sharding, events, args.threads, args.target_rps) for name, sharding in modes]
+
+    print(f"{args.writes} writes, {args.hot_share:.0%} to '{HOT_EVENT}', projected at {args.target_rps:.0f} writes/s\n")
+    print(f"{'mode':<12}{'writes/s':>10}{'keys':>6}{'busiest':>9}{'key WCU/s':>11}  {'limit':<6}{'merge':<7}errors")
+    for r in results:
+        over = "OVER" if r["projected_key_wcu"] > PARTITION_KEY_WCU_LIMIT else "ok"
+        print(f"{r['mode']:<12}{r['writes_per_s']:>10.0f}{r['hot_keys']:>6}{r['busiest_key_share']:>9.1%}"
+              f"{r['projected_key_wcu']:>11.0f}  {over:<6}{'ok' if r['merged_ok'] else 'FAIL':<7}{r['errors'] or ''}")
+    sys.exit(0 if all(r["merged_ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Concurrent load generator: weighted scenarios covering every API and routing route"""
+import asyncio
+import itertools
+import random
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+import httpx
+
+API = "/api/v1"
+
+
+class LoadContext:
+    """Shared state for scenarios: base URLs, tokens, seeded data and the latency recorder"""
+
+    def __init__(self, api_url: str, routing_url: str, access_token: str, id_token: str, data: dict, seed: int):
+        self.api_url = api_url.rstrip("/")
+        self.routing_url = routing_url.rstrip("/")
+        self.access = {"Authorization": f"Bearer {access_token}"}
+        self.id = {"Authorization": f"Bearer {id_token}"}
+        self.data = data
+        self.published = [p for p in data["pages"] if p["published"]]
+        self.rng = random.Random(seed)
+        self.recording = False
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._new_page_ids = itertools.count(10_000_000)
+
+    def page(self, published_only: bool = False) -> dict:
+        return self.rng.choice(self.published if published_only else self.data["pages"])
+
+    def new_page_id(self) -> int:
+        return next(self._new_page_ids)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            await response.aread()
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - start
+        if self.recording:
+            self.latencies[name].append(elapsed)
+            if response is None or response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+
+Scenario = Callable[[LoadContext, httpx.AsyncClient], "asyncio.Future"]
+
+
+async def health(ctx, client):
+    await ctx.request(client, "GET /health", "GET", f"{ctx.api_url}/health")
+
+async def public(ctx, client):
+    await ctx.request(client, "GET /public", "GET", f"{ctx.api_url}{API}/public")
+
+async def protected(ctx, client):
+    await ctx.request(client, "GET /protected", "GET", f"{ctx.api_url}{API}/protected", headers=ctx.access)
+
+async def user_profile(ctx, client):
+    await ctx.request(client, "GET /user/profile", "GET", f"{ctx.api_url}{API}/user/profile", headers=ctx.id)
+
+async def user_me(ctx, client):
+    await ctx.request(client, "GET /user/me", "GET", f"{ctx.api_url}{API}/user/me", headers=ctx.access)
+
+async def list_pages(ctx, client):
+    await ctx.request(client, "GET /pages", "GET", f"{ctx.api_url}{API}/pages/", params={"limit": 50}, headers=ctx.access)
+
+async def list_published(ctx, client):
+    await ctx.request(client, "GET /pages/published", "GET", f"{ctx.api_url}{API}/pages/published", params={"limit": 50})
+
+async def list_published_cards(ctx, client):
+    params = {"limit": 50, "fields": "id,title,image,city,type"}
+    await ctx.request(client, "GET /pages/published?fields", "GET", f"{ctx.api_url}{API}/pages/published", params=params)
+
+async def search_term(ctx, client):
+    params = {"q": ctx.rng.choice(ctx.data["words"]), "published": True, "limit": 50}
+    await ctx.request(client, "GET /pages/search?q", "GET", f"{ctx.api_url}{API}/pages/search", params=params)
+
+async def search_tag(ctx, client):
+    params = {"tag": ctx.rng.choice(ctx.data["tags"]), "published": True, "limit": 50}
+    await ctx.request(client, "GET /pages/search?tag", "GET", f"{ctx.api_url}{API}/pages/search", params=params)
+
+async def search_city_type(ctx, client):
+    params = {"city": ctx.rng.choice(ctx.data["cities"]), "type": ctx.rng.choice(ctx.data["types"]), "limit": 50}
+    await ctx.request(client, "GET /pages/search?city&type", "GET", f"{ctx.api_url}{API}/pages/search", params=params)
+
+async def facets(ctx, client):
+    params = {"published": ctx.rng.random() < 0.8}
+    # Counts over all pages (drafts included) need a token
+    headers = None if params["published"] else ctx.access
+    await ctx.request(client, "GET /pages/facets", "GET", f"{ctx.api_url}{API}/pages/facets", params=params, headers=headers)
+
+async def nearby(ctx, client):
+    page = ctx.page()
+    params = {"lat": page["lat"], "lon": page["lon"], "radius": ctx.rng.choice([1000, 5000, 20000])}
+    await ctx.request(client, "GET /pages/nearby", "GET", f"{ctx.api_url}{API}/pages/nearby", params=params)
+
+async def changes(ctx, client):
+    await ctx.request(client, "GET /pages/changes", "GET", f"{ctx.api_url}{API}/pages/changes", params={"limit": 100})
+
+async def get_page(ctx, client):
+    page = ctx.page()
+    await ctx.request(client, "GET /pages/{id}/{title}", "GET", f"{ctx.api_url}{API}/pages/{page['id']}/{page['title']}", headers=ctx.access)
+
+async def get_published_page(ctx, client):
+    page = ctx.page(published_only=True)
+    await ctx.request(client, "GET /pages/published/{id}/{title}", "GET", f"{ctx.api_url}{API}/pages/published/{page['id']}/{page['title']}")
+
+async def count(ctx, client):
+    await ctx.request(client, "GET /pages/count", "GET", f"{ctx.api_url}{API}/pages/count")
+
+async def exists(ctx, client):
+    await ctx.request(client, "GET /pages/exists", "GET", f"{ctx.api_url}{API}/pages/exists", params={"gis_id": ctx.page()["gisId"]})
+
+async def exists_bulk(ctx, client):
+    # A map viewport: a couple of hundred features, most without a page
+    gis_ids = [ctx.page()["gisId"] for _ in range(50)] + [f"{{missing-{ctx.rng.random()}}}" for _ in range(150)]
+    await ctx.request(client, "POST /pages/exists/bulk", "POST", f"{ctx.api_url}{API}/pages/exists/bulk",
+                      json={"gis_ids": gis_ids})
+
+async def update_page(ctx, client):
+    page = ctx.page()
+    await ctx.request(client, "PUT /pages/{id}/{title}", "PUT", f"{ctx.api_url}{API}/pages/{page['id']}/{page['title']}",
+                      json={"city": page["city"]}, headers=ctx.access)
+
+async def publish_page(ctx, client):
+    page = ctx.page(published_only=True)
+    await ctx.request(client, "PUT /pages/publish/{id}/{title}", "PUT", f"{ctx.api_url}{API}/pages/publish/{page['id']}/{page['title']}",
+                      headers=ctx.access)
+
+async def create_delete(ctx, client):
+    page_id = ctx.new_page_id()
+    body = {"id": page_id, "title": f"Bench {page_id}", "gisId": ctx.page()["gisId"], "pageContent": "benchmark"}
+    await ctx.request(client, "POST /pages", "POST", f"{ctx.api_url}{API}/pages/", json=body, headers=ctx.access)
+    await ctx.request(client, "DELETE /pages/{id}/{title}", "DELETE", f"{ctx.api_url}{API}/pages/{page_id}/{body['title']}",
+                      headers=ctx.access)
+
+async def upload_url(ctx, client):
+    body = {"file_name": f"bench-{ctx.rng.randrange(10**6)}.jpg", "content_type": "image/jpeg"}
+    await ctx.request(client, "POST /pages/generate-upload-url", "POST", f"{ctx.api_url}{API}/pages/generate-upload-url",
+                      json=body, headers=ctx.access)
+
+async def analytics_recent(ctx, client):
+    await ctx.request(client, "GET /analytics", "GET", f"{ctx.api_url}{API}/analytics/", params={"limit": 100})
+
+async def analytics_event(ctx, client):
+    params = {"event_name": ctx.rng.choice(ctx.data["events"]), "group": "hour", "limit": 1000}
+    await ctx.request(client, "GET /analytics/event", "GET", f"{ctx.api_url}{API}/analytics/event", params=params)
+
+async def analytics_log(ctx, client):
+    # Zipf-like: a few events take most of the writes, like app-open in production
+    events = ctx.data["events"]
+    event = events[min(int(ctx.rng.paretovariate(1.2)) - 1, len(events) - 1)]
+    params = {"event": event, "device_id": f"bench-device-{ctx.rng.randrange(5000)}"}
+    await ctx.request(client, "POST /analytics/log", "POST", f"{ctx.api_url}{API}/analytics/log", params=params)
+
+async def analytics_unique(ctx, client):
+    params = {"event": ctx.rng.choice(ctx.data["events"])}
+    await ctx.request(client, "GET /analytics/unique", "GET", f"{ctx.api_url}{API}/analytics/unique", params=params)
+
+async def analytics_trending(ctx, client):
+    params = {"window": ctx.rng.choice(["hour", "day", "week"]), "k": 10}
+    await ctx.request(client, "GET /analytics/trending", "GET", f"{ctx.api_url}{API}/analytics/trending", params=params)
+
+async def bundles_latest(ctx, client):
+    await ctx.request(client, "GET /bundles/latest", "GET", f"{ctx.api_url}{API}/bundles/latest", params={"version": 1})
+
+async def export_pages(ctx, client):
+    await ctx.request(client, "GET /export/pages", "GET", f"{ctx.api_url}{API}/export/pages",
+                      params={"fields": "id,title"}, headers=ctx.access)
+
+async def route(ctx, client):
+    a, b = ctx.page(), ctx.page()
+    body = {
+        "origin": {"latitude": a["lat"], "longitude": a["lon"]},
+        "destination": {"latitude": b["lat"], "longitude": b["lon"]},
+        "profile": ctx.rng.choices(["foot", "bike", "atv"], weights=[6, 2, 2])[0],
+    }
+    await ctx.request(client, "POST /route", "POST", f"{ctx.routing_url}/route", json=body)
+
+async def isochrone(ctx, client):
+    if not ctx.data.get("trail_points"):
+        return
+    point = ctx.rng.choice(ctx.data["trail_points"])
+    body = {"origin": {"latitude": point["lat"], "longitude": point["lon"]}, "minutes": [10, 20]}
+    await ctx.request(client, "POST /isochrone", "POST", f"{ctx.routing_url}/isochrone", json=body)
+
+async def routing_health(ctx, client):
+    await ctx.request(client, "GET /route-health", "GET", f"{ctx.routing_url}/health")
+
+
+# (scenario, weight): roughly mirrors mobile-app traffic, with admin writes rare
+SCENARIOS: Dict[str, tuple] = {
+    "health": (health, 1),
+    "public": (public, 1),
+    "protected": (protected, 1),
+    "user_profile": (user_profile, 1),
+    "user_me": (user_me, 1),
+    "list_pages": (list_pages, 2),
+    "list_published": (list_published, 10),
+    "list_published_cards": (list_published_cards, 4),
+    "search_term": (search_term, 6),
+    "search_tag": (search_tag, 6),
+    "search_city_type": (search_city_type, 4),
+    "facets": (facets, 4),
+    "nearby": (nearby, 6),
+    "changes": (changes, 4),
+    "get_page": (get_page, 3),
+    "get_published_page": (get_published_page, 15),
+    "count": (count, 2),
+    "exists": (exists, 10),
+    "exists_bulk": (exists_bulk, 2),
+    "update_page": (update_page, 1),
+    "publish_page": (publish_page, 1),
+    "create_delete": (create_delete, 1),
+    "upload_url": (upload_url, 1),
+    "analytics_recent": (analytics_recent, 1),
+    "analytics_event": (analytics_event, 2),
+    "analytics_log": (analytics_log, 15),
+    "analytics_unique": (analytics_unique, 2),
+    "analytics_trending": (analytics_trending, 2),
+    "bundles_latest": (bundles_latest, 2),
+    "route": (route, 5),
+    "isochrone": (isochrone, 2),
+    "routing_health": (routing_health, 1),
+}
+
+# Expensive admin operations, only run when asked for
+HEAVY_SCENARIOS: Dict[str, tuple] = {
+    "export_pages": (export_pages, 1),
+}
+
+
+async def _worker(ctx: LoadContext, client: httpx.AsyncClient, scenarios: List[Scenario], weights: List[float], deadline: float):
+    while time.perf_counter() < deadline:
+        scenario = ctx.rng.choices(scenarios, weights=weights)[0]
+        await scenario(ctx, client)
+
+
+async def run_load(ctx: LoadContext, scenario_names: List[str], concurrency: int, duration_s: float, warmup_s: float) -> float:
+    """Drive the selected scenarios with `concurrency` workers; returns the measured wall time"""
+    table = {**SCENARIOS, **HEAVY_SCENARIOS}
+    scenarios = [table[name][0] for name in scenario_names]
+    weights = [table[name][1] for name in scenario_names]
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        if warmup_s > 0:
+            deadline = time.perf_counter() + warmup_s
+            await asyncio.gather(*(_worker(ctx, client, scenarios, weights, deadline) for _ in range(concurrency)))
+
+        ctx.recording = True
+        start = time.perf_counter()
+        deadline = start + duration_s
+        await asyncio.gather(*(_worker(ctx, client, scenarios, weights, deadline) for _ in range(concurrency)))
+        ctx.recording = False
+        return time.perf_counter() - start
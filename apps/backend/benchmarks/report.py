@@ -0,0 +1,94 @@
+"""
+Latency/throughput reports and regression comparison.
+
+    python report.py baseline.json candidate.json --max-regression 0.15
+
+exits non-zero when any route's p95 (or throughput) regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, wall_s: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / wall_s, 2) if wall_s else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def build_report(latencies: Dict[str, List[float]], errors: Dict[str, int], wall_s: float, meta: dict) -> dict:
+    all_latencies = [v for values in latencies.values() for v in values]
+    return {
+        "meta": meta,
+        "total": summarize(all_latencies, sum(errors.values()), wall_s),
+        "routes": {
+            name: summarize(values, errors.get(name, 0), wall_s)
+            for name, values in sorted(latencies.items())
+        },
+    }
+
+
+def format_report(report: dict) -> str:
+    header = f"{'route':<40} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    lines = [header, "-" * len(header)]
+    rows = [*report["routes"].items(), ("TOTAL", report["total"])]
+    for name, s in rows:
+        lines.append(
+            f"{name:<40} {s['count']:>7} {s['errors']:>5} {s['rps']:>8.1f} "
+            f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(baseline: dict, candidate: dict, max_regression: float) -> List[str]:
+    """Describe routes whose p95 latency or throughput got worse than the allowed ratio"""
+    problems = []
+    for name, new in {**candidate["routes"], "TOTAL": candidate["total"]}.items():
+        old = baseline["total"] if name == "TOTAL" else baseline["routes"].get(name)
+        if not old or not old["count"] or not new["count"]:
+            continue
+        if old["p95_ms"] and new["p95_ms"] > old["p95_ms"] * (1 + max_regression):
+            problems.append(f"{name}: p95 {old['p95_ms']:.2f} ms -> {new['p95_ms']:.2f} ms")
+        if old["rps"] and new["rps"] < old["rps"] * (1 - max_regression):
+            problems.append(f"{name}: throughput {old['rps']:.1f} -> {new['rps']:.1f} rps")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(format_report(candidate))
+    problems = compare(baseline, candidate, args.max_regression)
+    for problem in problems:
+        print("REGRESSION", problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+End-to-end benchmark for the backend. Starts local stand-ins (moto for DynamoDB
+and S3, a stub OSRM, a local JWKS), the API and the routing service as separate
+processes, seeds realistic data and drives every route with concurrent load.
+
+    python run.py --duration 60 --concurrency 32 --out report.json
+    python run.py --baseline main.json --max-regression 0.15   # fail on regressions
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+API_DIR = os.path.join(HERE, "..", "api")
+ROUTING_DIR = os.path.join(HERE, "..", "routingSpecificApi", "fastapi")
+MOBILE_LIB = os.path.join(HERE, "..", "..", "mobile", "lib")
+sys.path.insert(0, API_DIR)
+
+REGION = "us-east-1"
+USER_POOL_ID = "us-east-1_bench"
+APP_CLIENT_ID = "bench-client"
+BUCKET = "bench-bucket"
+METRICS_TOKEN = "bench-metrics"
+
+from load import HEAVY_SCENARIOS, SCENARIOS, LoadContext, run_load  # noqa: E402
+from report import build_report, compare, format_report  # noqa: E402
+from tokens import LocalIssuer  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_http(url: str, timeout_s: float = 30) -> None:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout_s}s")
+
+
+def start(stack: ExitStack, args: list, cwd: str = HERE, env: dict = None, log_path: str = None) -> subprocess.Popen:
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    proc = subprocess.Popen(args, cwd=cwd, env={**os.environ, **(env or {})}, stdout=log, stderr=subprocess.STDOUT)
+
+    def stop():
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    stack.callback(stop)
+    return proc
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds of load")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured warm-up seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=1500, help="Seeded AppPages items")
+    parser.add_argument("--analytics-rows", type=int, default=20000, help="Seeded Analytics per-minute rows")
+    parser.add_argument("--api-workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--osrm-latency-ms", type=float, default=5.0, help="Artificial stub OSRM latency")
+    parser.add_argument("--dynamodb-endpoint", help="Use an existing DynamoDB-compatible endpoint (e.g. DynamoDB Local) instead of moto")
+    parser.add_argument("--scenarios", help="Comma-separated scenario names (default: all light scenarios)")
+    parser.add_argument("--heavy", action="store_true", help="Also run expensive admin scenarios (export)")
+    parser.add_argument("--admission", action="store_true",
+                        help="Keep the API's admission control on (the load comes from one client, so most expensive calls get shed)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--baseline", help="Report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    args = parser.parse_args()
+
+    if args.scenarios:
+        scenario_names = [s.strip() for s in args.scenarios.split(",")]
+    else:
+        scenario_names = list(SCENARIOS) + (list(HEAVY_SCENARIOS) if args.heavy else [])
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    issuer = LocalIssuer(REGION, USER_POOL_ID, APP_CLIENT_ID)
+    jwks_file = os.path.join(workdir, "jwks.json")
+    with open(jwks_file, "w") as f:
+        json.dump(issuer.jwks(), f)
+
+    ports = {name: free_port() for name in ("moto", "osrm", "osrm2", "jwks", "api", "routing")}
+    moto_url = f"http://127.0.0.1:{ports['moto']}"
+    dynamodb_url = args.dynamodb_endpoint or moto_url
+    aws_env = {
+        "AWS_ACCESS_KEY_ID": "bench",
+        "AWS_SECRET_ACCESS_KEY": "bench",
+        "AWS_DEFAULT_REGION": REGION,
+    }
+    os.environ.update(aws_env)
+
+    with ExitStack() as stack:
+        start(stack, [sys.executable, "-m", "moto.server", "-p", str(ports["moto"])],
+              log_path=os.path.join(workdir, "moto.log"))
+        start(stack, [sys.executable, "stubs.py", "--osrm-port", str(ports["osrm"]), "--osrm-port", str(ports["osrm2"]),
+                      "--osrm-latency-ms", str(args.osrm_latency_ms),
+                      "--jwks-port", str(ports["jwks"]), "--jwks-file", jwks_file])
+        wait_http(f"{moto_url}/moto-api/")
+        wait_http(f"http://127.0.0.1:{ports['jwks']}/")
+
+        import boto3
+        from app.database.schema import create_tables
+        from seed import seed
+
+        dynamodb = boto3.resource("dynamodb", region_name=REGION, endpoint_url=dynamodb_url)
+        create_tables(dynamodb)
+        boto3.client("s3", region_name=REGION, endpoint_url=moto_url).create_bucket(Bucket=BUCKET)
+
+        gis_data_dir = os.path.join(MOBILE_LIB, "geojson")
+        print(f"Seeding {args.pages} pages and ~{args.analytics_rows} analytics rows...")
+        data = seed(dynamodb, args.pages, args.analytics_rows, gis_data_dir, args.seed)
+
+        api_env = {
+            **aws_env,
+            "AWS_REGION": REGION,
+            "COGNITO_USER_POOL_ID": USER_POOL_ID,
+            "COGNITO_APP_CLIENT_ID": APP_CLIENT_ID,
+            "COGNITO_DOMAIN": "bench.local",
+            "COGNITO_JWKS_URL": f"http://127.0.0.1:{ports['jwks']}/jwks.json",
+            "DYNAMODB_TABLE_NAME": "AppPages",
+            "DYNAMODB_ENDPOINT_URL": dynamodb_url,
+            "S3_BUCKET_NAME": BUCKET,
+            "S3_ENDPOINT_URL": moto_url,
+            "GIS_DATA_DIR": gis_data_dir,
+            "SYNC_TOMBSTONES_TABLE": "PageTombstones",
+            "PUBLISH_SCHEDULE_TABLE": "PublishSchedule",
+            "PAGE_TAGS_TABLE": "PageTags",
+            "PAGE_FACETS_TABLE": "PageFacets",
+            "METRICS_TOKEN": METRICS_TOKEN,
+            "SEARCH_INDEX_PATH": os.path.join(MOBILE_LIB, "search_index_light.json"),
+            "ADMISSION_ENABLED": "true" if args.admission else "false",
+        }
+        start(stack, [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(ports["api"]),
+                      "--workers", str(args.api_workers), "--log-level", "warning"],
+              cwd=API_DIR, env=api_env, log_path=os.path.join(workdir, "api.log"))
+        start(stack, [sys.executable, "-m", "uvicorn", "main:app", "--port", str(ports["routing"]),
+                      "--log-level", "warning"],
+              cwd=ROUTING_DIR, env={"OSRM_BACKENDS": (
+                  f"foot=http://127.0.0.1:{ports['osrm']},http://127.0.0.1:{ports['osrm2']};"
+                  f"bike=http://127.0.0.1:{ports['osrm']};atv=http://127.0.0.1:{ports['osrm2']}"
+              )},
+              log_path=os.path.join(workdir, "routing.log"))
+
+        api_url = f"http://127.0.0.1:{ports['api']}"
+        routing_url = f"http://127.0.0.1:{ports['routing']}"
+        wait_http(f"{api_url}/health")
+        wait_http(f"{routing_url}/health")
+
+        # One bundle so /bundles/latest has something to plan against
+        httpx.post(f"{api_url}/api/v1/bundles/", headers={"Authorization": f"Bearer {issuer.access_token()}"}, timeout=120)
+
+        ctx = LoadContext(api_url, routing_url, issuer.access_token(), issuer.id_token(), data, args.seed)
+        print(f"Running {len(scenario_names)} scenarios, concurrency {args.concurrency}, {args.duration}s...")
+        wall_s = asyncio.run(run_load(ctx, scenario_names, args.concurrency, args.duration, args.warmup))
+
+        # Server-side view of the same run (per-route latency, DynamoDB capacity, scan ratios)
+        with open(os.path.join(workdir, "metrics.txt"), "w") as f:
+            f.write(httpx.get(f"{api_url}/metrics", headers={"Authorization": f"Bearer {METRICS_TOKEN}"}, timeout=10).text)
+
+    meta = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "wall_s": round(wall_s, 3),
+        "logs": workdir,
+    }
+    report = build_report(ctx.latencies, ctx.errors, wall_s, meta)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(format_report(report))
+    print(f"Report written to {args.out} (service logs in {workdir})")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(json.load(f), report, args.max_regression)
+        for problem in problems:
+            print("REGRESSION", problem)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Seed a local DynamoDB stand-in with realistic page and analytics volumes"""
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, List
+
+CITIES = ["arcadia", "blair", "eleva", "ettrick", "galesville", "independence",
+          "osseo", "pigeon falls", "strum", "trempealeau", "whitehall"]
+TYPES = ["park", "trail", "business", "event", "attraction", "water access"]
+TAGS = ["hiking", "biking", "atv", "snowmobile", "fishing", "camping", "kayak",
+        "family", "dog friendly", "scenic", "history", "parking", "park"]
+WORDS = ("trail park river bluff prairie marsh wildlife view hike camp picnic "
+         "shelter canoe landing bridge creek overlook woods fishing pier").split()
+
+# Rough bounding box of Trempealeau County
+COUNTY_BBOX = (43.98, -91.62, 44.60, -91.15)
+
+
+def load_gis_features(gis_data_dir: str) -> List[dict]:
+    """(GlobalID, lat, lon) of real county features, so gisId lookups and geohashes are realistic"""
+    from app.utils.gis import representative_point
+
+    features = []
+    if not gis_data_dir or not os.path.isdir(gis_data_dir):
+        return features
+    for file_name in sorted(os.listdir(gis_data_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(gis_data_dir, file_name)) as f:
+            for feature in json.load(f).get("features", []):
+                global_id = (feature.get("properties") or {}).get("GlobalID")
+                point = representative_point(feature.get("geometry"))
+                if global_id and point:
+                    features.append({"gisId": global_id, "lat": point[0], "lon": point[1]})
+    return features
+
+
+def load_trail_points(gis_data_dir: str, rng: random.Random, count: int = 200) -> List[dict]:
+    """Random vertices of the foot trail layer, used as isochrone origins"""
+    path = os.path.join(gis_data_dir or "", "Trails.json")
+    if not os.path.exists(path):
+        return []
+    points = []
+    with open(path) as f:
+        for feature in json.load(f).get("features", []):
+            geometry = feature.get("geometry") or {}
+            lines = geometry.get("coordinates") or []
+            for line in [lines] if geometry.get("type") == "LineString" else lines:
+                points.extend({"lat": lat, "lon": lon} for lon, lat, *_ in line)
+    return rng.sample(points, min(count, len(points)))
+
+
+def make_pages(count: int, features: List[dict], rng: random.Random) -> List[dict]:
+    now = datetime.utcnow()
+    pages = []
+    for page_id in range(1, count + 1):
+        feature = features[(page_id - 1) % len(features)] if features else {
+            "gisId": f"{{BENCH-{page_id:08d}}}",
+            "lat": rng.uniform(COUNTY_BBOX[0], COUNTY_BBOX[2]),
+            "lon": rng.uniform(COUNTY_BBOX[1], COUNTY_BBOX[3]),
+        }
+        title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 4))) + f" {page_id}"
+        # Long-tailed content sizes: most pages are short, a few are long articles
+        content_words = int(min(rng.lognormvariate(5.5, 1.0), 8000))
+        updated_at = (now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))).isoformat()
+        pages.append({
+            "id": page_id,
+            "title": title,
+            "city": rng.choice(CITIES),
+            "type": rng.choice(TYPES),
+            "tags": ",".join(rng.sample(TAGS, rng.randint(1, 4))),
+            "image": f"https://example.com/images/{page_id}.jpg",
+            "gisId": feature["gisId"],
+            "lat": Decimal(str(round(feature["lat"], 6))),
+            "lon": Decimal(str(round(feature["lon"], 6))),
+            "pageContent": " ".join(rng.choice(WORDS) for _ in range(content_words)),
+            "published": rng.random() < 0.8,
+            "updated_at": updated_at,
+        })
+    return pages
+
+
+def make_analytics(rows: int, events: List[str], rng: random.Random, days: int = 7) -> Dict[tuple, int]:
+    """Per-minute counters, Zipf-like across events so a few keys are hot"""
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    start = int((now - timedelta(days=days)).timestamp())
+    weights = [1 / (rank + 1) for rank in range(len(events))]
+    counters: Dict[tuple, int] = {}
+    for _ in range(rows):
+        event = rng.choices(events, weights=weights)[0]
+        minute = start + rng.randrange(days * 24 * 60) * 60
+        counters[(event, minute)] = counters.get((event, minute), 0) + rng.randint(1, 5)
+    return counters
+
+
+def seed(dynamodb, page_count: int, analytics_rows: int, gis_data_dir: str, seed_value: int = 42) -> dict:
+    """Write pages and analytics rows; returns the context the load generator needs"""
+    from app.database.repository import PageRepository, GEOHASH_PRECISION, GEOHASH_PREFIX_LENGTH
+    from app.utils import geohash
+    from app.utils.tags import normalize_tags
+    from app.database.facets import FacetStore
+
+    rng = random.Random(seed_value)
+    features = load_gis_features(gis_data_dir)
+    pages = make_pages(page_count, features, rng)
+
+    with dynamodb.Table("AppPages").batch_writer() as batch:
+        for page in pages:
+            point_hash = geohash.encode(float(page["lat"]), float(page["lon"]), GEOHASH_PRECISION)
+            batch.put_item(Item={
+                **page,
+                **PageRepository._sync_fields(page["id"], page["title"], page["updated_at"], published=page["published"]),
+                "geohash": point_hash,
+                "geohashPrefix": point_hash[:GEOHASH_PREFIX_LENGTH],
+            })
+
+    # Tag search reads the PageTags index, which page writes through the API maintain
+    with dynamodb.Table("PageTags").batch_writer() as batch:
+        for page in pages:
+            for tag in normalize_tags(page["tags"]):
+                batch.put_item(Item={"tag": tag, "pageKey": f"{page['id']}#{page['title']}", "id": page["id"], "title": page["title"]})
+
+    # So do the PageFacets counts behind /pages/facets
+    FacetStore(dynamodb.Table("PageFacets")).replace(pages)
+
+    # Hottest first: the load generator picks events Zipf-style by position
+    events = ["App Open", "Home#view", "Map#view"] + [f"{page['title']}#view" for page in pages[:200]]
+    counters = make_analytics(analytics_rows, events, rng)
+    with dynamodb.Table("Analytics").batch_writer() as batch:
+        for (event, minute), count in counters.items():
+            batch.put_item(Item={"event": event, "timestamp": minute, "count": count})
+
+    return {
+        "pages": [
+            {"id": p["id"], "title": p["title"], "gisId": p["gisId"], "city": p["city"], "type": p["type"],
+             "tags": p["tags"].split(","), "lat": float(p["lat"]), "lon": float(p["lon"]), "published": p["published"]}
+            for p in pages
+        ],
+        "events": events,
+        "cities": CITIES,
+        "types": TYPES,
+        "tags": TAGS,
+        "words": WORDS,
+        "trail_points": load_trail_points(gis_data_dir, rng),
+    }
@@ -0,0 +1,119 @@
+"""
+Local stand-ins for the external HTTP services the backend talks to:
+- a stub OSRM that answers /route/v1/... with a straight-line route
+- a static JWKS endpoint serving the benchmark signing key
+
+Run as a separate process so stub work does not compete with the load generator:
+    python stubs.py --osrm-port 5001 --jwks-port 5002 --jwks-file jwks.json
+"""
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371008.8 * math.asin(math.sqrt(a))
+
+
+def _parse_coords(coords: str):
+    return [tuple(float(v) for v in pair.split(",")) for pair in coords.split(";")]
+
+
+def make_osrm_handler(latency_s: float):
+    class OsrmHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body: dict, code: int = 200):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            time.sleep(latency_s)
+            # urlsplit: urlparse would cut the path at the ";" between coordinates
+            parts = urlsplit(self.path).path.strip("/").split("/")
+            # /{service}/v1/{profile}/{coordinates}
+            if len(parts) != 4:
+                return self._send({"code": "InvalidUrl"}, 400)
+            service, coords = parts[0], _parse_coords(parts[3])
+
+            if service == "route":
+                (lon1, lat1), (lon2, lat2) = coords[0], coords[-1]
+                steps = 20
+                line = [
+                    [lon1 + (lon2 - lon1) * i / steps, lat1 + (lat2 - lat1) * i / steps]
+                    for i in range(steps + 1)
+                ]
+                distance = haversine_m(lat1, lon1, lat2, lon2)
+                return self._send({
+                    "code": "Ok",
+                    "routes": [{
+                        "geometry": {"type": "LineString", "coordinates": line},
+                        "distance": distance,
+                        "duration": distance / 1.4,
+                    }],
+                })
+            if service == "nearest":
+                lon, lat = coords[0]
+                return self._send({"code": "Ok", "waypoints": [{"location": [lon, lat], "distance": 0}]})
+            if service == "table":
+                (lon1, lat1) = coords[0]
+                durations = [[haversine_m(lat1, lon1, lat, lon) / 1.4 for lon, lat in coords]]
+                return self._send({"code": "Ok", "durations": durations})
+            return self._send({"code": "InvalidService"}, 400)
+
+    return OsrmHandler
+
+
+def make_jwks_handler(jwks_file: str):
+    with open(jwks_file) as f:
+        body = f.read().encode()
+
+    class JwksHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return JwksHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--osrm-port", type=int, action="append", required=True, help="Repeat for several OSRM backends")
+    parser.add_argument("--osrm-latency-ms", type=float, default=5.0)
+    parser.add_argument("--jwks-port", type=int, required=True)
+    parser.add_argument("--jwks-file", required=True)
+    args = parser.parse_args()
+
+    servers = [
+        ThreadingHTTPServer(("127.0.0.1", port), make_osrm_handler(args.osrm_latency_ms / 1000))
+        for port in args.osrm_port
+    ]
+    servers.append(ThreadingHTTPServer(("127.0.0.1", args.jwks_port), make_jwks_handler(args.jwks_file)))
+    threads = [threading.Thread(target=s.serve_forever, daemon=True) for s in servers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Locally minted Cognito-style RS256 keys and tokens for benchmarks"""
+import time
+import uuid
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+class LocalIssuer:
+    """Signs access/ID tokens that the API's CognitoVerifier accepts when pointed at jwks()"""
+
+    def __init__(self, region: str, user_pool_id: str, app_client_id: str):
+        self.region = region
+        self.user_pool_id = user_pool_id
+        self.app_client_id = app_client_id
+        self.kid = uuid.uuid4().hex
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ).decode()
+        self.public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+
+    @property
+    def issuer(self) -> str:
+        return f"https://cognito-idp.{self.region}.amazonaws.com/{self.user_pool_id}"
+
+    def jwks(self) -> dict:
+        public_jwk = jwk.construct(self.public_pem, "RS256").to_dict()
+        public_jwk.update({"kid": self.kid, "use": "sig", "alg": "RS256"})
+        return {"keys": [public_jwk]}
+
+    def _sign(self, claims: dict) -> str:
+        return jwt.encode(claims, self.private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+    def access_token(self, username: str = "bench-admin", ttl_s: int = 6 * 3600) -> str:
+        now = int(time.time())
+        return self._sign({
+            "sub": str(uuid.uuid5(uuid.NAMESPACE_DNS, username)),
+            "username": username,
+            "client_id": self.app_client_id,
+            "token_use": "access",
+            "scope": "aws.cognito.signin.user.admin",
+            "cognito:groups": ["admin"],
+            "iss": self.issuer,
+            "iat": now,
+            "exp": now + ttl_s,
+        })
+
+    def id_token(self, username: str = "bench-admin", ttl_s: int = 6 * 3600) -> str:
+        now = int(time.time())
+        return self._sign({
+            "sub": str(uuid.uuid5(uuid.NAMESPACE_DNS, username)),
+            "cognito:username": username,
+            "email": f"{username}@example.com",
+            "email_verified": True,
+            "aud": self.app_client_id,
+            "token_use": "id",
+            "iss": self.issuer,
+            "iat": now,
+            "exp": now + ttl_s,
+        })
@@ -0,0 +1,197 @@
+# isochrone.py
+"""
+Reachability ("what can I reach in N minutes") on the in-process trail graph.
+
+One bounded Dijkstra from the start point covers every requested budget: the
+trail points reached within each budget give that budget's area (their convex
+hull) and the points of interest snapped to them give the reachable POIs with
+travel times. POIs are parks and wildlife areas (polygon centers), water
+access points and trailheads (ends of the lines in Trails.json).
+
+Origins are quantized to ORIGIN_DECIMALS (3 decimals, ~100 m) before searching,
+so nearby requests share a cache entry. Results are kept in an LRU cache of
+ISOCHRONE_CACHE_SIZE entries for ISOCHRONE_CACHE_SECONDS.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from trail_graph import DEFAULT_DATA_DIR, MAX_SNAP_METERS, PROFILE_SPEEDS, TrailGraph, get_trail_graph
+
+ORIGIN_DECIMALS = 3
+# POIs farther than this from a trail are left out (park centers can be well inside the park)
+POI_SNAP_METERS = 500.0
+CACHE_SIZE = int(os.environ.get("ISOCHRONE_CACHE_SIZE", "512"))
+CACHE_SECONDS = float(os.environ.get("ISOCHRONE_CACHE_SECONDS", "3600"))
+
+
+def _polygon_center(rings: Sequence[Sequence[Sequence[float]]]) -> Tuple[float, float]:
+    """(lat, lon) average of the outer ring's vertices"""
+    outer = rings[0]
+    return sum(p[1] for p in outer) / len(outer), sum(p[0] for p in outer) / len(outer)
+
+
+def load_pois(data_dir: str) -> List[dict]:
+    """Points of interest from the GeoJSON layers in data_dir: name, kind, latitude, longitude"""
+    def features(name: str) -> list:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f).get("features", [])
+
+    pois = []
+    for name, kind in (("PublicParks.json", "park"), ("WildlifeAreas.json", "wildlife area")):
+        for feature in features(name):
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") == "Polygon":
+                lat, lon = _polygon_center(geometry["coordinates"])
+            elif geometry.get("type") == "MultiPolygon":
+                lat, lon = _polygon_center(max(geometry["coordinates"], key=lambda polygon: len(polygon[0])))
+            else:
+                continue
+            pois.append({"name": feature["properties"].get("Name"), "kind": kind, "latitude": lat, "longitude": lon})
+
+    for feature in features("WaterTrail.json"):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Point":
+            lon, lat = geometry["coordinates"][:2]
+            pois.append({"name": feature["properties"].get("NAME"), "kind": "water access", "latitude": lat, "longitude": lon})
+
+    seen = set()
+    for feature in features("Trails.json"):
+        geometry = feature.get("geometry") or {}
+        lines = geometry.get("coordinates") or []
+        if geometry.get("type") == "LineString":
+            lines = [lines]
+        if not lines:
+            continue
+        properties = feature.get("properties") or {}
+        label = (properties.get("Label_Proper") or "trail").title()
+        name = properties.get("NAME") or (f"{label} {properties['Corridor']}" if properties.get("Corridor") else label)
+        for lon, lat in (lines[0][0][:2], lines[-1][-1][:2]):
+            key = (round(lat, 4), round(lon, 4))
+            if key not in seen:
+                seen.add(key)
+                pois.append({"name": name, "kind": "trailhead", "latitude": lat, "longitude": lon})
+    return pois
+
+
+@lru_cache(maxsize=None)
+def snapped_pois(profile: str) -> List[Tuple[dict, int, float]]:
+    """(poi, nearest node, distance to it) for every POI near the profile's trails"""
+    graph = get_trail_graph(profile)
+    if graph is None:
+        return []
+    snapped = []
+    for poi in load_pois(os.environ.get("TRAIL_DATA_DIR", DEFAULT_DATA_DIR)):
+        found = graph.nearest(poi["latitude"], poi["longitude"], POI_SNAP_METERS)
+        if found is not None:
+            snapped.append((poi, found[0], found[1]))
+    return snapped
+
+
+def convex_hull(points: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Counter-clockwise hull of (x, y) points (Andrew's monotone chain)"""
+    points = sorted(set(points))
+    if len(points) < 3:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower: List[Tuple[float, float]] = []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    upper: List[Tuple[float, float]] = []
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def compute(graph: TrailGraph, profile: str, lat: float, lon: float, minutes: Sequence[int]) -> Optional[dict]:
+    """Isochrones for each budget in minutes, or None when the start isn't near a trail"""
+    start = graph.nearest(lat, lon, MAX_SNAP_METERS)
+    if start is None:
+        return None
+    node, snap_m = start
+    speed = PROFILE_SPEEDS[profile]
+    budgets = sorted(set(minutes))
+    # Getting onto the trail counts against the budget too
+    reached = graph.distances_within(node, max(0.0, max(budgets) * 60 * speed - snap_m))
+
+    isochrones = []
+    for budget in budgets:
+        limit = budget * 60 * speed - snap_m
+        hull = convex_hull([(graph.lon[n], graph.lat[n]) for n, d in reached.items() if d <= limit])
+        isochrones.append({
+            "minutes": budget,
+            "polygon": {"type": "Polygon", "coordinates": [[list(p) for p in hull + hull[:1]]]} if len(hull) >= 3 else None,
+        })
+
+    pois = []
+    for poi, poi_node, poi_snap_m in snapped_pois(profile):
+        if poi_node in reached:
+            travel_m = snap_m + reached[poi_node] + poi_snap_m
+            travel_min = travel_m / speed / 60
+            if travel_min <= budgets[-1]:
+                pois.append({**poi, "distance_m": round(travel_m, 1), "minutes": round(travel_min, 1)})
+    pois.sort(key=lambda poi: poi["minutes"])
+    return {
+        "start": {"latitude": graph.lat[node], "longitude": graph.lon[node]},
+        "isochrones": isochrones,
+        "pois": pois,
+    }
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._items: "OrderedDict[tuple, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[dict]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value: dict) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+cache = TTLCache(CACHE_SIZE, CACHE_SECONDS)
+
+
+def isochrones(profile: str, lat: float, lon: float, minutes: Sequence[int]) -> Optional[dict]:
+    """Cached isochrones from the quantized origin; None when the start is off the trails"""
+    lat, lon = round(lat, ORIGIN_DECIMALS), round(lon, ORIGIN_DECIMALS)
+    key = (profile, lat, lon, tuple(sorted(set(minutes))))
+    result = cache.get(key)
+    if result is None:
+        result = compute(get_trail_graph(profile), profile, lat, lon, minutes)
+        if result is None:
+            return None
+        cache.put(key, result)
+    return result
@@ -1,15 +1,34 @@
 # main.py
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import requests
 import logging
+import os
+import threading
+from typing import List, Optional
+
+from isochrone import isochrones, snapped_pois
+from osrm_pool import DEFAULT_PROFILE, NoBackendError, pool_from_env
+from trail_graph import MAX_SNAP_METERS, PROFILE_LAYERS, PROFILE_SPEEDS, get_trail_graph, haversine_m
 
 logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI()
 
-# OSRM server (inside Docker) exposed on your Mac at port 4000
-OSRM_URL = "http://localhost:4000"
+# OSRM servers (inside Docker) per profile; see osrm_pool.py for OSRM_BACKENDS.
+# Defaults to one foot backend at OSRM_URL (http://localhost:4000).
+osrm = pool_from_env()
+
+# Trips shorter than this (straight line) are routed in-process on the trail
+# graph when both ends are on it; longer ones only fall back to it when OSRM fails.
+TRAIL_LOCAL_MAX_METERS = float(os.environ.get("TRAIL_LOCAL_MAX_METERS", "1500"))
+# ... and when both ends are at most this far from a trail; anything farther off
+# the trails goes to OSRM, which routes the off-trail legs properly.
+TRAIL_LOCAL_MAX_SNAP_METERS = float(os.environ.get("TRAIL_LOCAL_MAX_SNAP_METERS", "50"))
+# ... and when the trail route is at most this many times the straight-line distance;
+# a long way around usually means a road or path OSRM knows and the trails lack.
+TRAIL_LOCAL_MAX_DETOUR = float(os.environ.get("TRAIL_LOCAL_MAX_DETOUR", "3"))
+MAX_ISOCHRONE_MINUTES = 120
 
 
 class Point(BaseModel):
@@ -20,6 +39,29 @@ class Point(BaseModel):
 class RouteRequest(BaseModel):
     origin: Point
     destination: Point
+    profile: str = DEFAULT_PROFILE  # foot, bike, atv, ... (whatever OSRM_BACKENDS configures)
+
+
+class IsochroneRequest(BaseModel):
+    origin: Point
+    minutes: List[int] = Field([10, 20], min_length=1, max_length=4)
+    profile: str = DEFAULT_PROFILE  # foot, bike, atv or snowmobile
+
+
+@app.on_event("startup")
+def start_health_checks():
+    osrm.start()
+    # Build the trail graphs off the request path
+    threading.Thread(
+        target=lambda: [snapped_pois(profile) for profile in PROFILE_LAYERS],
+        name="trail-graphs",
+        daemon=True,
+    ).start()
+
+
+@app.on_event("shutdown")
+def stop_health_checks():
+    osrm.stop()
 
 
 @app.get("/health")
@@ -27,13 +69,48 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/backends")
+def backends():
+    """Health, requests in flight, request/error counts and latency per OSRM backend"""
+    return osrm.stats()
+
+
+def trail_route(profile: str, o: Point, d: Point, max_snap_m: float = MAX_SNAP_METERS) -> Optional[dict]:
+    """
+    The /route response computed on the in-process trail graph, or None if the profile has none.
+    Ends farther than max_snap_m from the trails get an empty route.
+    """
+    graph = get_trail_graph(profile)
+    if graph is None:
+        return None
+    found = graph.route(o.latitude, o.longitude, d.latitude, d.longitude, max_snap_m)
+    if found is None:
+        return {"coords": [], "distance_m": None, "duration_s": None, "engine": "trails"}
+    return {
+        "coords": [{"latitude": lat, "longitude": lon} for lat, lon in found["coords"]],
+        "distance_m": found["distance_m"],
+        "duration_s": found["distance_m"] / PROFILE_SPEEDS.get(profile, PROFILE_SPEEDS[DEFAULT_PROFILE]),
+        "engine": "trails",
+    }
+
+
+def trail_fallback(profile: str, o: Point, d: Point) -> Optional[dict]:
+    """The trail graph's route when OSRM fails, or None if it has none to offer"""
+    local = trail_route(profile, o, d)
+    return local if local and local["coords"] else None
+
+
 @app.post("/route")
 def route(req: RouteRequest):
     """
     Takes origin & destination in (lat, lon),
-    calls OSRM (foot profile), and returns
+    calls OSRM for the requested profile, and returns
     a React Native–friendly list of coordinates
     plus distance & duration.
+
+    Short trail hops, profiles without OSRM backends and
+    OSRM failures (unreachable or 5xx) are answered from the
+    trail graph (engine: "trails") when it has a route.
     """
     logger.info(f"Route request: {req}")
     o = req.origin
@@ -48,16 +125,41 @@ def route(req: RouteRequest):
         "steps": "false",
     }
 
+    profile = req.profile.lower()
+    straight_m = haversine_m(o.latitude, o.longitude, d.latitude, d.longitude)
+    if straight_m <= TRAIL_LOCAL_MAX_METERS:
+        local = trail_route(profile, o, d, TRAIL_LOCAL_MAX_SNAP_METERS)
+        if local and local["coords"] and local["distance_m"] <= TRAIL_LOCAL_MAX_DETOUR * max(straight_m, 1.0):
+            return local
+
     try:
-        osrm_res = requests.get(
-            f"{OSRM_URL}/route/v1/foot/{coords_str}",
+        osrm_res = osrm.get(
+            profile,
+            f"route/v1/{profile}/{coords_str}",
             params=params,
             timeout=5,
         )
+    except NoBackendError:
+        local = trail_route(profile, o, d)
+        if local is not None:
+            return local
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile {req.profile!r}; available: {', '.join(sorted(set(osrm.profiles) | set(PROFILE_LAYERS)))}",
+        )
     except requests.exceptions.RequestException as e:
+        local = trail_fallback(profile, o, d)
+        if local is not None:
+            logger.warning(f"OSRM error, answered from the trail graph: {e}")
+            return local
         raise HTTPException(status_code=502, detail=f"OSRM error: {e}")
 
     if osrm_res.status_code != 200:
+        # A 4xx is about the request itself, which the trail graph can't fix
+        local = trail_fallback(profile, o, d) if osrm_res.status_code >= 500 else None
+        if local is not None:
+            logger.warning(f"OSRM status {osrm_res.status_code}, answered from the trail graph")
+            return local
         raise HTTPException(
             status_code=502,
             detail=f"OSRM status {osrm_res.status_code}: {osrm_res.text}",
@@ -70,7 +172,7 @@ def route(req: RouteRequest):
 
     if data.get("code") != "Ok" or not data.get("routes"):
         # No route found
-        return {"coords": [], "distance_m": None, "duration_s": None}
+        return {"coords": [], "distance_m": None, "duration_s": None, "engine": "osrm"}
 
     route0 = data["routes"][0]
     geometry = route0["geometry"]        # GeoJSON LineString
@@ -87,4 +189,27 @@ def route(req: RouteRequest):
         "coords": coords,
         "distance_m": distance_m,
         "duration_s": duration_s,
+        "engine": "osrm",
     }
+
+
+@app.post("/isochrone")
+def isochrone(req: IsochroneRequest):
+    """
+    What can be reached from origin within each time
+    budget along the trails: an area (GeoJSON polygon)
+    per budget, plus parks, wildlife areas, water access
+    points and trailheads with their travel times.
+    """
+    profile = req.profile.lower()
+    if get_trail_graph(profile) is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile {req.profile!r}; available: {', '.join(sorted(PROFILE_LAYERS))}",
+        )
+    if any(m < 1 or m > MAX_ISOCHRONE_MINUTES for m in req.minutes):
+        raise HTTPException(status_code=400, detail=f"minutes must be between 1 and {MAX_ISOCHRONE_MINUTES}")
+    result = isochrones(profile, req.origin.latitude, req.origin.longitude, req.minutes)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Origin is not near a trail")
+    return {"profile": profile, **result}
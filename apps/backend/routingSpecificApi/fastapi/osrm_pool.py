@@ -0,0 +1,190 @@
+# osrm_pool.py
+"""
+Pool of OSRM backends per routing profile.
+
+Each profile (foot, bike, atv, ...) is served by one or more osrm-routed
+processes built from that profile's .osrm files. Backends are configured with
+OSRM_BACKENDS:
+
+    OSRM_BACKENDS="foot=http://localhost:4000,http://localhost:4001;bike=http://localhost:4010;atv=http://localhost:4020"
+
+Without it, OSRM_URL (default http://localhost:4000) is the only foot backend.
+
+Requests go to the healthy backend with the fewest requests in flight. A backend
+that fails (connection error, timeout or 5xx) is marked down and the request is
+retried once on another one; a background thread probes every backend each
+OSRM_HEALTH_INTERVAL seconds and brings it back when it answers again.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("uvicorn.error")
+
+DEFAULT_PROFILE = "foot"
+# A point inside Trempealeau County, used by the nearest-service health probe (lon,lat)
+HEALTH_COORDINATE = "-91.43,44.15"
+
+
+class NoBackendError(Exception):
+    """No backend is configured for the requested profile"""
+
+
+class Backend:
+    """One osrm-routed process, with its own connection pool and counters"""
+
+    def __init__(self, profile: str, url: str, pool_size: int = 32):
+        self.profile = profile
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency_s = 0.0
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_ms": round(1000 * self.latency_s / self.requests, 2) if self.requests else None,
+            "last_error": self.last_error,
+        }
+
+
+def parse_backends(spec: str) -> Dict[str, List[str]]:
+    """'foot=http://a,http://b;bike=http://c' -> {"foot": ["http://a", "http://b"], "bike": ["http://c"]}"""
+    pools: Dict[str, List[str]] = {}
+    for entry in spec.split(";"):
+        if not entry.strip():
+            continue
+        profile, _, urls = entry.partition("=")
+        if not urls:
+            raise ValueError(f"OSRM_BACKENDS entry {entry!r} is not profile=url[,url...]")
+        pools.setdefault(profile.strip().lower(), []).extend(u.strip() for u in urls.split(",") if u.strip())
+    return pools
+
+
+class OsrmPool:
+    """Least-outstanding-requests balancing over the backends of each profile"""
+
+    def __init__(self, pools: Dict[str, List[str]], health_interval: float = 5.0, health_timeout: float = 2.0):
+        self.backends: Dict[str, List[Backend]] = {
+            profile: [Backend(profile, url) for url in urls] for profile, urls in pools.items() if urls
+        }
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def profiles(self) -> List[str]:
+        return sorted(self.backends)
+
+    def _acquire(self, profile: str, tried: List[Backend]) -> Optional[Backend]:
+        candidates = [b for b in self.backends[profile] if b not in tried]
+        # When every backend looks down, try them anyway rather than fail outright
+        healthy = [b for b in candidates if b.healthy] or candidates
+        if not healthy:
+            return None
+        with self._lock:
+            fewest = min(b.outstanding for b in healthy)
+            backend = random.choice([b for b in healthy if b.outstanding == fewest])
+            backend.outstanding += 1
+            return backend
+
+    def get(self, profile: str, path: str, params: Optional[dict] = None, timeout: float = 5) -> requests.Response:
+        """
+        GET /{path} on a backend for profile, e.g. path="route/v1/foot/<coords>".
+        Raises NoBackendError for an unknown profile and the last
+        requests.RequestException if every attempt failed.
+        """
+        if profile not in self.backends:
+            raise NoBackendError(profile)
+        tried: List[Backend] = []
+        error: Optional[requests.RequestException] = None
+        response = None
+        for _ in range(min(2, len(self.backends[profile]))):
+            backend = self._acquire(profile, tried)
+            if backend is None:
+                break
+            tried.append(backend)
+            started = time.perf_counter()
+            try:
+                response = backend.session.get(f"{backend.url}/{path}", params=params, timeout=timeout)
+                if response.status_code < 500:
+                    backend.healthy = True
+                    return response
+                error = None
+                backend.last_error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = e
+                backend.last_error = str(e)
+            finally:
+                with self._lock:
+                    backend.outstanding -= 1
+                    backend.requests += 1
+                    backend.latency_s += time.perf_counter() - started
+            with self._lock:
+                backend.errors += 1
+            backend.healthy = False
+            logger.warning(f"OSRM backend {backend.url} ({profile}) failed: {backend.last_error}")
+        if error is not None:
+            raise error
+        return response
+
+    def check_health(self) -> None:
+        """Probe every backend with a nearest-service request"""
+        for profile, backends in self.backends.items():
+            for backend in backends:
+                try:
+                    res = backend.session.get(
+                        f"{backend.url}/nearest/v1/{profile}/{HEALTH_COORDINATE}", timeout=self.health_timeout
+                    )
+                    healthy = res.status_code < 500
+                    error = None if healthy else f"HTTP {res.status_code}"
+                except requests.RequestException as e:
+                    healthy, error = False, str(e)
+                if healthy != backend.healthy:
+                    logger.info(f"OSRM backend {backend.url} ({profile}) is {'up' if healthy else 'down'}")
+                backend.healthy = healthy
+                if error:
+                    backend.last_error = error
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception:
+                logger.exception("OSRM health check failed")
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="osrm-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, List[dict]]:
+        return {profile: [b.stats() for b in backends] for profile, backends in self.backends.items()}
+
+
+def pool_from_env() -> OsrmPool:
+    spec = os.environ.get("OSRM_BACKENDS")
+    pools = parse_backends(spec) if spec else {DEFAULT_PROFILE: [os.environ.get("OSRM_URL", "http://localhost:4000")]}
+    return OsrmPool(pools, health_interval=float(os.environ.get("OSRM_HEALTH_INTERVAL", "5")))
@@ -0,0 +1,94 @@
+import pytest
+from fastapi.testclient import TestClient
+import main
+from trail_graph import TrailGraph
+
+LAT = 44.0
+
+
+class FakeResponse:
+    status_code = 200
+    url = "http://osrm/route"
+    text = ""
+
+    def json(self):
+        return {"code": "Ok", "routes": [{
+            "geometry": {"coordinates": [[-91.010, LAT - 0.002], [-91.000, LAT]]},
+            "distance": 1234.0,
+            "duration": 900.0,
+        }]}
+
+
+class FakePool:
+    profiles = ["foot"]
+
+    def __init__(self):
+        self.calls = 0
+        self.status_code = 200
+
+    def get(self, profile, path, params=None, timeout=5):
+        self.calls += 1
+        response = FakeResponse()
+        response.status_code = self.status_code
+        return response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    graph = TrailGraph([[[-91.010 + i * 0.001, LAT] for i in range(11)]])
+    pool = FakePool()
+    monkeypatch.setattr(main, "get_trail_graph", lambda profile: graph)
+    monkeypatch.setattr(main, "osrm", pool)
+    client = TestClient(main.app)
+    client.pool = pool
+    return client
+
+
+def post_route(client, origin, destination):
+    body = {
+        "origin": {"latitude": origin[0], "longitude": origin[1]},
+        "destination": {"latitude": destination[0], "longitude": destination[1]},
+        "profile": "foot",
+    }
+    return client.post("/route", json=body)
+
+
+def route(client, origin, destination):
+    response = post_route(client, origin, destination)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_short_hop_on_trails_skips_osrm(client):
+    result = route(client, (LAT, -91.010), (LAT + 0.0001, -91.002))
+    assert result["engine"] == "trails" and client.pool.calls == 0
+
+
+def test_short_hop_far_from_trails_goes_to_osrm(client):
+    # ~220 m off the trail: within the fallback snap distance, but not a short hop
+    result = route(client, (LAT - 0.002, -91.010), (LAT, -91.000))
+    assert result["engine"] == "osrm" and result["distance_m"] == 1234.0
+    assert client.pool.calls == 1
+
+
+def test_short_hop_with_long_detour_goes_to_osrm(client, monkeypatch):
+    # Both ends are on a U-shaped trail ~110 m apart, but the trail between them is ~1.7 km
+    u_shape = [[-91.010, LAT], [-91.000, LAT], [-91.000, LAT + 0.001], [-91.010, LAT + 0.001]]
+    monkeypatch.setattr(main, "get_trail_graph", lambda profile: TrailGraph([u_shape]))
+    result = route(client, (LAT, -91.010), (LAT + 0.001, -91.010))
+    assert result["engine"] == "osrm" and client.pool.calls == 1
+
+
+def test_osrm_server_error_falls_back_to_trails(client):
+    client.pool.status_code = 503
+    result = route(client, (LAT - 0.002, -91.010), (LAT, -91.000))
+    assert result["engine"] == "trails" and result["coords"]
+
+
+def test_osrm_errors_without_trail_route_stay_502(client):
+    # A client error is OSRM's answer, not an outage
+    client.pool.status_code = 400
+    assert post_route(client, (LAT - 0.002, -91.010), (LAT, -91.000)).status_code == 502
+    # Too far from any trail for the graph to route
+    client.pool.status_code = 500
+    assert post_route(client, (LAT - 0.1, -91.010), (LAT, -91.000)).status_code == 502
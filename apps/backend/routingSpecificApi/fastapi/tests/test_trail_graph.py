@@ -0,0 +1,121 @@
+import pytest
+from trail_graph import TrailGraph, haversine_m
+
+LAT = 44.0
+# Roughly 80 m of longitude and 111 m of latitude at LAT
+STEP = 0.001
+
+
+def east(start, count, lat=LAT):
+    """[lon, lat] vertices going east from start"""
+    return [[start + i * STEP, lat] for i in range(count)]
+
+
+def north(lon, start, count):
+    return [[lon, start + i * STEP] for i in range(count)]
+
+
+def length(line):
+    return sum(haversine_m(a[1], a[0], b[1], b[0]) for a, b in zip(line, line[1:]))
+
+
+def test_shared_vertices_join_lines_and_chains_contract():
+    main = east(-91.010, 11)
+    branch = north(-91.005, LAT, 6)
+    graph = TrailGraph([main, branch])
+    # The crossing vertex is one node
+    assert len(graph) == 11 + 5
+    # Left on the contracted graph: three dead ends and the junction
+    assert graph.key_nodes == 4
+
+
+def test_route_follows_trails():
+    main = east(-91.010, 11)
+    branch = north(-91.005, LAT, 6)
+    graph = TrailGraph([main, branch])
+    route = graph.route(LAT, -91.010, LAT + 5 * STEP, -91.005)
+    assert route["coords"][0] == (LAT, -91.010)
+    assert route["coords"][-1] == (LAT + 5 * STEP, -91.005)
+    assert route["distance_m"] == pytest.approx(length(main[:6]) + length(branch))
+    # Every step of the path is an edge of the trail
+    assert len(route["coords"]) == 6 + 5
+
+
+def test_route_inside_one_chain():
+    line = east(-91.010, 11)
+    graph = TrailGraph([line])
+    route = graph.route(LAT, line[2][0], LAT, line[7][0])
+    assert route["distance_m"] == pytest.approx(length(line[2:8]))
+    assert [lon for _, lon in route["coords"]] == pytest.approx([point[0] for point in line[2:8]])
+
+
+def test_unconnected_trails_have_no_route():
+    graph = TrailGraph([east(-91.010, 3), east(-91.010, 3, lat=LAT + 0.01)])
+    assert graph.route(LAT, -91.010, LAT + 0.01, -91.010) is None
+    assert graph.route(LAT + 1, -91.010, LAT, -91.010) is None
+
+
+def test_dead_end_near_another_trail_is_snapped():
+    main = east(-91.010, 11)
+    # Starts ~10 m north of a vertex of main, without touching it
+    spur = north(-91.005, LAT + 0.00009, 4)
+    graph = TrailGraph([main, spur])
+    route = graph.route(LAT, -91.010, spur[-1][1], spur[-1][0])
+    assert route is not None
+    assert route["distance_m"] == pytest.approx(length(main[:6]) + 10 + length(spur), abs=1)
+
+
+def test_line_stopping_short_of_another_joins_its_segment():
+    # main has no vertex near where the spur stops ~8 m short of it
+    main = [[-91.010, LAT], [-91.000, LAT]]
+    spur = north(-91.005, LAT + 0.00007, 3)
+    graph = TrailGraph([main, spur])
+    route = graph.route(LAT, -91.010, spur[-1][1], spur[-1][0])
+    assert route is not None
+    assert (LAT, -91.005) in [(round(lat, 6), round(lon, 6)) for lat, lon in route["coords"]]
+    assert route["distance_m"] == pytest.approx(length(main) / 2 + 7.8 + length(spur), abs=1)
+
+
+def test_dead_end_is_not_joined_to_its_own_line():
+    # A dense line: the next vertex along it is the closest node to its end
+    line = [[-91.0 + i * 0.00005, LAT] for i in range(20)]
+    graph = TrailGraph([line])
+    assert graph.key_nodes == 2
+    assert graph.route(LAT, line[0][0], LAT, line[-1][0])["distance_m"] == pytest.approx(length(line))
+
+
+def test_off_trail_legs_are_part_of_the_route():
+    line = east(-91.010, 11)
+    graph = TrailGraph([line])
+    # ~22 m south of the first vertex and ~33 m north of the last
+    route = graph.route(LAT - 0.0002, -91.010, LAT + 0.0003, -91.000)
+    assert route["coords"][0] == (LAT - 0.0002, -91.010)
+    assert route["coords"][-1] == (LAT + 0.0003, -91.000)
+    assert route["distance_m"] == pytest.approx(length(line) + 22.2 + 33.4, abs=0.5)
+    assert graph.route(LAT - 0.0002, -91.010, LAT, -91.000, max_snap_m=10) is None
+
+
+def test_loops_survive_contraction():
+    square = [[-91.0, LAT], [-90.999, LAT], [-90.999, LAT + STEP], [-91.0, LAT + STEP], [-91.0, LAT]]
+    graph = TrailGraph([square])
+    route = graph.route(LAT, -91.0, LAT + STEP, -90.999)
+    # Either way round the loop, whichever is shorter
+    assert route["distance_m"] == pytest.approx(min(length(square[:3]), length(square[2:])))
+
+
+def test_distances_within_budget():
+    line = east(-91.010, 11)
+    graph = TrailGraph([line])
+    source, _ = graph.nearest(LAT, -91.005)
+    reached = graph.distances_within(source, 200)
+    lons = sorted(graph.lon[node] for node in reached)
+    # ~80 m per step: two steps either way fit in 200 m
+    assert lons == pytest.approx([-91.007, -91.006, -91.005, -91.004, -91.003])
+    assert max(reached.values()) <= 200
+
+
+def test_nearest_respects_max_distance():
+    graph = TrailGraph([east(-91.010, 3)])
+    node, distance = graph.nearest(LAT + 0.0001, -91.010)
+    assert distance == pytest.approx(11.1, abs=0.1)
+    assert graph.nearest(LAT + 0.01, -91.010, max_meters=100) is None
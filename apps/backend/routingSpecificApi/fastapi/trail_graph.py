@@ -0,0 +1,482 @@
+# trail_graph.py
+"""
+In-process trail router built from the county trail layers (GeoJSON line
+geometry), used when OSRM is down and for short hops that aren't worth an
+HTTP round trip.
+
+Building a graph:
+- Line vertices become nodes; vertices at the same coordinate (to ~0.1 m) are
+  one node, so lines that share an endpoint or crossing vertex connect.
+- Dangling line ends are joined to the closest point of another line within
+  SNAP_METERS (splitting that line's segment there), which closes the small gaps
+  digitized trails usually have, including lines that stop just short of another.
+- Chains of degree-2 nodes are contracted into single edges between junctions
+  and dead ends (keeping their geometry), which shrinks the search graph by an
+  order of magnitude on trail data.
+- The contracted graph is stored as CSR arrays (offsets/targets/weights).
+
+Queries snap both points to the nearest node and run A* with a haversine
+heuristic; when a point lies inside a contracted chain the search starts (or
+ends) at both of the chain's ends.
+"""
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("uvicorn.error")
+
+EARTH_RADIUS_M = 6371008.8
+# Line ends closer than this to another line are joined to it
+SNAP_METERS = 15.0
+# ... unless it is already within this many SNAP_METERS of them along the lines
+SNAP_WALK_FACTOR = 4
+# A snap this close to an existing vertex joins that vertex instead of splitting the segment
+SNAP_JOIN_METERS = 1.0
+# Farthest a route endpoint may be from the trail network
+MAX_SNAP_METERS = 1000.0
+# Spatial grid used for snapping, in degrees (~110 m of latitude)
+GRID_DEGREES = 0.001
+
+# Layers per routing profile, relative to TRAIL_DATA_DIR
+PROFILE_LAYERS = {
+    "foot": ["Trails.json"],
+    "bike": ["Trails.json"],
+    "atv": ["ATVTrails.json"],
+    "snowmobile": ["SnowmobileTrails.json"],
+}
+# Travel speeds for durations, m/s
+PROFILE_SPEEDS = {"foot": 1.4, "bike": 4.0, "atv": 8.9, "snowmobile": 11.0}
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "mobile", "lib", "geojson")
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def iter_lines(paths: Iterable[str]) -> Iterable[List[Sequence[float]]]:
+    """[lon, lat] vertex lists of every (Multi)LineString in the GeoJSON files"""
+    for path in paths:
+        with open(path) as f:
+            features = json.load(f).get("features", [])
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") == "LineString":
+                yield geometry["coordinates"]
+            elif geometry.get("type") == "MultiLineString":
+                yield from geometry["coordinates"]
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return int(math.floor(lat / GRID_DEGREES)), int(math.floor(lon / GRID_DEGREES))
+
+
+class TrailGraph:
+    """Contracted trail graph in CSR form with A* queries"""
+
+    def __init__(self, lines: Iterable[List[Sequence[float]]]):
+        self.lat = array("d")
+        self.lon = array("d")
+        adjacency = self._build_nodes(lines)
+        self._snap_dead_ends(adjacency)
+        self._contract(adjacency)
+
+    # --- building -------------------------------------------------------
+
+    def _build_nodes(self, lines: Iterable[List[Sequence[float]]]) -> List[Dict[int, float]]:
+        ids: Dict[Tuple[int, int], int] = {}
+        adjacency: List[Dict[int, float]] = []
+        for line in lines:
+            previous = None
+            for point in line:
+                lon, lat = point[0], point[1]
+                key = (round(lat * 1e6), round(lon * 1e6))
+                node = ids.get(key)
+                if node is None:
+                    node = ids[key] = len(self.lat)
+                    self.lat.append(lat)
+                    self.lon.append(lon)
+                    adjacency.append({})
+                if previous is not None and previous != node:
+                    length = haversine_m(self.lat[previous], self.lon[previous], lat, lon)
+                    adjacency[previous][node] = adjacency[node][previous] = length
+                previous = node
+
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        for node in range(len(self.lat)):
+            self.grid.setdefault(_cell(self.lat[node], self.lon[node]), []).append(node)
+        return adjacency
+
+    @staticmethod
+    def _walk(adjacency: List[Dict[int, float]], source: int, max_meters: float) -> Dict[int, float]:
+        """Nodes within max_meters of source along the lines (Dijkstra on the uncontracted graph)"""
+        reached = {source: 0.0}
+        heap = [(0.0, source)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > reached[node]:
+                continue
+            for neighbor, length in adjacency[node].items():
+                cost = distance + length
+                if cost <= max_meters and cost < reached.get(neighbor, math.inf):
+                    reached[neighbor] = cost
+                    heapq.heappush(heap, (cost, neighbor))
+        return reached
+
+    def _add_node(self, lat: float, lon: float, adjacency: List[Dict[int, float]]) -> int:
+        node = len(self.lat)
+        self.lat.append(lat)
+        self.lon.append(lon)
+        adjacency.append({})
+        self.grid.setdefault(_cell(lat, lon), []).append(node)
+        return node
+
+    def _snap_dead_ends(self, adjacency: List[Dict[int, float]]) -> None:
+        """
+        Join each dead end to the closest point within SNAP_METERS on a segment of
+        another line, splitting that segment there. Segments that touch the dead end's
+        own surroundings (nodes within SNAP_WALK_FACTOR * SNAP_METERS along the lines)
+        don't count: the closest segment is usually the dead end's own line.
+        """
+        # Segments by every grid cell their bounding box overlaps
+        segments: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        for a in range(len(adjacency)):
+            for b in adjacency[a]:
+                if a < b:
+                    (r1, c1), (r2, c2) = _cell(self.lat[a], self.lon[a]), _cell(self.lat[b], self.lon[b])
+                    for r in range(min(r1, r2), max(r1, r2) + 1):
+                        for c in range(min(c1, c2), max(c1, c2) + 1):
+                            segments.setdefault((r, c), []).append((a, b))
+
+        # Found against the original segments, then applied per segment
+        snaps: Dict[Tuple[int, int], List[Tuple[float, int]]] = {}
+        for node in range(len(adjacency)):
+            if len(adjacency[node]) != 1:
+                continue
+            nearby = self._walk(adjacency, node, SNAP_WALK_FACTOR * SNAP_METERS)
+            row, col = _cell(self.lat[node], self.lon[node])
+            best, best_distance = None, SNAP_METERS
+            # A grid cell is wider than SNAP_METERS, so the neighbouring cells are enough
+            for r in range(row - 1, row + 2):
+                for c in range(col - 1, col + 2):
+                    for a, b in segments.get((r, c), ()):
+                        if a in nearby or b in nearby:
+                            continue
+                        t, distance = self._project(node, a, b)
+                        if distance <= best_distance:
+                            best, best_distance = (a, b, t), distance
+            if best is not None:
+                a, b, t = best
+                snaps.setdefault((a, b), []).append((t, node))
+
+        for (a, b), points in snaps.items():
+            length = adjacency[a].pop(b)
+            del adjacency[b][a]
+            previous, previous_t = a, 0.0
+            for t, node in sorted(points):
+                if t * length < SNAP_JOIN_METERS:
+                    target = a
+                elif (1 - t) * length < SNAP_JOIN_METERS:
+                    target = b
+                elif previous != a and (t - previous_t) * length < SNAP_JOIN_METERS:
+                    target = previous
+                else:
+                    target = self._add_node(
+                        self.lat[a] + t * (self.lat[b] - self.lat[a]),
+                        self.lon[a] + t * (self.lon[b] - self.lon[a]),
+                        adjacency
+                    )
+                    adjacency[previous][target] = adjacency[target][previous] = haversine_m(
+                        self.lat[previous], self.lon[previous], self.lat[target], self.lon[target]
+                    )
+                    previous, previous_t = target, t
+                if target != node:
+                    adjacency[node][target] = adjacency[target][node] = haversine_m(
+                        self.lat[node], self.lon[node], self.lat[target], self.lon[target]
+                    )
+            adjacency[previous][b] = adjacency[b][previous] = (
+                length if previous == a else
+                haversine_m(self.lat[previous], self.lon[previous], self.lat[b], self.lon[b])
+            )
+
+    def _project(self, node: int, a: int, b: int) -> Tuple[float, float]:
+        """(t, meters): closest point a + t * (b - a) of segment a-b to node, on a local flat projection"""
+        scale = math.radians(EARTH_RADIUS_M)
+        x_scale = scale * math.cos(math.radians(self.lat[node]))
+        ax, ay = (self.lon[a] - self.lon[node]) * x_scale, (self.lat[a] - self.lat[node]) * scale
+        dx, dy = (self.lon[b] - self.lon[a]) * x_scale, (self.lat[b] - self.lat[a]) * scale
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else min(1.0, max(0.0, -(ax * dx + ay * dy) / length2))
+        return t, math.hypot(ax + t * dx, ay + t * dy)
+
+    def _contract(self, adjacency: List[Dict[int, float]]) -> None:
+        """Replace degree-2 chains by edges between the remaining (key) nodes"""
+        count = len(adjacency)
+        key = [len(neighbors) != 2 for neighbors in adjacency]
+        # Chains: node sequences from one key node to another, with cumulative lengths
+        self.chain_offsets = array("i", [0])
+        self.chain_nodes = array("i")
+        self.chain_cum = array("d")
+        # Interior nodes -> (chain, position in chain)
+        self.node_chain = array("i", [-1]) * count
+        self.node_position = array("i", [0]) * count
+        edges: List[List[Tuple[int, float, int]]] = [[] for _ in range(count)]
+        visited = set()
+
+        def walk(start: int, first: int) -> None:
+            path, total, previous, node = [start], 0.0, start, first
+            cum = [0.0]
+            while True:
+                visited.add((min(previous, node), max(previous, node)))
+                total += adjacency[previous][node]
+                path.append(node)
+                cum.append(total)
+                if key[node]:
+                    break
+                previous, node = node, next(n for n in adjacency[node] if n != previous)
+            chain = len(self.chain_offsets) - 1
+            for position, interior in enumerate(path[1:-1], start=1):
+                self.node_chain[interior] = chain
+                self.node_position[interior] = position
+            self.chain_nodes.extend(path)
+            self.chain_cum.extend(cum)
+            self.chain_offsets.append(len(self.chain_nodes))
+            end = path[-1]
+            edges[start].append((end, total, chain))
+            if end != start:
+                edges[end].append((start, total, chain))
+
+        def walk_all(node: int) -> None:
+            for neighbor in adjacency[node]:
+                if (min(node, neighbor), max(node, neighbor)) not in visited:
+                    walk(node, neighbor)
+
+        for node in range(count):
+            if key[node]:
+                walk_all(node)
+        # Closed loops have no key node: promote one node per loop
+        for node in range(count):
+            if not key[node] and self.node_chain[node] == -1:
+                key[node] = True
+                walk_all(node)
+
+        self.offsets = array("i", [0])
+        self.targets = array("i")
+        self.weights = array("d")
+        self.edge_chain = array("i")
+        for node in range(count):
+            for target, weight, chain in edges[node]:
+                self.targets.append(target)
+                self.weights.append(weight)
+                self.edge_chain.append(chain)
+            self.offsets.append(len(self.targets))
+        self.key_nodes = sum(key)
+
+    # --- queries --------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def nearest(
+        self, lat: float, lon: float, max_meters: float = MAX_SNAP_METERS, exclude: int = -1
+    ) -> Optional[Tuple[int, float]]:
+        """(node, distance) of the closest node within max_meters"""
+        row, col = _cell(lat, lon)
+        # Smallest side of a grid cell in meters: ring k is at least (k - 1) cells away
+        cell_m = GRID_DEGREES * 111_000 * max(math.cos(math.radians(lat)), 0.01)
+        best, best_distance = None, max_meters
+        for ring in range(int(max_meters / cell_m) + 2):
+            if best is not None and best_distance <= (ring - 1) * cell_m:
+                break
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for node in self.grid.get((r, c), ()):
+                        if node == exclude:
+                            continue
+                        distance = haversine_m(lat, lon, self.lat[node], self.lon[node])
+                        if distance <= best_distance:
+                            best, best_distance = node, distance
+        return None if best is None else (best, best_distance)
+
+    def _chain(self, chain: int) -> Tuple[int, int]:
+        return self.chain_offsets[chain], self.chain_offsets[chain + 1]
+
+    def _anchors(self, node: int) -> List[Tuple[int, float, List[int]]]:
+        """Key nodes a search can start or end at for node: (key node, distance, nodes from node to it)"""
+        chain = self.node_chain[node]
+        if chain == -1:
+            return [(node, 0.0, [node])]
+        start, end = self._chain(chain)
+        i = start + self.node_position[node]
+        total = self.chain_cum[end - 1]
+        return [
+            (self.chain_nodes[start], self.chain_cum[i], list(reversed(self.chain_nodes[start:i + 1]))),
+            (self.chain_nodes[end - 1], total - self.chain_cum[i], list(self.chain_nodes[i:end])),
+        ]
+
+    def _chain_path(self, chain: int, source: int) -> List[int]:
+        start, end = self._chain(chain)
+        nodes = list(self.chain_nodes[start:end])
+        return nodes if nodes[0] == source else nodes[::-1]
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[float, List[int]]]:
+        """(meters, nodes) of the shortest path between two nodes, or None if they aren't connected"""
+        if source == target:
+            return 0.0, [source]
+        t_lat, t_lon = self.lat[target], self.lon[target]
+        best, best_path = math.inf, None
+        goals = {}
+        for anchor, distance, path in self._anchors(target):
+            if distance < goals.get(anchor, (math.inf,))[0]:
+                goals[anchor] = (distance, path[::-1])
+        # Both points inside the same chain: walking along it is a candidate
+        chain = self.node_chain[source]
+        if chain != -1 and chain == self.node_chain[target]:
+            start, _ = self._chain(chain)
+            i, j = start + self.node_position[source], start + self.node_position[target]
+            best = abs(self.chain_cum[i] - self.chain_cum[j])
+            best_path = list(self.chain_nodes[i:j + 1]) if i <= j else list(reversed(self.chain_nodes[j:i + 1]))
+
+        dist: Dict[int, float] = {}
+        parent: Dict[int, Tuple[int, int]] = {}
+        prefix: Dict[int, List[int]] = {}
+        heap = []
+        for anchor, distance, path in self._anchors(source):
+            if distance < dist.get(anchor, math.inf):
+                dist[anchor] = distance
+                prefix[anchor] = path
+                heapq.heappush(heap, (distance + haversine_m(self.lat[anchor], self.lon[anchor], t_lat, t_lon), distance, anchor))
+
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        end_node = None
+        while heap:
+            f, g, node = heapq.heappop(heap)
+            if f >= best:
+                break
+            if g > dist[node]:
+                continue
+            if node in goals and g + goals[node][0] < best:
+                best, end_node = g + goals[node][0], node
+            for e in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[e]
+                cost = g + weights[e]
+                if cost < dist.get(neighbor, math.inf):
+                    dist[neighbor] = cost
+                    parent[neighbor] = (node, e)
+                    heapq.heappush(heap, (cost + haversine_m(self.lat[neighbor], self.lon[neighbor], t_lat, t_lon), cost, neighbor))
+
+        if end_node is None:
+            return (best, best_path) if best_path is not None else None
+        # Key nodes back to the start, then expand each contracted edge
+        hops = []
+        node = end_node
+        while node in parent:
+            previous, e = parent[node]
+            hops.append((previous, e))
+            node = previous
+        path = list(prefix[node])
+        for previous, e in reversed(hops):
+            path.extend(self._chain_path(self.edge_chain[e], previous)[1:])
+        path.extend(goals[end_node][1][1:])
+        return best, path
+
+    def distances_within(self, source: int, max_meters: float) -> Dict[int, float]:
+        """Network distance from source to every node at most max_meters away (bounded Dijkstra)"""
+        reached: Dict[int, float] = {}
+
+        def reach(node: int, distance: float) -> None:
+            if distance <= max_meters and distance < reached.get(node, math.inf):
+                reached[node] = distance
+
+        reach(source, 0.0)
+        # Nodes on the source's own chain are reached by walking straight along it
+        chain = self.node_chain[source]
+        if chain != -1:
+            start, end = self._chain(chain)
+            here = self.chain_cum[start + self.node_position[source]]
+            for k in range(start, end):
+                reach(self.chain_nodes[k], abs(self.chain_cum[k] - here))
+
+        dist: Dict[int, float] = {}
+        heap = []
+        for anchor, distance, _ in self._anchors(source):
+            if distance <= max_meters and distance < dist.get(anchor, math.inf):
+                dist[anchor] = distance
+                heapq.heappush(heap, (distance, anchor))
+        while heap:
+            g, node = heapq.heappop(heap)
+            if g > dist[node]:
+                continue
+            reach(node, g)
+            for e in range(self.offsets[node], self.offsets[node + 1]):
+                # Walk into the chain from this end as far as the budget goes
+                start, end = self._chain(self.edge_chain[e])
+                total = self.chain_cum[end - 1]
+                loop = self.chain_nodes[start] == self.chain_nodes[end - 1]
+                for forward in (True, False) if loop else (self.chain_nodes[start] == node,):
+                    for k in range(start, end) if forward else range(end - 1, start - 1, -1):
+                        along = self.chain_cum[k] if forward else total - self.chain_cum[k]
+                        if g + along > max_meters:
+                            break
+                        reach(self.chain_nodes[k], g + along)
+                neighbor, cost = self.targets[e], g + self.weights[e]
+                if cost <= max_meters and cost < dist.get(neighbor, math.inf):
+                    dist[neighbor] = cost
+                    heapq.heappush(heap, (cost, neighbor))
+        return reached
+
+    def route(self, lat1: float, lon1: float, lat2: float, lon2: float, max_snap_m: float = MAX_SNAP_METERS) -> Optional[dict]:
+        """
+        {"coords": [(lat, lon), ...], "distance_m": ...} along the trails, or None when unroutable.
+        Points off the trails are joined to them in a straight line (at most max_snap_m),
+        and those legs are part of the coords and the distance.
+        """
+        origin = self.nearest(lat1, lon1, max_snap_m)
+        destination = self.nearest(lat2, lon2, max_snap_m)
+        if origin is None or destination is None:
+            return None
+        found = self.shortest_path(origin[0], destination[0])
+        if found is None:
+            return None
+        distance, nodes = found
+        coords = [(self.lat[n], self.lon[n]) for n in nodes]
+        if origin[1] > 0:
+            coords.insert(0, (lat1, lon1))
+        if destination[1] > 0:
+            coords.append((lat2, lon2))
+        return {"coords": coords, "distance_m": origin[1] + distance + destination[1]}
+
+
+_graphs: Dict[str, Optional[TrailGraph]] = {}
+_lock = threading.Lock()
+
+
+def get_trail_graph(profile: str) -> Optional[TrailGraph]:
+    """The trail graph for a profile (built on first use), or None when it has no trail layers"""
+    if profile in _graphs:
+        return _graphs[profile]
+    with _lock:
+        if profile not in _graphs:
+            layers = PROFILE_LAYERS.get(profile, [])
+            # Profiles on the same layers (foot and bike) share one graph
+            shared = next((p for p in _graphs if PROFILE_LAYERS.get(p) == layers), None) if layers else None
+            if shared is not None:
+                _graphs[profile] = _graphs[shared]
+                return _graphs[profile]
+            data_dir = os.environ.get("TRAIL_DATA_DIR", DEFAULT_DATA_DIR)
+            paths = [os.path.join(data_dir, name) for name in layers]
+            paths = [path for path in paths if os.path.exists(path)]
+            graph = TrailGraph(iter_lines(paths)) if paths else None
+            if graph is not None:
+                logger.info(f"Trail graph for {profile}: {len(graph)} nodes, {graph.key_nodes} after contraction")
+            _graphs[profile] = graph
+    return _graphs[profile]
@@ -28,26 +28,28 @@ export async function fetchNearbyPagesForGisId(
   const nearbyIds = getNearbyGlobalIds(centerGisId, radiusMiles);
 
   const result: Record<string, PageData> = {};
-
-  // 2) For each nearby ID, ask backend if a page exists
-  for (const gisId of nearbyIds) {
-    if (Object.keys(result).length >= maxResults) break;
-
-    try {
-      const url = `${API_BASE}/api/v1/pages/exists?gis_id=${encodeURIComponent(
-        gisId
-      )}`;
-      const res = await fetch(url);
-      if (!res.ok) continue;
-
-      const data = await res.json(); // { gisID, exists, page }
-
-      if (data.exists && data.page) {
-        result[gisId] = data.page as PageData;
+  if (nearbyIds.length === 0) return result;
+
+  // 2) Ask the backend about all nearby IDs in one request (max 500 per call)
+  try {
+    const res = await fetch(`${API_BASE}/api/v1/pages/exists/bulk?full=true`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ gis_ids: nearbyIds.slice(0, 500) }),
+    });
+    if (!res.ok) return result;
+
+    const data = await res.json(); // { results: { [gisId]: page | null }, found }
+
+    for (const gisId of nearbyIds) {
+      if (Object.keys(result).length >= maxResults) break;
+      const page = data.results?.[gisId];
+      if (page) {
+        result[gisId] = page as PageData;
       }
-    } catch {
-      // ignore individual failures and keep going
     }
+  } catch {
+    // network failure: no nearby pages
   }
 
   return result;